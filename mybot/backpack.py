@@ -5,10 +5,13 @@ from aiogram.types import Message, CallbackQuery, InlineKeyboardButton, InlineKe
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from sqlalchemy import select, and_, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from database.models import LorePiece, UserLorePiece
-from database.hint_combination import HintCombination
-from database.setup import get_session
+from services.hint_combination_service import HintCombinationService, register_user_hint
+from services.backpack_service import BackpackService, record_backpack_unlock
+from database.setup import get_session_factory
 from notificaciones import send_narrative_notification
+from narrative.requirement_cache import invalidate_requirement_snapshot
 import random
 from datetime import datetime
 
@@ -52,77 +55,60 @@ LUCIEN_BACKPACK_MESSAGES = [
 ]
 
 @router.message(F.text == "🎒 Mochila")
-async def mostrar_mochila_narrativa(message: Message):
+async def mostrar_mochila_narrativa(message: Message, session: AsyncSession, user_id: int = None):
     """Mochila principal con categorización y contexto narrativo"""
-    session_factory = await get_session()
-    async with session_factory() as session:
-        user_id = message.from_user.id
-        
-        # Obtener todas las pistas del usuario
-        result = await session.execute(
-            select(LorePiece, UserLorePiece.unlocked_at, UserLorePiece.context)
-            .join(UserLorePiece, LorePiece.id == UserLorePiece.lore_piece_id)
-            .where(UserLorePiece.user_id == user_id)
-            .order_by(UserLorePiece.unlocked_at.desc())
-        )
-        
-        pistas_data = result.all()
-        
-        if not pistas_data:
-            await mostrar_mochila_vacia(message)
-            return
-        
-        # Organizar por categorías
-        categorized_hints = {}
-        recent_hints = []
-        
-        for pista, unlocked_at, context in pistas_data:
-            category = pista.category or 'fragmentos'
-            if category not in categorized_hints:
-                categorized_hints[category] = []
-            categorized_hints[category].append((pista, unlocked_at, context))
-            
-            # Marcar pistas recientes (últimas 24h)
-            if unlocked_at and (datetime.now() - unlocked_at).days == 0:
-                recent_hints.append(pista)
-        
-        # Crear mensaje principal
-        lucien_message = random.choice(LUCIEN_BACKPACK_MESSAGES)
-        total_hints = len(pistas_data)
-        
-        texto = f"🎩 **Lucien:**\n*{lucien_message}*\n\n"
-        texto += f"📊 **Tu Colección:** {total_hints} pistas descubiertas\n"
-        
-        if recent_hints:
-            texto += f"✨ **Nuevas:** {len(recent_hints)} pistas recientes\n"
-        
-        texto += "\n🎒 **Explora tu mochila:**"
-        
-        # Crear botones por categoría
-        keyboard = []
-        for category, data in categorized_hints.items():
-            cat_info = BACKPACK_CATEGORIES.get(category, {
-                'emoji': '📜', 'title': category.title(), 'description': 'Elementos diversos'
-            })
-            count = len(data)
-            keyboard.append([
-                InlineKeyboardButton(text=f"{cat_info['emoji']} {cat_info['title']} ({count})", callback_data=f"mochila_cat:{category}"
-                )
-            ])
-        
-        # Botones adicionales
-        keyboard.extend([
-            [
-                InlineKeyboardButton(text="🔗 Combinar Pistas", callback_data="combinar_inicio"),
-                InlineKeyboardButton(text="🔍 Buscar", callback_data="buscar_pistas")
-            ],
-            [
-                InlineKeyboardButton(text="📈 Estadísticas", callback_data="stats_mochila"),
-                InlineKeyboardButton(text="🎯 Sugerencias", callback_data="sugerencias_diana")
-            ]
+    # Desde un callback, message.from_user es el bot: el usuario llega explícito
+    user_id = user_id or message.from_user.id
+    
+    # Resumen cacheado: conteos por categoría y pistas recientes
+    summary = await BackpackService(session).get_summary(user_id)
+    
+    if not summary["total"]:
+        await mostrar_mochila_vacia(message)
+        return
+    
+    # Marcar pistas recientes (últimas 24h)
+    recent_hints = [
+        lore_piece_id for lore_piece_id, _, unlocked_at in summary["recent"]
+        if unlocked_at and (datetime.now() - unlocked_at).days == 0
+    ]
+    
+    # Crear mensaje principal
+    lucien_message = random.choice(LUCIEN_BACKPACK_MESSAGES)
+    total_hints = summary["total"]
+    
+    texto = f"🎩 **Lucien:**\n*{lucien_message}*\n\n"
+    texto += f"📊 **Tu Colección:** {total_hints} pistas descubiertas\n"
+    
+    if recent_hints:
+        texto += f"✨ **Nuevas:** {len(recent_hints)} pistas recientes\n"
+    
+    texto += "\n🎒 **Explora tu mochila:**"
+    
+    # Crear botones por categoría
+    keyboard = []
+    for category, count in summary["categories"].items():
+        cat_info = BACKPACK_CATEGORIES.get(category, {
+            'emoji': '📜', 'title': category.title(), 'description': 'Elementos diversos'
+        })
+        keyboard.append([
+            InlineKeyboardButton(text=f"{cat_info['emoji']} {cat_info['title']} ({count})", callback_data=f"mochila_cat:{category}"
+            )
         ])
-        
-        await message.answer(texto, reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard), parse_mode="Markdown")
+    
+    # Botones adicionales
+    keyboard.extend([
+        [
+            InlineKeyboardButton(text="🔗 Combinar Pistas", callback_data="combinar_inicio"),
+            InlineKeyboardButton(text="🔍 Buscar", callback_data="buscar_pistas")
+        ],
+        [
+            InlineKeyboardButton(text="📈 Estadísticas", callback_data="stats_mochila"),
+            InlineKeyboardButton(text="🎯 Sugerencias", callback_data="sugerencias_diana")
+        ]
+    ])
+    
+    await message.answer(texto, reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard), parse_mode="Markdown")
 
 async def mostrar_mochila_vacia(message: Message):
     """Mensaje especial para mochila vacía con contexto narrativo"""
@@ -149,215 +135,190 @@ async def mostrar_mochila_vacia(message: Message):
     await message.answer(texto, reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard), parse_mode="Markdown")
 
 @router.callback_query(F.data.startswith("mochila_cat:"))
-async def mostrar_categoria(callback: CallbackQuery):
-    """Muestra pistas de una categoría específica"""
-    category = callback.data.split(":")[1]
-    session_factory = await get_session()
+async def mostrar_categoria(callback: CallbackQuery, session: AsyncSession):
+    """Muestra pistas de una categoría específica, paginadas por clave"""
+    parts = callback.data.split(":")
+    category = parts[1]
+    after_id = int(parts[2]) if len(parts) > 2 else None
+    user_id = callback.from_user.id
     
-    async with session_factory() as session:
-        user_id = callback.from_user.id
-        
-        result = await session.execute(
-            select(LorePiece, UserLorePiece.unlocked_at, UserLorePiece.context)
-            .join(UserLorePiece, LorePiece.id == UserLorePiece.lore_piece_id)
-            .where(
-                and_(
-                    UserLorePiece.user_id == user_id,
-                    LorePiece.category == category
-                )
-            )
-            .order_by(UserLorePiece.unlocked_at.desc())
-        )
-        
-        pistas_data = result.all()
-        cat_info = BACKPACK_CATEGORIES.get(category, {'emoji': '📜', 'title': category.title(), 'description': 'Elementos diversos'})
-        
-        texto = f"{cat_info['emoji']} **{cat_info['title']}**\n*{cat_info['description']}*\n\n"
-        
-        keyboard = []
-        for pista, unlocked_at, context in pistas_data:
-            # Agregar indicadores especiales
-            indicators = ""
-            if context and context.get('is_combinable'):
-                indicators += "🔗"
-            if unlocked_at and (datetime.now() - unlocked_at).days == 0:
-                indicators += "✨"
-            
-            button_text = f"{indicators} {pista.title}"
-            keyboard.append([
-                InlineKeyboardButton(text=button_text, callback_data=f"ver_pista_detail:{pista.id}")
-            ])
-        
+    pistas_data, next_cursor = await BackpackService(session).get_category_page(
+        user_id, category, after_id=after_id
+    )
+    cat_info = BACKPACK_CATEGORIES.get(category, {'emoji': '📜', 'title': category.title(), 'description': 'Elementos diversos'})
+    
+    texto = f"{cat_info['emoji']} **{cat_info['title']}**\n*{cat_info['description']}*\n\n"
+    
+    keyboard = []
+    for pista, unlocked_at, context in pistas_data:
+        # Agregar indicadores especiales
+        indicators = ""
+        if context and context.get('is_combinable'):
+            indicators += "🔗"
+        if unlocked_at and (datetime.now() - unlocked_at).days == 0:
+            indicators += "✨"
+        
+        button_text = f"{indicators} {pista.title}"
         keyboard.append([
-            InlineKeyboardButton(text="⬅️ Volver a Mochila", callback_data="volver_mochila")
+            InlineKeyboardButton(text=button_text, callback_data=f"ver_pista_detail:{pista.id}")
         ])
-        
-        await callback.message.edit_text(texto, reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard), parse_mode="Markdown")
+    
+    navigation = []
+    if after_id is not None:
+        navigation.append(InlineKeyboardButton(text="⏮️ Inicio", callback_data=f"mochila_cat:{category}"))
+    if next_cursor is not None:
+        navigation.append(InlineKeyboardButton(text="➡️ Más", callback_data=f"mochila_cat:{category}:{next_cursor}"))
+    if navigation:
+        keyboard.append(navigation)
+    
+    keyboard.append([
+        InlineKeyboardButton(text="⬅️ Volver a Mochila", callback_data="volver_mochila")
+    ])
+    
+    await callback.message.edit_text(texto, reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard), parse_mode="Markdown")
 
 @router.callback_query(F.data.startswith("ver_pista_detail:"))
-async def ver_pista_detallada(callback: CallbackQuery):
+async def ver_pista_detallada(callback: CallbackQuery, session: AsyncSession):
     """Vista detallada de una pista con contexto narrativo"""
     pista_id = int(callback.data.split(":")[1])
-    session_factory = await get_session()
     
-    async with session_factory() as session:
-        user_id = callback.from_user.id
-        
-        # Obtener pista y contexto
-        result = await session.execute(
-            select(LorePiece, UserLorePiece.unlocked_at, UserLorePiece.context)
-            .join(UserLorePiece, LorePiece.id == UserLorePiece.lore_piece_id)
-            .where(
-                and_(
-                    UserLorePiece.user_id == user_id,
-                    LorePiece.id == pista_id
-                )
-            )
-        )
-        
-        pista_data = result.first()
-        if not pista_data:
-            await callback.answer("❌ Pista no encontrada")
-            return
-        
-        pista, unlocked_at, context = pista_data
-        
-        # Crear mensaje detallado
-        texto = f"📜 **{pista.title}**\n"
-        texto += f"🏷️ `{pista.code_name}`\n\n"
-        
-        if pista.description:
-            texto += f"*{pista.description}*\n\n"
-        
-        # Información contextual
-        if unlocked_at:
-            dias_desde = (datetime.now() - unlocked_at).days
-            if dias_desde == 0:
-                texto += "⏰ Desbloqueada hoy\n"
-            else:
-                texto += f"⏰ Desbloqueada hace {dias_desde} días\n"
-        
-        # Contexto narrativo si existe
-        if context:
-            if context.get('source_mission'):
-                texto += f"🎯 Obtenida en: {context['source_mission']}\n"
-            if context.get('diana_message'):
-                texto += f"💬 Diana: *{context['diana_message']}*\n"
-        
-        # Verificar si es combinable
-        combinaciones_posibles = await verificar_combinaciones_disponibles(session, user_id, pista.code_name)
-        if combinaciones_posibles:
-            texto += f"\n🔗 **Combinable con:** {len(combinaciones_posibles)} pistas"
-        
-        keyboard = [
-            [InlineKeyboardButton(text="👁️ Ver Contenido", callback_data=f"mostrar_contenido:{pista.id}")],
-        ]
-        
-        if combinaciones_posibles:
-            keyboard.append([
-                InlineKeyboardButton(text="🔗 Combinar Ahora", callback_data=f"combinar_con:{pista.code_name}")
-            ])
-        
+    user_id = callback.from_user.id
+    
+    # Obtener pista y contexto (búsqueda por clave primaria)
+    pista_data = await BackpackService(session).get_user_piece(user_id, pista_id)
+    if not pista_data:
+        await callback.answer("❌ Pista no encontrada")
+        return
+    
+    pista, unlocked_at, context = pista_data
+    
+    # Crear mensaje detallado
+    texto = f"📜 **{pista.title}**\n"
+    texto += f"🏷️ `{pista.code_name}`\n\n"
+    
+    if pista.description:
+        texto += f"*{pista.description}*\n\n"
+    
+    # Información contextual
+    if unlocked_at:
+        dias_desde = (datetime.now() - unlocked_at).days
+        if dias_desde == 0:
+            texto += "⏰ Desbloqueada hoy\n"
+        else:
+            texto += f"⏰ Desbloqueada hace {dias_desde} días\n"
+    
+    # Contexto narrativo si existe
+    if context:
+        if context.get('source_mission'):
+            texto += f"🎯 Obtenida en: {context['source_mission']}\n"
+        if context.get('diana_message'):
+            texto += f"💬 Diana: *{context['diana_message']}*\n"
+    
+    # Verificar si es combinable
+    combinaciones_posibles = await verificar_combinaciones_disponibles(session, user_id, pista.code_name)
+    if combinaciones_posibles:
+        texto += f"\n🔗 **Combinable con:** {len(combinaciones_posibles)} pistas"
+    
+    keyboard = [
+        [InlineKeyboardButton(text="👁️ Ver Contenido", callback_data=f"mostrar_contenido:{pista.id}")],
+    ]
+    
+    if combinaciones_posibles:
         keyboard.append([
-            InlineKeyboardButton(text="⬅️ Volver", callback_data=f"mochila_cat:{pista.category or 'fragmentos'}")
+            InlineKeyboardButton(text="🔗 Combinar Ahora", callback_data=f"combinar_con:{pista.code_name}")
         ])
-        
-        await callback.message.edit_text(texto, reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard), parse_mode="Markdown")
+    
+    keyboard.append([
+        InlineKeyboardButton(text="⬅️ Volver", callback_data=f"mochila_cat:{pista.category or 'fragmentos'}")
+    ])
+    
+    await callback.message.edit_text(texto, reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard), parse_mode="Markdown")
 
 @router.callback_query(F.data.startswith("mostrar_contenido:"))
-async def mostrar_contenido_pista(callback: CallbackQuery):
+async def mostrar_contenido_pista(callback: CallbackQuery, session: AsyncSession):
     """Muestra el contenido real de la pista"""
     pista_id = int(callback.data.split(":")[1])
-    session_factory = await get_session()
+    pista = await session.get(LorePiece, pista_id)
     
-    async with session_factory() as session:
-        pista = await session.get(LorePiece, pista_id)
-        
-        if pista.content_type == "image":
-            await callback.message.answer_photo(
-                pista.content, 
-                caption=f"🖼️ **{pista.title}**\n\n{pista.description or ''}"
-            )
-        elif pista.content_type == "video":
-            await callback.message.answer_video(
-                pista.content, 
-                caption=f"🎥 **{pista.title}**\n\n{pista.description or ''}"
-            )
-        elif pista.content_type == "audio":
-            await callback.message.answer_audio(
-                pista.content, 
-                caption=f"🎵 **{pista.title}**\n\n{pista.description or ''}"
-            )
-        else:
-            await callback.message.answer(f"📜 **{pista.title}**\n\n{pista.content}")
-        
-        await callback.answer()
+    if pista.content_type == "image":
+        await callback.message.answer_photo(
+            pista.content, 
+            caption=f"🖼️ **{pista.title}**\n\n{pista.description or ''}"
+        )
+    elif pista.content_type == "video":
+        await callback.message.answer_video(
+            pista.content, 
+            caption=f"🎥 **{pista.title}**\n\n{pista.description or ''}"
+        )
+    elif pista.content_type == "audio":
+        await callback.message.answer_audio(
+            pista.content, 
+            caption=f"🎵 **{pista.title}**\n\n{pista.description or ''}"
+        )
+    else:
+        await callback.message.answer(f"📜 **{pista.title}**\n\n{pista.content}")
+    
+    await callback.answer()
 
 @router.callback_query(F.data == "combinar_inicio")
-async def iniciar_combinacion_interactiva(callback: CallbackQuery, state: FSMContext):
+async def iniciar_combinacion_interactiva(callback: CallbackQuery, state: FSMContext, session: AsyncSession):
     """Inicia el proceso interactivo de combinación"""
-    session_factory = await get_session()
+    user_id = callback.from_user.id
     
-    async with session_factory() as session:
-        user_id = callback.from_user.id
-        
-        # Obtener pistas combinables del usuario
-        result = await session.execute(
-            select(LorePiece)
-            .join(UserLorePiece, LorePiece.id == UserLorePiece.lore_piece_id)
-            .where(UserLorePiece.user_id == user_id)
-        )
-        
-        pistas = result.scalars().all()
-        
-        if len(pistas) < 2:
-            await callback.answer("❌ Necesitas al menos 2 pistas para combinar")
-            return
-        
-        # Verificar si hay combinaciones posibles
-        combinaciones_disponibles = []
-        for pista in pistas:
-            combos = await verificar_combinaciones_disponibles(session, user_id, pista.code_name)
-            combinaciones_disponibles.extend(combos)
-        
-        if not combinaciones_disponibles:
-            texto = """🎩 **Lucien:**
+    # Obtener pistas combinables del usuario
+    result = await session.execute(
+        select(LorePiece)
+        .join(UserLorePiece, LorePiece.id == UserLorePiece.lore_piece_id)
+        .where(UserLorePiece.user_id == user_id)
+    )
+    
+    pistas = result.scalars().all()
+    
+    if len(pistas) < 2:
+        await callback.answer("❌ Necesitas al menos 2 pistas para combinar")
+        return
+    
+    # Verificar si hay combinaciones posibles
+    combinaciones_disponibles = await HintCombinationService(session).get_completable_combinations(user_id)
+    
+    if not combinaciones_disponibles:
+        texto = """🎩 **Lucien:**
 *Aún no veo conexiones evidentes entre tus pistas...*
 
 🌸 **Diana:**
 *Paciencia. Algunas combinaciones solo se revelan cuando tienes todas las piezas necesarias.*
 
 *Sigue explorando, sigue descubriendo. Las respuestas vendrán cuando estés listo.*"""
-            
-            await callback.message.edit_text(texto, parse_mode="Markdown")
-            return
         
-        texto = """🔗 **Sistema de Combinaciones**
+        await callback.message.edit_text(texto, parse_mode="Markdown")
+        return
+    
+    texto = """🔗 **Sistema de Combinaciones**
 
 🎩 **Lucien:**
 *Selecciona las pistas que sientes que están conectadas. Diana ha dejado patrones ocultos esperando ser descubiertos.*
 
 **Selecciona pistas para combinar:**"""
-        
-        keyboard = []
-        for pista in pistas:
-            keyboard.append([
-                InlineKeyboardButton(text=f"📜 {pista.title}", callback_data=f"select_hint:{pista.code_name}"
-                )
-            ])
-        
+    
+    keyboard = []
+    for pista in pistas:
         keyboard.append([
-            InlineKeyboardButton(text="✅ Intentar Combinación", callback_data="try_combination"),
-            InlineKeyboardButton(text="❌ Cancelar", callback_data="volver_mochila")
+            InlineKeyboardButton(text=f"📜 {pista.title}", callback_data=f"select_hint:{pista.code_name}"
+            )
         ])
-        
-        await state.set_state(CombinationFSM.selecting_hints)
-        await state.update_data(selected_hints=[])
-        
-        await callback.message.edit_text(texto, reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard), parse_mode="Markdown")
+    
+    keyboard.append([
+        InlineKeyboardButton(text="✅ Intentar Combinación", callback_data="try_combination"),
+        InlineKeyboardButton(text="❌ Cancelar", callback_data="volver_mochila")
+    ])
+    
+    await state.set_state(CombinationFSM.selecting_hints)
+    await state.update_data(selected_hints=[])
+    
+    await callback.message.edit_text(texto, reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard), parse_mode="Markdown")
 
 @router.callback_query(F.data.startswith("select_hint:"), CombinationFSM.selecting_hints)
-async def seleccionar_pista_combinacion(callback: CallbackQuery, state: FSMContext):
+async def seleccionar_pista_combinacion(callback: CallbackQuery, state: FSMContext, session: AsyncSession):
     """Maneja la selección de pistas para combinar"""
     hint_code = callback.data.split(":")[1]
     data = await state.get_data()
@@ -381,15 +342,13 @@ async def seleccionar_pista_combinacion(callback: CallbackQuery, state: FSMConte
 **Selecciona más pistas o intenta la combinación:**"""
     
     # Recrear keyboard con indicadores de selección
-    session_factory = await get_session()
-    async with session_factory() as session:
-        result = await session.execute(
-            select(LorePiece)
-            .join(UserLorePiece, LorePiece.id == UserLorePiece.lore_piece_id)
-            .where(UserLorePiece.user_id == callback.from_user.id)
-        )
-        pistas = result.scalars().all()
-    
+    result = await session.execute(
+        select(LorePiece)
+        .join(UserLorePiece, LorePiece.id == UserLorePiece.lore_piece_id)
+        .where(UserLorePiece.user_id == callback.from_user.id)
+    )
+    pistas = result.scalars().all()
+
     keyboard = []
     for pista in pistas:
         indicator = "✅" if pista.code_name in selected_hints else "📜"
@@ -406,7 +365,7 @@ async def seleccionar_pista_combinacion(callback: CallbackQuery, state: FSMConte
     await callback.message.edit_text(texto, reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard), parse_mode="Markdown")
 
 @router.callback_query(F.data == "try_combination", CombinationFSM.selecting_hints)
-async def procesar_combinacion_seleccionada(callback: CallbackQuery, state: FSMContext):
+async def procesar_combinacion_seleccionada(callback: CallbackQuery, state: FSMContext, session: AsyncSession):
     """Procesa la combinación seleccionada"""
     data = await state.get_data()
     selected_hints = data.get('selected_hints', [])
@@ -415,33 +374,25 @@ async def procesar_combinacion_seleccionada(callback: CallbackQuery, state: FSMC
         await callback.answer("❌ Selecciona al menos 2 pistas")
         return
     
-    session_factory = await get_session()
-    async with session_factory() as session:
-        user_id = callback.from_user.id
-        
-        # Verificar combinación
-        result = await session.execute(select(HintCombination))
-        combinaciones = result.scalars().all()
-        
-        for combinacion in combinaciones:
-            required_hints = sorted(combinacion.required_hints.split(","))
-            user_hints = sorted(selected_hints)
-            
-            if user_hints == required_hints:
-                # ¡Combinación correcta!
-                await desbloquear_pista_narrativa(callback.message.bot, user_id, combinacion.reward_code, {
-                    'source': 'combination',
-                    'combined_hints': selected_hints,
-                    'combination_code': combinacion.combination_code
-                })
-                
-                await mostrar_exito_combinacion(callback, combinacion, selected_hints)
-                await state.clear()
-                return
-        
-        # Combinación incorrecta
-        await mostrar_fallo_combinacion(callback, selected_hints)
+    user_id = callback.from_user.id
+    
+    # Verificar combinación (búsqueda por clave canónica)
+    combinacion = await HintCombinationService(session).find_combination(selected_hints)
+    if combinacion:
+        # ¡Combinación correcta!
+        await desbloquear_pista_narrativa(callback.message.bot, user_id, combinacion.reward_code, {
+            'source': 'combination',
+            'combined_hints': selected_hints,
+            'combination_code': combinacion.combination_code
+        }, session=session)
+        
+        await mostrar_exito_combinacion(callback, combinacion, selected_hints)
         await state.clear()
+        return
+    
+    # Combinación incorrecta
+    await mostrar_fallo_combinacion(callback, selected_hints)
+    await state.clear()
 
 async def mostrar_exito_combinacion(callback: CallbackQuery, combinacion, hints_used):
     """Muestra mensaje de éxito con narrativa"""
@@ -495,162 +446,156 @@ async def mostrar_fallo_combinacion(callback: CallbackQuery, hints_used):
 
 async def verificar_combinaciones_disponibles(session, user_id, hint_code):
     """Verifica qué combinaciones están disponibles para una pista específica"""
-    # Obtener todas las pistas del usuario
+    return await HintCombinationService(session).get_completable_combinations(user_id, hint_code)
+
+async def desbloquear_pista_narrativa(bot, user_id, pista_code, context=None, session: AsyncSession = None):
+    """Desbloquea una pista con contexto narrativo completo"""
+    if session is None:
+        async with get_session_factory()() as session:
+            return await _registrar_pista(session, bot, user_id, pista_code, context)
+    return await _registrar_pista(session, bot, user_id, pista_code, context)
+
+async def _registrar_pista(session: AsyncSession, bot, user_id, pista_code, context=None):
+    # Buscar la pista por código
     result = await session.execute(
-        select(LorePiece.code_name)
-        .join(UserLorePiece, LorePiece.id == UserLorePiece.lore_piece_id)
-        .where(UserLorePiece.user_id == user_id)
+        select(LorePiece).where(LorePiece.code_name == pista_code)
     )
-    user_hint_codes = [row[0] for row in result.all()]
+    pista = result.scalar_one_or_none()
     
-    # Buscar combinaciones que incluyan esta pista
-    result = await session.execute(select(HintCombination))
-    combinaciones = result.scalars().all()
+    if not pista:
+        return False
     
-    combinaciones_posibles = []
-    for combo in combinaciones:
-        required_hints = combo.required_hints.split(",")
-        if hint_code in required_hints:
-            # Verificar si el usuario tiene todas las pistas requeridas
-            if all(req_hint in user_hint_codes for req_hint in required_hints):
-                combinaciones_posibles.append(combo)
-    
-    return combinaciones_posibles
-
-async def desbloquear_pista_narrativa(bot, user_id, pista_code, context=None):
-    """Desbloquea una pista con contexto narrativo completo"""
-    session_factory = await get_session()
-    async with session_factory() as session:
-        # Buscar la pista por código
-        result = await session.execute(
-            select(LorePiece).where(LorePiece.code_name == pista_code)
-        )
-        pista = result.scalar_one_or_none()
-        
-        if not pista:
-            return False
-        
-        # Verificar si ya la tiene
-        existing = await session.execute(
-            select(UserLorePiece).where(
-                and_(
-                    UserLorePiece.user_id == user_id,
-                    UserLorePiece.lore_piece_id == pista.id
-                )
+    # Verificar si ya la tiene
+    existing = await session.execute(
+        select(UserLorePiece).where(
+            and_(
+                UserLorePiece.user_id == user_id,
+                UserLorePiece.lore_piece_id == pista.id
             )
         )
-        
-        if existing.scalar_one_or_none():
-            return False  # Ya la tiene
-        
-        # Crear registro
-        user_lore_piece = UserLorePiece(
-            user_id=user_id,
-            lore_piece_id=pista.id,
-            context=context or {}
-        )
-        
-        session.add(user_lore_piece)
-        await session.commit()
-        
-        # Enviar notificación narrativa
-        await send_narrative_notification(bot, user_id, "new_hint", {
-            'hint_title': pista.title,
-            'hint_code': pista.code_name,
-            'source': context.get('source', 'unknown') if context else 'unknown'
-        })
-        
-        return True
+    )
+    
+    if existing.scalar_one_or_none():
+        return False  # Ya la tiene
+    
+    # Crear registro
+    user_lore_piece = UserLorePiece(
+        user_id=user_id,
+        lore_piece_id=pista.id,
+        context=context or {}
+    )
+    
+    session.add(user_lore_piece)
+    await session.commit()
+    invalidate_requirement_snapshot(user_id)
+    register_user_hint(user_id, pista.code_name)
+    record_backpack_unlock(user_id, pista)
+    
+    # Enviar notificación narrativa
+    await send_narrative_notification(bot, user_id, "new_hint", {
+        'hint_title': pista.title,
+        'hint_code': pista.code_name,
+        'source': context.get('source', 'unknown') if context else 'unknown'
+    })
+    
+    return True
 
 @router.callback_query(F.data == "volver_mochila")
-async def volver_mochila(callback: CallbackQuery):
+async def volver_mochila(callback: CallbackQuery, session: AsyncSession):
     """Regresa al menú principal de la mochila"""
-    await mostrar_mochila_narrativa(callback.message)
+    await mostrar_mochila_narrativa(callback.message, session, user_id=callback.from_user.id)
 
 # Funciones de utilidad adicionales para estadísticas y búsqueda
 
 @router.callback_query(F.data == "stats_mochila")
-async def mostrar_estadisticas(callback: CallbackQuery):
+async def mostrar_estadisticas(callback: CallbackQuery, session: AsyncSession):
     """Muestra estadísticas detalladas de la colección"""
-    session_factory = await get_session()
-    async with session_factory() as session:
-        user_id = callback.from_user.id
-        
-        # Contar por categorías
-        result = await session.execute(
-            select(LorePiece.category, func.count(LorePiece.id))
-            .join(UserLorePiece, LorePiece.id == UserLorePiece.lore_piece_id)
-            .where(UserLorePiece.user_id == user_id)
-            .group_by(LorePiece.category)
-        )
-        
-        stats_by_category = dict(result.all())
-        total = sum(stats_by_category.values())
-        
-        # Primera pista obtenida
-        first_hint = await session.execute(
-            select(LorePiece.title, UserLorePiece.unlocked_at)
-            .join(UserLorePiece, LorePiece.id == UserLorePiece.lore_piece_id)
-            .where(UserLorePiece.user_id == user_id)
-            .order_by(UserLorePiece.unlocked_at.asc())
-            .limit(1)
-        )
-        
-        first_data = first_hint.first()
-        
-        texto = f"""📊 **Estadísticas de tu Colección**
+    user_id = callback.from_user.id
+    
+    # Contar por categorías
+    result = await session.execute(
+        select(LorePiece.category, func.count(LorePiece.id))
+        .join(UserLorePiece, LorePiece.id == UserLorePiece.lore_piece_id)
+        .where(UserLorePiece.user_id == user_id)
+        .group_by(LorePiece.category)
+    )
+    
+    stats_by_category = dict(result.all())
+    total = sum(stats_by_category.values())
+    
+    # Primera pista obtenida
+    first_hint = await session.execute(
+        select(LorePiece.title, UserLorePiece.unlocked_at)
+        .join(UserLorePiece, LorePiece.id == UserLorePiece.lore_piece_id)
+        .where(UserLorePiece.user_id == user_id)
+        .order_by(UserLorePiece.unlocked_at.asc())
+        .limit(1)
+    )
+    
+    first_data = first_hint.first()
+    
+    texto = f"""📊 **Estadísticas de tu Colección**
 
 🎯 **Total de pistas:** {total}
 
 📂 **Por categorías:**"""
 
-        for category, count in stats_by_category.items():
-            cat_info = BACKPACK_CATEGORIES.get(category, {'emoji': '📜', 'title': category.title()})
-            percentage = (count / total * 100) if total > 0 else 0
-            texto += f"\n{cat_info['emoji']} {cat_info['title']}: {count} ({percentage:.1f}%)"
-        
-        if first_data:
-            dias_viajando = (datetime.now() - first_data[1]).days
-            texto += f"\n\n🗓️ **Días como viajero:** {dias_viajando}"
-            texto += f"\n🏆 **Primera pista:** {first_data[0]}"
-        
-        keyboard = [
-            [InlineKeyboardButton(text="⬅️ Volver", callback_data="volver_mochila")]
-        ]
-        
-        await callback.message.edit_text(texto, reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard), parse_mode="Markdown")
+    for category, count in stats_by_category.items():
+        cat_info = BACKPACK_CATEGORIES.get(category, {'emoji': '📜', 'title': category.title()})
+        percentage = (count / total * 100) if total > 0 else 0
+        texto += f"\n{cat_info['emoji']} {cat_info['title']}: {count} ({percentage:.1f}%)"
+    
+    if first_data:
+        dias_viajando = (datetime.now() - first_data[1]).days
+        texto += f"\n\n🗓️ **Días como viajero:** {dias_viajando}"
+        texto += f"\n🏆 **Primera pista:** {first_data[0]}"
+    
+    keyboard = [
+        [InlineKeyboardButton(text="⬅️ Volver", callback_data="volver_mochila")]
+    ]
+    
+    await callback.message.edit_text(texto, reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard), parse_mode="Markdown")
 
 @router.callback_query(F.data == "sugerencias_diana")
-async def mostrar_sugerencias_diana(callback: CallbackQuery):
+async def mostrar_sugerencias_diana(callback: CallbackQuery, session: AsyncSession):
     """Diana da sugerencias sobre qué hacer con las pistas actuales"""
-    session_factory = await get_session()
-    async with session_factory() as session:
-        user_id = callback.from_user.id
-        
-        # Analizar estado del usuario
-        total_hints = await session.execute(
-            select(func.count(UserLorePiece.lore_piece_id))
-            .where(UserLorePiece.user_id == user_id)
-        )
-        count = total_hints.scalar()
-        
-        # Verificar combinaciones posibles
-        combinaciones_disponibles = []
-        result = await session.execute(
-            select(LorePiece.code_name)
-            .join(UserLorePiece, LorePiece.id == UserLorePiece.lore_piece_id)
-            .where(UserLorePiece.user_id == user_id)
-        )
-        user_codes = [row[0] for row in result.all()]
-        
-        combinaciones_result = await session.execute(select(HintCombination))
-        for combo in combinaciones_result.scalars().all():
-            required = combo.required_hints.split(",")
-            if all(code in user_codes for code in required):
-                combinaciones_disponibles.append(combo)
-        
-        # Generar sugerencia personalizada
-        if count == 0:
-            sugerencia = "Tu viaje apenas comienza. Reacciona a mis mensajes y completa misiones para obtener tus primeras pistas."
-        elif count < 5:
-            sugerencia
+    user_id = callback.from_user.id
+    
+    # Analizar estado del usuario
+    total_hints = await session.execute(
+        select(func.count(UserLorePiece.lore_piece_id))
+        .where(UserLorePiece.user_id == user_id)
+    )
+    count = total_hints.scalar()
+    
+    # Verificar combinaciones posibles y las que están a una pieza
+    combinaciones_disponibles, combinaciones_cercanas = await HintCombinationService(
+        session
+    ).analyze_user_combinations(user_id)
+    
+    # Generar sugerencia personalizada
+    if count == 0:
+        sugerencia = "Tu viaje apenas comienza. Reacciona a mis mensajes y completa misiones para obtener tus primeras pistas."
+    elif combinaciones_disponibles:
+        sugerencia = "Ya tienes todo lo necesario para descubrir algo nuevo. Mira bien tus pistas... algunas están esperando ser unidas."
+    elif combinaciones_cercanas:
+        sugerencia = "Estás a una sola pieza de revelar uno de mis secretos. Sigue buscando, estás muy cerca."
+    elif count < 5:
+        sugerencia = "Sigue reuniendo pistas. Con unas pocas más empezarás a ver cómo se conectan."
+    else:
+        sugerencia = "Tienes una colección interesante. Algunas conexiones solo aparecen cuando llegan las piezas adecuadas."
+    
+    texto = f"""🌸 **Diana:**
+*{sugerencia}*
+
+📜 **Pistas reunidas:** {count}
+🔗 **Combinaciones listas:** {len(combinaciones_disponibles)}
+🧩 **A una pieza de completarse:** {len(combinaciones_cercanas)}"""
+    
+    keyboard = []
+    if combinaciones_disponibles:
+        keyboard.append([InlineKeyboardButton(text="🔗 Combinar Pistas", callback_data="combinar_inicio")])
+    keyboard.append([InlineKeyboardButton(text="⬅️ Volver", callback_data="volver_mochila")])
+    
+    await callback.message.edit_text(texto, reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard), parse_mode="Markdown")
+
@@ -1,11 +1,11 @@
 import asyncio
 import logging
+import signal
 import sys
 
 from aiogram import Bot, Dispatcher, BaseMiddleware
 from aiogram.enums.parse_mode import ParseMode
 from aiogram.client.bot import DefaultBotProperties
-from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.types import ErrorEvent
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
@@ -42,7 +42,14 @@ class DBSessionMiddleware(BaseMiddleware):
 # Imports
 from mybot.database.setup import init_db, get_session_factory
 from utils.message_safety import patch_message_methods
-from utils.config import BOT_TOKEN, VIP_CHANNEL_ID
+from utils.config import BOT_TOKEN, VIP_CHANNEL_ID, BOT_RUN_MODE, WORKER_COUNT, CACHE_BUS_BACKEND
+from utils.webhook_server import run_webhook
+from utils.fsm_storage import DatabaseStorage
+from utils.menu_state_store import menu_state_store
+from utils.cache_bus import cache_bus, PipeBusBackend, DatabaseBusBackend
+from utils.cluster import Supervisor, WorkerRuntime
+from utils.leader_lease import LeaderLease
+from services.leaderboard_service import LeaderboardService
 
 # Handlers imports
 from handlers import start, free_user, daily_gift, minigames, setup as setup_handlers
@@ -73,10 +80,18 @@ from services import (
     vip_subscription_scheduler,
     vip_membership_scheduler,
 )
-from services.scheduler import auction_monitor_scheduler, free_channel_cleanup_scheduler
+from services.scheduler import (
+    auction_monitor_scheduler,
+    free_channel_cleanup_scheduler,
+    narrative_analytics_scheduler,
+    mission_expiry_scheduler,
+    message_registry_cleanup_scheduler,
+    point_reconciliation_scheduler,
+    stats_snapshot_scheduler,
+)
 
 # Middlewares
-from middlewares import PointsMiddleware, UserRegistrationMiddleware
+from middlewares import PointsMiddleware, UserRegistrationMiddleware, UserSerializationMiddleware
 
 # --- MANEJO DE ERRORES GLOBAL ---
 async def global_error_handler(event: ErrorEvent) -> None:
@@ -132,11 +147,125 @@ class BackgroundTaskManager:
         
         logging.info("Todas las tareas cerradas")
 
+# --- CONSTRUCCIÓN DEL BOT ---
+def build_dispatcher(session_factory: async_sessionmaker[AsyncSession]) -> tuple[Bot, Dispatcher]:
+    """Crea el bot y el dispatcher con middlewares y routers registrados"""
+    logger = logging.getLogger(__name__)
+
+    # Configuración del bot
+    bot = Bot(
+        BOT_TOKEN, 
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML)
+    )
+    dp = Dispatcher(storage=DatabaseStorage(session_factory), session_factory=session_factory)
+
+    # Registrar manejo de errores PRIMERO
+    dp.error.register(global_error_handler)
+
+    # Serializar por usuario antes de abrir la sesión: la espera no ocupa conexión
+    dp.update.outer_middleware(UserSerializationMiddleware())
+
+    # --- MIDDLEWARE DE SESIÓN ---
+    session_middleware = DBSessionMiddleware(session_factory)
+    dp.update.outer_middleware(session_middleware)
+
+    # Configurar middlewares en orden correcto
+    user_reg_middleware = UserRegistrationMiddleware()
+    points_middleware = PointsMiddleware()
+
+    # Middlewares outer (se ejecutan después de session_middleware)
+    dp.update.outer_middleware(user_reg_middleware)
+
+    # Middleware de puntos (inner)
+    dp.message.middleware(points_middleware)
+    dp.poll_answer.middleware(points_middleware)
+    dp.message_reaction.middleware(points_middleware)
+
+    # Registrar routers en orden de prioridad
+    logger.info("Registrando handlers...")
+    routers = [
+        ("setup", setup_handlers.router),
+        ("admin", admin_router),
+        ("auction_admin", auction_admin_router),
+        ("start_token", start_token),
+        ("start", start.router),
+        ("main_menu", main_menu_router),
+        ("backpack", backpack_router),
+        ("missions", missions_router),
+        ("info", info_router),
+        ("free_channel_admin", free_channel_admin_router),
+        ("publication_test", publication_test_router),
+        ("vip_menu", vip.router),
+        ("auction_user", auction_user_router),
+        ("reaction_callback", reaction_callback_router),
+        ("daily_gift", daily_gift.router),
+        ("minigames", minigames.router),
+        ("gamification", gamification.router),
+        ("free_user", free_user.router),
+        ("lore", lore_router),
+        ("combinar_pistas", combinar_pistas.router),
+        ("channel_access", channel_access_router),
+        ("narrative", narrative_router),
+        ("admin_narrative", admin_narrative_handlers),
+    ]
+    
+    for name, router in routers:
+        dp.include_router(router)
+        logger.info(f"Router {name} registrado")
+
+    return bot, dp
+
+
+def start_schedulers(task_manager: BackgroundTaskManager, bot: Bot, session_factory: async_sessionmaker[AsyncSession]) -> None:
+    """Arranca los schedulers en segundo plano"""
+    logging.getLogger(__name__).info("Iniciando tareas en segundo plano...")
+    task_manager.add_task(
+        channel_request_scheduler(bot, session_factory), 
+        "channel_requests"
+    )
+    task_manager.add_task(
+        vip_subscription_scheduler(bot, session_factory), 
+        "vip_subscriptions"
+    )
+    task_manager.add_task(
+        vip_membership_scheduler(bot, session_factory), 
+        "vip_memberships"
+    )
+    task_manager.add_task(
+        auction_monitor_scheduler(bot, session_factory), 
+        "auction_monitor"
+    )
+    task_manager.add_task(
+        free_channel_cleanup_scheduler(bot, session_factory), 
+        "channel_cleanup"
+    )
+    task_manager.add_task(
+        narrative_analytics_scheduler(bot, session_factory),
+        "narrative_analytics"
+    )
+    task_manager.add_task(
+        mission_expiry_scheduler(bot, session_factory),
+        "mission_expiry"
+    )
+    task_manager.add_task(
+        message_registry_cleanup_scheduler(bot, session_factory),
+        "message_registry_cleanup"
+    )
+    task_manager.add_task(
+        point_reconciliation_scheduler(bot, session_factory),
+        "point_reconciliation"
+    )
+    task_manager.add_task(
+        stats_snapshot_scheduler(bot, session_factory),
+        "stats_snapshot"
+    )
+
 # --- FUNCIÓN PRINCIPAL MEJORADA ---
 async def main() -> None:
     """Función principal con manejo robusto de errores"""
     setup_logging()
     logger = logging.getLogger(__name__)
+    task_manager = BackgroundTaskManager()
     
     try:
         # Inicialización
@@ -147,96 +276,33 @@ async def main() -> None:
         patch_message_methods()
         
         session_factory = get_session_factory()
+        menu_state_store.configure(session_factory)
         
         logger.info(f"VIP channel ID: {VIP_CHANNEL_ID}")
         logger.info("Configurando bot...")
+        bot, dp = build_dispatcher(session_factory)
+        allowed_updates = dp.resolve_used_update_types()
 
-        # Configuración del bot
-        bot = Bot(
-            BOT_TOKEN, 
-            default=DefaultBotProperties(parse_mode=ParseMode.HTML)
-        )
-        dp = Dispatcher(storage=MemoryStorage(), session_factory=session_factory)
-
-        # Registrar manejo de errores PRIMERO
-        dp.error.register(global_error_handler)
-
-        # --- MIDDLEWARE DE SESIÓN ---
-        session_middleware = DBSessionMiddleware(session_factory)
-        dp.update.outer_middleware(session_middleware)  # Registrar PRIMERO
-
-        # Configurar middlewares en orden correcto
-        user_reg_middleware = UserRegistrationMiddleware()
-        points_middleware = PointsMiddleware()
-
-        # Middlewares outer (se ejecutan después de session_middleware)
-        dp.update.outer_middleware(user_reg_middleware)
-
-        # Middleware de puntos (inner)
-        dp.message.middleware(points_middleware)
-        dp.poll_answer.middleware(points_middleware)
-        dp.message_reaction.middleware(points_middleware)
-
-        # Registrar routers en orden de prioridad
-        logger.info("Registrando handlers...")
-        routers = [
-            ("setup", setup_handlers.router),
-            ("admin", admin_router),
-            ("auction_admin", auction_admin_router),
-            ("start_token", start_token),
-            ("start", start.router),
-            ("main_menu", main_menu_router),
-            ("backpack", backpack_router),
-            ("missions", missions_router),
-            ("info", info_router),
-            ("free_channel_admin", free_channel_admin_router),
-            ("publication_test", publication_test_router),
-            ("vip_menu", vip.router),
-            ("auction_user", auction_user_router),
-            ("reaction_callback", reaction_callback_router),
-            ("daily_gift", daily_gift.router),
-            ("minigames", minigames.router),
-            ("gamification", gamification.router),
-            ("free_user", free_user.router),
-            ("lore", lore_router),
-            ("combinar_pistas", combinar_pistas.router),
-            ("channel_access", channel_access_router),
-            ("narrative", narrative_router),
-            ("admin_narrative", admin_narrative_handlers),
-        ]
-        
-        for name, router in routers:
-            dp.include_router(router)
-            logger.info(f"Router {name} registrado")
+        if WORKER_COUNT > 1:
+            # El supervisor solo reparte: los workers procesan y ejecutan schedulers
+            logger.info(f"Modo multi-worker: {WORKER_COUNT} procesos")
+            await Supervisor(bot, run_worker, WORKER_COUNT, allowed_updates).run()
+            return
+
+        async with session_factory() as session:
+            await LeaderboardService(session).warm_up()
 
         # Configurar tareas en segundo plano
-        task_manager = BackgroundTaskManager()
-        
-        logger.info("Iniciando tareas en segundo plano...")
-        task_manager.add_task(
-            channel_request_scheduler(bot, session_factory), 
-            "channel_requests"
-        )
-        task_manager.add_task(
-            vip_subscription_scheduler(bot, session_factory), 
-            "vip_subscriptions"
-        )
-        task_manager.add_task(
-            vip_membership_scheduler(bot, session_factory), 
-            "vip_memberships"
-        )
-        task_manager.add_task(
-            auction_monitor_scheduler(bot, session_factory), 
-            "auction_monitor"
-        )
-        task_manager.add_task(
-            free_channel_cleanup_scheduler(bot, session_factory), 
-            "channel_cleanup"
-        )
-
-        # Iniciar polling
-        logger.info("Bot iniciado correctamente. Comenzando polling...")
-        await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+        start_schedulers(task_manager, bot, session_factory)
+
+        if BOT_RUN_MODE == "webhook":
+            logger.info("Bot iniciado correctamente. Atendiendo webhook...")
+            await run_webhook(dp, bot, allowed_updates)
+        else:
+            # Iniciar polling
+            logger.info("Bot iniciado correctamente. Comenzando polling...")
+            await bot.delete_webhook()
+            await dp.start_polling(bot, allowed_updates=allowed_updates)
         
     except Exception as e:
         logger.critical(f"Error crítico en main(): {e}", exc_info=True)
@@ -245,11 +311,69 @@ async def main() -> None:
         logger.info("Cerrando bot...")
         try:
             await task_manager.shutdown()
+            await menu_state_store.flush()
             if 'bot' in locals():
                 await bot.session.close()
         except Exception as e:
             logger.error(f"Error durante el cierre: {e}", exc_info=True)
 
+
+# --- WORKER (MODO MULTI-WORKER) ---
+async def worker_main(index: int, count: int, conn) -> None:
+    """Procesa las actualizaciones que el supervisor asigna a este worker"""
+    setup_logging()
+    logger = logging.getLogger(__name__)
+
+    await init_db()
+    patch_message_methods()
+    session_factory = get_session_factory()
+    menu_state_store.configure(session_factory)
+
+    background = BackgroundTaskManager()
+    if CACHE_BUS_BACKEND == "db":
+        backend = DatabaseBusBackend(session_factory)
+        background.add_task(backend.run(), "cache_bus")
+    else:
+        backend = PipeBusBackend(conn)
+    cache_bus.configure(index, count, backend)
+
+    bot, dp = build_dispatcher(session_factory)
+    async with session_factory() as session:
+        await LeaderboardService(session).warm_up()
+    workflow_data = {"dispatcher": dp, "bots": [bot], **dp.workflow_data}
+
+    schedulers = BackgroundTaskManager()
+
+    async def on_elected():
+        start_schedulers(schedulers, bot, session_factory)
+
+    async def on_demoted():
+        await schedulers.shutdown()
+        schedulers.tasks.clear()
+
+    lease = LeaderLease(session_factory, holder=cache_bus.origin)
+    background.add_task(lease.run(on_elected, on_demoted), "scheduler_lease")
+
+    runtime = WorkerRuntime(conn, dp, bot, **workflow_data)
+    await dp.emit_startup(bot=bot, **workflow_data)
+    logger.info(f"Worker {index}/{count} listo")
+    try:
+        await runtime.run()
+    finally:
+        await background.shutdown()
+        await menu_state_store.flush()
+        await dp.emit_shutdown(bot=bot, **workflow_data)
+        await bot.session.close()
+        logger.info(f"Worker {index} detenido ({runtime.processed} actualizaciones)")
+
+
+def run_worker(index: int, count: int, conn) -> None:
+    """Punto de entrada de cada proceso worker"""
+    # El supervisor decide cuándo parar: ignorar las señales del grupo de procesos
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    asyncio.run(worker_main(index, count, conn))
+
 # --- PUNTO DE ENTRADA ---
 if __name__ == "__main__":
     try:
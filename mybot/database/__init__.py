@@ -1,4 +1,5 @@
 # database/__init__.py
 from .models import User
+from .hint_combination import HintCombination
 
-__all__ = ['User']
+__all__ = ['User', 'HintCombination']
@@ -1,14 +1,36 @@
+import hashlib
+from typing import Iterable, List
+
 from sqlalchemy import Column, Integer, String, DateTime, func
-from sqlalchemy.ext.asyncio import AsyncAttrs
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import validates
+
+from .base import Base
+
+
+def canonical_hints(codes: Iterable[str]) -> List[str]:
+    """Forma canónica de un conjunto de pistas: códigos sin espacios, únicos y ordenados."""
+    if isinstance(codes, str):
+        codes = codes.split(",")
+    return sorted({code.strip() for code in codes if code and code.strip()})
 
-Base = declarative_base()
 
-class HintCombination(AsyncAttrs, Base):
+def compute_hints_key(codes: Iterable[str]) -> str:
+    """Hash estable de la forma canónica, usado como clave de búsqueda."""
+    return hashlib.sha1(",".join(canonical_hints(codes)).encode("utf-8")).hexdigest()
+
+
+class HintCombination(Base):
     __tablename__ = "hint_combinations"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     combination_code = Column(String, unique=True, nullable=False)  # Código que representa la combinación correcta
     required_hints = Column(String, nullable=False)  # IDs o códigos separados por coma, ejemplo: "2,4,7"
+    hints_key = Column(String(40), unique=True, index=True, nullable=False)  # sha1 de required_hints canónico
     reward_code = Column(String, nullable=False)  # Código de la pista o recompensa que se desbloquea
     created_at = Column(DateTime, default=func.now())
+
+    @validates("required_hints")
+    def _normalize_required_hints(self, key, value):
+        codes = canonical_hints(value)
+        self.hints_key = compute_hints_key(codes)
+        return ",".join(codes)
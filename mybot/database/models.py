@@ -16,7 +16,6 @@ from sqlalchemy import (
 from sqlalchemy.orm import relationship
 from uuid import uuid4
 from sqlalchemy.sql import func
-from sqlalchemy.future import select
 import enum
 from .base import Base
 from sqlalchemy import Column, BigInteger, String, Float, Integer, JSON, DateTime
@@ -41,6 +40,7 @@ class User(Base):
     points = Column(Float, default=0)
     level = Column(Integer, default=1)
     achievements = Column(JSON, default={})
+    # Legacy: completions now live in UserMissionCompletion (migrated on demand)
     missions_completed = Column(JSON, default={})
     last_daily_mission_reset = Column(DateTime, default=func.now())
     last_weekly_mission_reset = Column(DateTime, default=func.now())
@@ -158,6 +158,40 @@ class UserMissionEntry(Base):
 
     __table_args__ = (UniqueConstraint("user_id", "mission_id", name="uix_user_mission_entry"),)
 
+
+class UserMissionCompletion(Base):
+    """One row per user, mission and reset period in which the mission was completed."""
+
+    __tablename__ = "user_mission_completions"
+    user_id = Column(BigInteger, ForeignKey("users.id"), primary_key=True)
+    mission_id = Column(String, ForeignKey("missions.id"), primary_key=True)
+    period_start = Column(DateTime, primary_key=True)
+    completed_at = Column(DateTime, default=func.now())
+
+
+class MissionExpiry(Base):
+    """Expiry time of missions that stop being available (posts, timed challenges)."""
+
+    __tablename__ = "mission_expiries"
+    mission_id = Column(String, ForeignKey("missions.id"), primary_key=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class ArchivedMission(Base):
+    """Summary of an expired mission after its rows were compacted."""
+
+    __tablename__ = "archived_missions"
+    mission_id = Column(String, primary_key=True)
+    name = Column(String, nullable=False)
+    type = Column(String, nullable=True)
+    reward_points = Column(Integer, default=0)
+    action_data = Column(JSON, nullable=True)
+    created_at = Column(DateTime, nullable=True)
+    expired_at = Column(DateTime, nullable=True)
+    archived_at = Column(DateTime, default=func.now())
+    participants = Column(Integer, default=0)
+    completions = Column(Integer, default=0)
+
 class Event(Base):
     __tablename__ = "events"
     id = Column(Integer, primary_key=True, autoincrement=True)
@@ -370,6 +404,82 @@ class ButtonReaction(Base):
     created_at = Column(DateTime, default=func.now())
 
 
+class ReactionBucket(Base):
+    """Reactions made by a user during one hour, for sliding-window rankings."""
+
+    __tablename__ = "reaction_buckets"
+
+    user_id = Column(BigInteger, ForeignKey("users.id"), primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True, index=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class PointTransaction(Base):
+    """Append-only ledger of every change to ``User.points``."""
+
+    __tablename__ = "point_transactions"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(BigInteger, ForeignKey("users.id"), nullable=False, index=True)
+    amount = Column(Float, nullable=False)
+    source = Column(String, nullable=False)
+    balance_after = Column(Float, nullable=True)
+    created_at = Column(DateTime, default=func.now(), index=True)
+
+
+class StatsSnapshot(Base):
+    """Precomputed aggregates served to the admin panel."""
+
+    __tablename__ = "stats_snapshots"
+
+    name = Column(String, primary_key=True)
+    data = Column(JSON, nullable=False)
+    computed_at = Column(DateTime, nullable=False)
+
+
+class FSMRecord(Base):
+    """FSM state and data of a conversation, shared by every bot process."""
+
+    __tablename__ = "fsm_records"
+
+    key = Column(String, primary_key=True)
+    state = Column(String, nullable=True)
+    data = Column(Text, nullable=True)
+    updated_at = Column(DateTime, default=func.now(), index=True)
+
+
+class SchedulerLease(Base):
+    """Lease held by the worker that runs the background schedulers."""
+
+    __tablename__ = "scheduler_leases"
+
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+
+class CacheEvent(Base):
+    """Cache invalidation broadcast to the other workers (database bus)."""
+
+    __tablename__ = "cache_events"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    channel = Column(String, nullable=False)
+    payload = Column(JSON, nullable=True)
+    origin = Column(String, nullable=False)
+    created_at = Column(DateTime, default=func.now(), index=True)
+
+
+class SentMessage(Base):
+    """Interactive messages sent by the bot, used to validate button callbacks."""
+
+    __tablename__ = "sent_messages"
+
+    chat_id = Column(BigInteger, primary_key=True)
+    message_id = Column(BigInteger, primary_key=True)
+    created_at = Column(DateTime, default=func.now(), index=True)
+
+
 # NEW AUCTION SYSTEM MODELS
 class Auction(Base):
     """Real-time auction system."""
@@ -474,22 +584,32 @@ class UserLorePiece(Base):
     )
 
 
+class UserMenuState(Base):
+    """Active menu message and navigation history of a user (see utils.menu_state_store)."""
+
+    __tablename__ = "user_menu_states"
+
+    user_id = Column(BigInteger, ForeignKey("users.id"), primary_key=True)
+    menu_state = Column(String, nullable=True)
+    chat_id = Column(BigInteger, nullable=True)
+    message_id = Column(BigInteger, nullable=True)
+    history = Column(JSON, nullable=True)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
 
 # Funciones para manejar el estado del menú del usuario
 async def get_user_menu_state(session, user_id: int) -> str:
-    result = await session.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
-    if user and user.menu_state:
-        return user.menu_state
-    return "root"
+    from utils.menu_state_store import menu_state_store
+
+    entry = await menu_state_store.get(user_id)
+    return entry.menu_state or "root"
 
 
 async def set_user_menu_state(session, user_id: int, state: str):
-    user = await session.get(User, user_id)
-    if user:
-        user.menu_state = state
-        await session.commit()
-        await session.refresh(user)
+    # Se guarda en lote con el resto del estado del menú, sin commit por clic
+    from utils.menu_state_store import menu_state_store
+
+    await menu_state_store.set_state(user_id, state)
 
 class Trivia(Base):
     __tablename__ = "trivias"
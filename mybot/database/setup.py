@@ -17,8 +17,10 @@ TABLES_ORDER = [
     'user_narrative_states',
     'user_decisions',
     'narrative_metrics',
+    'narrative_fragment_summaries',
     'rewards',
     'lore_pieces',
+    'hint_combinations',
     'missions',
     'events',
     'raffles',
@@ -38,6 +40,9 @@ TABLES_ORDER = [
     'user_rewards',
     'user_achievements',
     'user_mission_entries',
+    'user_mission_completions',
+    'mission_expiries',
+    'archived_missions',
     'raffle_entries',
     'user_badges',
     'vip_subscriptions',
@@ -45,6 +50,14 @@ TABLES_ORDER = [
     'tokens',
     'user_challenge_progress',
     'button_reactions',
+    'reaction_buckets',
+    'point_transactions',
+    'sent_messages',
+    'stats_snapshots',
+    'fsm_records',
+    'user_menu_states',
+    'scheduler_leases',
+    'cache_events',
     'bids',
     'auction_participants',
     'minigame_play',
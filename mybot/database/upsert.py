@@ -0,0 +1,17 @@
+# database/upsert.py
+"""Dialect-specific INSERT constructs that support ON CONFLICT clauses."""
+from typing import Callable, Optional
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+_UPSERT_DIALECTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def upsert_insert(session: AsyncSession) -> Optional[Callable]:
+    """Return the ``insert`` supporting ``on_conflict_do_*`` for the session's
+    database, or ``None`` when the engine has no such construct."""
+    return _UPSERT_DIALECTS.get(session.get_bind().dialect.name)
@@ -4,6 +4,7 @@ Enhanced admin menu with improved navigation and multi-tenant support.
 from aiogram import Router, F, Bot
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import CommandStart, Command
+from aiogram.utils.keyboard import InlineKeyboardBuilder
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from keyboards.admin_main_kb import get_admin_main_kb
@@ -11,13 +12,14 @@ from utils.user_roles import is_admin
 from utils.menu_manager import menu_manager
 from utils.menu_factory import menu_factory
 from services.tenant_service import TenantService
-from services import get_admin_statistics
+from services.stats_snapshot_service import StatsSnapshotService, format_snapshot_age
 from database.models import Tariff, Token
 from uuid import uuid4
 from sqlalchemy import select
 from utils.messages import BOT_MESSAGES
 from utils.keyboard_utils import get_admin_manage_content_keyboard # Importar la función del teclado
 from backpack import desbloquear_pista_narrativa
+from services.lore_grant_service import LoreGrantService
 
 import logging
 
@@ -77,18 +79,19 @@ async def admin_menu(message: Message, session: AsyncSession, user_id: int | Non
             auto_delete_seconds=5
         )
 
-@router.callback_query(F.data == "admin_stats")
+@router.callback_query(F.data.in_({"admin_stats", "admin_stats_refresh"}))
 async def admin_stats(callback: CallbackQuery, session: AsyncSession):
     """Enhanced admin statistics with better formatting."""
     if not await is_admin(callback.from_user.id, session):
         return await callback.answer("Acceso denegado", show_alert=True)
     
     try:
-        stats = await get_admin_statistics(session)
-        
-        # Get additional tenant-specific stats
-        tenant_service = TenantService(session)
-        tenant_summary = await tenant_service.get_tenant_summary(callback.from_user.id)
+        # Served from the precomputed snapshot; "Recalcular" forces a refresh
+        snapshot_service = StatsSnapshotService(session)
+        if callback.data == "admin_stats_refresh":
+            stats, computed_at = await snapshot_service.refresh()
+        else:
+            stats, computed_at = await snapshot_service.get_snapshot()
         
         text_lines = [
             "📊 **Estadísticas del Sistema**",
@@ -102,22 +105,23 @@ async def admin_stats(callback: CallbackQuery, session: AsyncSession):
             "💰 **Ingresos**",
             f"• Total recaudado: ${stats.get('revenue_total', 0)}",
             "",
-            "⚙️ **Configuración**"
+            "⚙️ **Configuración**",
+            f"• Canal VIP: {'✅' if stats.get('vip_channel_configured') else '❌'}",
+            f"• Canal Gratuito: {'✅' if stats.get('free_channel_configured') else '❌'}",
+            f"• Tarifas configuradas: {stats.get('tariff_count', 0)}",
+            f"• Solicitudes pendientes (canal gratuito): {stats.get('free_requests_pending', 0)}",
+            "",
+            f"🕒 _Actualizado {format_snapshot_age(computed_at)}_",
         ]
         
-        if "error" not in tenant_summary:
-            channels = tenant_summary.get("channels", {})
-            text_lines.extend([
-                f"• Canal VIP: {'✅' if channels.get('vip_channel_id') else '❌'}",
-                f"• Canal Gratuito: {'✅' if channels.get('free_channel_id') else '❌'}",
-                f"• Tarifas configuradas: {tenant_summary.get('tariff_count', 0)}"
-            ])
-        
-        from keyboards.common import get_back_kb
+        builder = InlineKeyboardBuilder()
+        builder.button(text="🔄 Recalcular", callback_data="admin_stats_refresh")
+        builder.button(text="🔙 Volver", callback_data="admin_main_menu")
+        builder.adjust(1)
         await menu_manager.update_menu(
             callback,
             "\n".join(text_lines),
-            get_back_kb("admin_main_menu"),
+            builder.as_markup(),
             session,
             "admin_stats",
         )
@@ -358,7 +362,7 @@ async def admin_free_channel_redirect(callback: CallbackQuery, session: AsyncSes
 
 
 @router.message(F.text.startswith("/give_hint "))
-async def cmd_give_hint(message: Message):
+async def cmd_give_hint(message: Message, session: AsyncSession):
     """Comando de admin para dar una pista a un usuario."""
     if not await is_admin(message.from_user.id, session):
         await message.answer(
@@ -378,6 +382,7 @@ async def cmd_give_hint(message: Message):
                 target_user_id,
                 hint_code_to_give,
                 {"source": "admin_command", "admin_id": message.from_user.id},
+                session=session,
             )
 
             if success:
@@ -400,3 +405,72 @@ async def cmd_give_hint(message: Message):
             "❌ Uso incorrecto. Formato: <code>/give_hint <user_id> <hint_code></code>",
             parse_mode="HTML",
         )
+
+
+@router.message(F.text.startswith("/grant_hint "))
+async def cmd_grant_hint(message: Message, session: AsyncSession):
+    """Concede una pista a un segmento: /grant_hint <hint_code> (all | [users=1,2] [role=vip] [level=2-5])"""
+    if not await is_admin(message.from_user.id, session):
+        await message.answer(
+            "❌ **Acceso Denegado**\n\nNo tienes permisos para usar este comando.",
+            parse_mode="HTML",
+        )
+        return
+
+    usage = (
+        "❌ Uso incorrecto. Formato: "
+        "<code>/grant_hint &lt;hint_code&gt; [users=1,2,3] [role=vip] [level=2-5]</code> "
+        "o <code>/grant_hint &lt;hint_code&gt; all</code> para todos los usuarios"
+    )
+    parts = message.text.split()
+    if len(parts) < 2:
+        await message.answer(usage, parse_mode="HTML")
+        return
+
+    hint_code = parts[1]
+    filters = {}
+    everyone = False
+    try:
+        for option in parts[2:]:
+            if option == "all":
+                everyone = True
+                continue
+            key, value = option.split("=", 1)
+            if key == "users":
+                filters["user_ids"] = [int(uid) for uid in value.split(",") if uid]
+            elif key == "role":
+                filters["role"] = value
+            elif key == "level":
+                low, dash, high = value.partition("-")
+                filters["min_level"] = int(low) if low else None
+                if dash:
+                    # Rango abierto: "2-" es 2 o más, "-5" es hasta 5
+                    filters["max_level"] = int(high) if high else None
+                else:
+                    filters["max_level"] = filters["min_level"]
+            else:
+                raise ValueError(key)
+    except ValueError:
+        await message.answer(usage, parse_mode="HTML")
+        return
+    # Sin filtros se concedería a todos: hay que pedirlo de forma explícita
+    if not everyone and all(value is None for value in filters.values()):
+        await message.answer(usage, parse_mode="HTML")
+        return
+
+    result = await LoreGrantService(session, message.bot).grant_to_segment(
+        hint_code,
+        context={"source": "admin_grant", "admin_id": message.from_user.id},
+        origen="un regalo de Diana",
+        **filters,
+    )
+    if result is None:
+        await message.answer(f"⚠️ La pista '<b>{hint_code}</b>' no existe.", parse_mode="HTML")
+        return
+
+    await message.answer(
+        f"✅ Pista '<b>{hint_code}</b>' concedida a <b>{result['granted']}</b> usuarios "
+        f"({result['targeted'] - result['granted']} ya la tenían). "
+        "Las notificaciones se envían en segundo plano.",
+        parse_mode="HTML",
+    )
@@ -142,10 +142,10 @@ async def process_points_amount(message: Message, state: FSMContext, session: As
     op = data.get("points_operation")
     service = PointService(session)
     if op == "add":
-        await service.add_points(user_id, amount)
+        await service.add_points(user_id, amount, source="admin")
         await message.answer(f"Se han sumado {amount} puntos a {user_id}.")
     else:
-        await service.deduct_points(user_id, amount)
+        await service.deduct_points(user_id, amount, source="admin")
         await message.answer(f"Se han restado {amount} puntos a {user_id}.")
     await state.clear()
 
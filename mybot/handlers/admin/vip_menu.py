@@ -27,11 +27,11 @@ from services import (
     SubscriptionService,
     ConfigService,
     TokenService,
-    get_admin_statistics,
     BadgeService,
     AchievementService,
     MissionService,
 )
+from services.stats_snapshot_service import StatsSnapshotService, format_snapshot_age
 from database.models import User, Tariff
 from utils.message_utils import get_profile_message
 from utils.text_utils import sanitize_text
@@ -173,7 +173,7 @@ async def vip_stats(callback: CallbackQuery, session: AsyncSession):
     if not await is_admin(callback.from_user.id, session):
         return await callback.answer()
     
-    stats = await get_admin_statistics(session)
+    stats, computed_at = await StatsSnapshotService(session).get_snapshot()
     
     # Get token statistics
     stmt = select(Tariff)
@@ -188,6 +188,7 @@ async def vip_stats(callback: CallbackQuery, session: AsyncSession):
         f"✅ **Activas:** {stats['subscriptions_active']}",
         f"❌ **Expiradas:** {stats['subscriptions_expired']}",
         f"💰 **Ingresos totales:** ${stats.get('revenue_total', 0)}",
+        f"🕒 _Actualizado {format_snapshot_age(computed_at)}_",
         "",
         "📋 **Tarifas disponibles:**"
     ]
@@ -58,7 +58,7 @@ async def play_dice(message: Message, session: AsyncSession, bot: Bot):
         return
     dice_msg = await bot.send_dice(message.chat.id)
     score = dice_msg.dice.value
-    await PointService(session).add_points(message.from_user.id, score, bot=bot)
+    await PointService(session).add_points(message.from_user.id, score, bot=bot, source="minigame")
     await message.answer(BOT_MESSAGES.get("dice_points", "Ganaste {points} puntos").format(points=score))
 
 @router.message(F.text.regexp("/trivia"))
@@ -80,7 +80,7 @@ async def trivia_answer(callback: CallbackQuery, session: AsyncSession, bot: Bot
     if (await config.get_value("minigames_enabled")) == "false":
         return await callback.answer(BOT_MESSAGES.get("minigames_disabled", "Minijuegos deshabilitados."), show_alert=True)
     if callback.data == "trivia_correct":
-        await PointService(session).add_points(callback.from_user.id, 5, bot=bot)
+        await PointService(session).add_points(callback.from_user.id, 5, bot=bot, source="minigame")
         await callback.message.edit_text(BOT_MESSAGES.get("trivia_correct", "¡Correcto! +5 puntos"))
     else:
         await callback.message.edit_text(BOT_MESSAGES.get("trivia_wrong", "Respuesta incorrecta."))
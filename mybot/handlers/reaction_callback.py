@@ -37,7 +37,7 @@ async def handle_reaction_callback(
         return await callback.answer()
 
     chat_id = callback.message.chat.id
-    valid = validate_message(chat_id, message_id)
+    valid = await validate_message(session, chat_id, message_id)
     logger.info(
         "Edit attempt chat_id=%s message_id=%s valid=%s", chat_id, message_id, valid
     )
@@ -69,7 +69,7 @@ async def handle_reaction_callback(
     points_dict = await channel_service.get_reaction_points(channel_id)
     points = float(points_dict.get(reaction_type, 0.0))
 
-    await PointService(session).add_points(callback.from_user.id, points, bot=bot)
+    await PointService(session).add_points(callback.from_user.id, points, bot=bot, source="reaction")
     from services.mission_service import MissionService
     mission_service = MissionService(session)
     await mission_service.update_progress(callback.from_user.id, "reaction", bot=bot)
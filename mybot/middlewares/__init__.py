@@ -1,7 +1,9 @@
 from .points_middleware import PointsMiddleware
 from .user_middleware import UserRegistrationMiddleware
+from .serialization_middleware import UserSerializationMiddleware
 
 __all__ = [
     "PointsMiddleware",
     "UserRegistrationMiddleware",
+    "UserSerializationMiddleware",
 ]
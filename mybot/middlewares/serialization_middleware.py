@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from utils.cluster import update_user_id
+from utils.config import USER_UPDATE_QUEUE_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Updates processed between two stats log lines
+SERIALIZATION_LOG_EVERY = 1000
+
+
+class _UserSlot:
+    __slots__ = ("lock", "pending")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.pending = 0  # updates running or waiting for this user
+
+
+class UserSerializationMiddleware(BaseMiddleware):
+    """Procesa las actualizaciones de cada usuario de una en una.
+
+    - Un doble toque en "pujar" o "reclamar" ya no ejecuta dos handlers a la vez
+      sobre los mismos puntos; usuarios distintos siguen en paralelo
+    - Como mucho ``queue_size`` actualizaciones esperan detrás de la que está en
+      curso; las que sobran se descartan
+    - Con varios workers basta un candado por proceso: cada usuario se enruta
+      siempre al mismo worker
+    """
+
+    def __init__(self, queue_size: int = USER_UPDATE_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._slots: Dict[int, _UserSlot] = {}
+        self.processed = 0
+        self.contended = 0
+        self.overflowed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """Esperas por el candado y descartes desde el arranque."""
+        return {
+            "processed": self.processed,
+            "contended": self.contended,
+            "overflowed": self.overflowed,
+            "avg_wait_ms": round(self.total_wait / self.contended * 1000, 1) if self.contended else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+            "active_users": len(self._slots),
+        }
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Any],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        user_id = update_user_id(event)
+        if user_id is None:
+            return await handler(event, data)
+
+        slot = self._slots.get(user_id)
+        if slot is None:
+            slot = self._slots[user_id] = _UserSlot()
+        if slot.pending > self.queue_size:
+            self.overflowed += 1
+            logger.warning(f"Dropping update {event.update_id}: {slot.pending} updates queued for user {user_id}")
+            if event.callback_query:
+                # Quitar el reloj del botón aunque no se procese
+                try:
+                    await event.callback_query.answer()
+                except Exception:
+                    pass
+            return None
+
+        slot.pending += 1
+        contended = slot.lock.locked()
+        queued_at = time.monotonic()
+        try:
+            async with slot.lock:
+                if contended:
+                    waited = time.monotonic() - queued_at
+                    self.contended += 1
+                    self.total_wait += waited
+                    self.max_wait = max(self.max_wait, waited)
+                return await handler(event, data)
+        finally:
+            slot.pending -= 1
+            if not slot.pending:
+                self._slots.pop(user_id, None)
+            self.processed += 1
+            if self.processed % SERIALIZATION_LOG_EVERY == 0:
+                logger.info(f"Per-user update serialization: {self.stats()}")
@@ -2,6 +2,7 @@
 Handlers administrativos para el sistema narrativo
 """
 import logging
+from datetime import datetime
 from aiogram import Router, F
 from aiogram.types import CallbackQuery, Message, InlineKeyboardButton
 from aiogram.filters import Command
@@ -13,6 +14,9 @@ from utils.menu_manager import menu_manager
 from .models import StoryFragment, UserNarrativeState, UserDecision, NarrativeMetrics
 from .narrative_service import NarrativeService
 from .keyboards import NarrativeKeyboards
+from .render_cache import clear_render_cache
+from .analytics import NarrativeAnalyticsService
+from .constants import ANALYTICS_TOP_FRAGMENTS
 
 logger = logging.getLogger(__name__)
 router = Router()
@@ -42,7 +46,7 @@ async def narrative_admin_command(message: Message, session: AsyncSession):
         "🎭 **Panel Admin - Sistema Narrativo**\n\n"
         f"👥 **Usuarios Totales**: {total_users}\n"
         f"🎮 **Usuarios Activos**: {active_users}\n"
-        f"📚 **Historias Cargadas**: {len(service.story_manager.stories)}\n\n"
+        f"📚 **Historias Disponibles**: {len(service.story_manager.available_stories())}\n\n"
         "Selecciona una acción:"
     )
     
@@ -68,3 +72,93 @@ async def narrative_admin_command(message: Message, session: AsyncSession):
         session,
         menu_state="narrative_admin_main"
     )
+
+
+@router.callback_query(F.data == "nadmin_reload")
+async def reload_stories(callback: CallbackQuery, session: AsyncSession):
+    """Recarga las historias y descarta los fragmentos renderizados en caché"""
+    if not await is_admin(callback.from_user.id, session):
+        await callback.answer("⛔ Acceso denegado", show_alert=True)
+        return
+    
+    service = NarrativeService(session)
+    service.story_manager.reload()
+    clear_render_cache()
+    
+    await callback.answer(
+        f"🔄 {len(service.story_manager.available_stories())} historias recargadas",
+        show_alert=True
+    )
+
+
+@router.callback_query(F.data == "nadmin_stats")
+async def narrative_stats(callback: CallbackQuery, session: AsyncSession):
+    """Embudo por historia leído de los resúmenes precalculados"""
+    if not await is_admin(callback.from_user.id, session):
+        await callback.answer("⛔ Acceso denegado", show_alert=True)
+        return
+    
+    from aiogram.utils.keyboard import InlineKeyboardBuilder
+    builder = InlineKeyboardBuilder()
+    builder.row(
+        InlineKeyboardButton(text="🔁 Recalcular", callback_data="nadmin_regenerate_metrics")
+    )
+    
+    analytics = NarrativeAnalyticsService(session)
+    computed_at = await analytics.get_last_computed_at()
+    if computed_at is None:
+        await menu_manager.update_menu(
+            callback,
+            "📊 **Analítica Narrativa**\n\nAún no hay analítica calculada. Usa 🔁 Recalcular.",
+            builder.as_markup(),
+            session,
+            "narrative_admin_stats"
+        )
+        return
+    
+    age_minutes = int((datetime.utcnow() - computed_at).total_seconds() // 60)
+    lines = ["📊 **Analítica Narrativa**", f"_Calculada hace {age_minutes} min_", ""]
+    
+    for story_id in analytics.story_manager.available_stories():
+        summaries = await analytics.get_story_summary(story_id)
+        if not summaries:
+            continue
+        lines.append(f"📖 **{story_id}**")
+        # Los resúmenes ya vienen ordenados por abandono: mostrar los puntos críticos
+        for summary in summaries[:ANALYTICS_TOP_FRAGMENTS]:
+            median = (
+                f"{summary.median_seconds_to_decide:.0f}s"
+                if summary.median_seconds_to_decide is not None else "—"
+            )
+            ratios = ", ".join(
+                f"{choice_id} {ratio:.0%}"
+                for choice_id, ratio in sorted(
+                    (summary.choice_ratios or {}).items(), key=lambda item: -item[1]
+                )
+            )
+            lines.append(
+                f"• `{summary.fragment_id}`: {summary.users_reached} alcanzan, "
+                f"abandono {summary.drop_off_rate:.0%}, mediana {median}"
+            )
+            if ratios:
+                lines.append(f"   ↳ {ratios}")
+        lines.append("")
+    
+    await menu_manager.update_menu(
+        callback,
+        "\n".join(lines),
+        builder.as_markup(),
+        session,
+        "narrative_admin_stats"
+    )
+
+
+@router.callback_query(F.data == "nadmin_regenerate_metrics")
+async def regenerate_metrics(callback: CallbackQuery, session: AsyncSession):
+    """Recalcula la analítica narrativa bajo demanda"""
+    if not await is_admin(callback.from_user.id, session):
+        await callback.answer("⛔ Acceso denegado", show_alert=True)
+        return
+    
+    count = await NarrativeAnalyticsService(session).rebuild_summaries()
+    await callback.answer(f"🔁 {count} fragmentos resumidos", show_alert=True)
@@ -0,0 +1,191 @@
+"""
+Analítica narrativa: embudos, abandono y proporciones de elección por fragmento
+
+El trabajo recorre ``UserDecision`` y ``UserNarrativeState`` en bloques (paginación
+por clave) y vuelca el resultado en ``NarrativeFragmentSummary``, que el panel
+admin lee directamente sin agregar nada en el momento.
+"""
+import logging
+import random
+import statistics
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import StoryFragment, UserDecision, UserNarrativeState, NarrativeFragmentSummary
+from .story_manager import StoryManager
+from .constants import ANALYTICS_CHUNK_SIZE, ANALYTICS_RESERVOIR_SIZE
+
+logger = logging.getLogger(__name__)
+
+FragmentKey = Tuple[str, str]  # (story_id, fragment_id)
+
+
+class _Reservoir:
+    """Muestra acotada para estimar la mediana sin guardar todos los valores"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.seen = 0
+        self.values: List[float] = []
+
+    def add(self, value: float) -> None:
+        self.seen += 1
+        if len(self.values) < self.size:
+            self.values.append(value)
+        else:
+            slot = random.randrange(self.seen)
+            if slot < self.size:
+                self.values[slot] = value
+
+    def median(self) -> Optional[float]:
+        return statistics.median(self.values) if self.values else None
+
+
+class NarrativeAnalyticsService:
+    """Calcula y consulta los resúmenes de analítica narrativa"""
+
+    def __init__(self, session: AsyncSession, chunk_size: int = ANALYTICS_CHUNK_SIZE):
+        self.session = session
+        self.chunk_size = chunk_size
+        self.story_manager = StoryManager()
+
+    async def rebuild_summaries(self) -> int:
+        """
+        Recalcula todos los resúmenes por fragmento
+        Returns: número de fragmentos resumidos
+        """
+        # Solo los IDs del índice: no se carga ningún paquete de historia
+        stories = set(self.story_manager.available_stories())
+
+        reached, stalled = await self._aggregate_states()
+        choice_counts, decide_times = await self._aggregate_decisions()
+
+        now = datetime.utcnow()
+        fragment_keys = set(reached) | set(choice_counts)
+        summaries = []
+        for key in fragment_keys:
+            story_id, fragment_id = key
+            if story_id not in stories:
+                continue
+            users_reached = reached.get(key, 0)
+            users_stalled = stalled.get(key, 0)
+            counts = choice_counts.get(key, Counter())
+            total_decisions = sum(counts.values())
+            reservoir = decide_times.get(key)
+            summaries.append(NarrativeFragmentSummary(
+                story_id=story_id,
+                fragment_id=fragment_id,
+                users_reached=users_reached,
+                users_stalled=users_stalled,
+                drop_off_rate=round(users_stalled / users_reached, 4) if users_reached else 0.0,
+                decisions_count=total_decisions,
+                choice_ratios={
+                    choice_id: round(count / total_decisions, 4)
+                    for choice_id, count in counts.items()
+                } if total_decisions else {},
+                median_seconds_to_decide=reservoir.median() if reservoir else None,
+                computed_at=now,
+            ))
+
+        # Reemplazo completo en una transacción: el panel nunca ve un resumen a medias
+        await self.session.execute(delete(NarrativeFragmentSummary))
+        self.session.add_all(summaries)
+        await self.session.commit()
+
+        logger.info(f"Narrative analytics rebuilt: {len(summaries)} fragment summaries")
+        return len(summaries)
+
+    async def get_story_summary(self, story_id: str) -> List[NarrativeFragmentSummary]:
+        """Resúmenes de una historia ordenados por tasa de abandono"""
+        result = await self.session.execute(
+            select(NarrativeFragmentSummary)
+            .where(NarrativeFragmentSummary.story_id == story_id)
+            .order_by(NarrativeFragmentSummary.drop_off_rate.desc())
+        )
+        return result.scalars().all()
+
+    async def get_last_computed_at(self) -> Optional[datetime]:
+        """Fecha del último cálculo disponible"""
+        result = await self.session.execute(
+            select(NarrativeFragmentSummary.computed_at).limit(1)
+        )
+        return result.scalar_one_or_none()
+
+    # Métodos privados auxiliares
+
+    async def _aggregate_states(self) -> Tuple[Counter, Counter]:
+        """Usuarios que alcanzaron cada fragmento y usuarios detenidos en él
+
+        Las claves son (story_id, fragment_id): cada usuario cuenta en su
+        ``active_story``, así los IDs repetidos entre historias no se mezclan.
+        """
+        reached: Counter = Counter()
+        stalled: Counter = Counter()
+        last_user_id = None
+        while True:
+            query = select(
+                UserNarrativeState.user_id,
+                UserNarrativeState.current_fragment_id,
+                UserNarrativeState.fragments_visited,
+                UserNarrativeState.completed_at,
+                UserNarrativeState.active_story,
+            ).order_by(UserNarrativeState.user_id).limit(self.chunk_size)
+            if last_user_id is not None:
+                query = query.where(UserNarrativeState.user_id > last_user_id)
+            rows = (await self.session.execute(query)).all()
+            if not rows:
+                break
+
+            for user_id, current_fragment_id, visited, completed_at, story_id in rows:
+                reached.update((story_id, fragment_id) for fragment_id in set(visited or []))
+                if current_fragment_id and completed_at is None:
+                    stalled[(story_id, current_fragment_id)] += 1
+            last_user_id = rows[-1][0]
+        return reached, stalled
+
+    async def _aggregate_decisions(self) -> Tuple[Dict[FragmentKey, Counter], Dict[FragmentKey, _Reservoir]]:
+        """Conteo de elecciones y tiempos entre decisiones consecutivas por fragmento"""
+        choice_counts: Dict[FragmentKey, Counter] = defaultdict(Counter)
+        decide_times: Dict[FragmentKey, _Reservoir] = {}
+        last_decision_at: Dict[Tuple[int, str], datetime] = {}
+        last_id = 0
+        while True:
+            # Orden por id ~ orden cronológico de inserción
+            rows = (await self.session.execute(
+                select(
+                    UserDecision.id,
+                    UserDecision.user_id,
+                    UserDecision.fragment_id,
+                    UserDecision.choice_id,
+                    UserDecision.made_at,
+                    # Registros anteriores a story_id: la historia del fragmento en BD, si existe
+                    func.coalesce(UserDecision.story_id, StoryFragment.story_id),
+                )
+                .outerjoin(StoryFragment, StoryFragment.id == UserDecision.fragment_id)
+                .where(UserDecision.id > last_id)
+                .order_by(UserDecision.id)
+                .limit(self.chunk_size)
+            )).all()
+            if not rows:
+                break
+
+            for _, user_id, fragment_id, choice_id, made_at, story_id in rows:
+                if story_id is None:
+                    continue
+                key = (story_id, fragment_id)
+                choice_counts[key][choice_id] += 1
+                # Tiempos dentro de la misma historia: cambiar de historia no cuenta
+                previous = last_decision_at.get((user_id, story_id))
+                if made_at:
+                    last_decision_at[(user_id, story_id)] = made_at
+                if previous and made_at and made_at >= previous:
+                    reservoir = decide_times.get(key)
+                    if reservoir is None:
+                        reservoir = decide_times[key] = _Reservoir(ANALYTICS_RESERVOIR_SIZE)
+                    reservoir.add((made_at - previous).total_seconds())
+            last_id = rows[-1][0]
+        return choice_counts, decide_times
@@ -0,0 +1,441 @@
+"""
+Compilador de contenido narrativo a bundles binarios versionados
+
+Las historias se editan en JSON (``narrative/data/*.json``) y opcionalmente se
+completan con filas ``StoryFragment`` de la base de datos. Este módulo valida
+esquema y grafo, interna las cadenas repetidas y genera un bundle por historia
+más un índice pequeño (``stories.index.json``). En tiempo de ejecución
+``StoryCatalog`` solo lee el índice al arrancar y carga cada bundle, sin volver
+a validar, la primera vez que se accede a la historia.
+
+Formato de cada bundle::
+
+    cabecera  <4sHHI>  magic, versión de formato, flags, longitud del payload
+    payload   JSON compacto comprimido con zlib:
+              {"build": {...}, "strings": [...], "stories": {id: {"meta": {...},
+               "fragments": [[campo, ...], ...]}}}
+
+Uso (desde el directorio ``mybot``)::
+
+    python -m narrative.compiler            # compila data/*.json a data/bundles/
+    python -m narrative.compiler --include-db --strict
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import struct
+import sys
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from .schemas import StorySchema, FragmentSchema, ChoiceSchema, RewardSchema
+from .constants import (
+    MAX_CHOICES_PER_FRAGMENT,
+    MAX_FRAGMENT_LENGTH,
+    STORY_BUNDLE_DIRNAME,
+    STORY_BUNDLE_FORMAT_VERSION,
+    STORY_INDEX_FILENAME,
+)
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_MAGIC = b"NSTB"
+_HEADER = struct.Struct("<4sHHI")
+
+# Orden posicional de los campos dentro del bundle
+FRAGMENT_FIELDS = (
+    "id", "type", "title", "narrator_text", "atmosphere_text", "next_fragment",
+    "choices", "rewards", "requirements", "vip_only", "image_url", "audio_url",
+    "chapter", "scene", "tags", "is_hidden", "unlock_hint",
+)
+CHOICE_FIELDS = ("id", "text", "next_fragment", "requirements", "effects", "hidden", "hint")
+INTERNED_FIELDS = {
+    "id", "type", "title", "narrator_text", "atmosphere_text", "next_fragment",
+    "image_url", "audio_url", "unlock_hint", "text", "hint",
+}
+
+
+class StoryCompileError(Exception):
+    """Error de validación al compilar historias"""
+
+    def __init__(self, errors: List[str]):
+        self.errors = errors
+        super().__init__("\n".join(errors))
+
+
+class _StringTable:
+    """Tabla de cadenas internadas: cada texto se guarda una sola vez"""
+
+    def __init__(self):
+        self.strings: List[str] = []
+        self._index: Dict[str, int] = {}
+
+    def intern(self, value: Optional[str]) -> Optional[int]:
+        if value is None:
+            return None
+        idx = self._index.get(value)
+        if idx is None:
+            idx = len(self.strings)
+            self.strings.append(value)
+            self._index[value] = idx
+        return idx
+
+
+# --- Entradas ---------------------------------------------------------------
+
+def read_json_sources(data_path: Path) -> Dict[str, Dict[str, Any]]:
+    """Lee todas las historias JSON del directorio de datos"""
+    sources: Dict[str, Dict[str, Any]] = {}
+    for filepath in sorted(data_path.glob("*.json")):
+        if filepath.name == STORY_INDEX_FILENAME:
+            continue
+        with open(filepath, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        story_id = data.get("id") or filepath.stem
+        if story_id in sources:
+            raise StoryCompileError([f"{filepath.name}: historia '{story_id}' duplicada"])
+        sources[story_id] = data
+    return sources
+
+
+async def read_db_fragments() -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """Lee fragmentos activos de la tabla story_fragments agrupados por historia"""
+    from sqlalchemy import select
+    from database.setup import init_db, get_session_factory
+    from .models import StoryFragment
+
+    await init_db()
+    session_factory = get_session_factory()
+    grouped: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    async with session_factory() as session:
+        result = await session.execute(
+            select(StoryFragment).where(StoryFragment.is_active == True)
+        )
+        for row in result.scalars().all():
+            grouped.setdefault(row.story_id, {})[row.id] = {
+                "id": row.id,
+                "type": row.fragment_type.value if row.fragment_type else "story",
+                "title": row.title,
+                "narrator_text": row.narrator_text,
+                "atmosphere_text": row.atmosphere_text,
+                "next_fragment": row.next_fragment,
+                "choices": row.choices or [],
+                "rewards": row.rewards or None,
+                "requirements": row.requirements or {},
+                "vip_only": bool(row.vip_only),
+                "image_url": row.image_url,
+                "audio_url": row.audio_url,
+                "chapter": row.chapter or 1,
+                "scene": row.scene or 1,
+                "is_hidden": bool(row.is_hidden),
+                "unlock_hint": row.unlock_hint,
+            }
+    return grouped
+
+
+# --- Validación -------------------------------------------------------------
+
+def validate_story(
+    story_id: str,
+    data: Dict[str, Any],
+    strict: bool = False
+) -> Tuple[Optional[StorySchema], List[str], List[str]]:
+    """
+    Valida esquema y grafo de una historia
+    Returns: (story, errores, advertencias)
+    """
+    errors: List[str] = []
+    warnings: List[str] = []
+
+    try:
+        story = StorySchema(**data)
+    except ValidationError as e:
+        for err in e.errors():
+            location = ".".join(str(part) for part in err["loc"])
+            errors.append(f"{story_id}: {location}: {err['msg']}")
+        return None, errors, warnings
+
+    fragments = story.fragments
+    graph_issues = errors if strict else warnings
+
+    if story.starting_fragment not in fragments:
+        errors.append(f"{story_id}: fragmento inicial '{story.starting_fragment}' no existe")
+
+    for frag_id, fragment in fragments.items():
+        where = f"{story_id}/{frag_id}"
+        if fragment.id != frag_id:
+            errors.append(f"{where}: la clave no coincide con el id '{fragment.id}'")
+        if len(fragment.narrator_text) > MAX_FRAGMENT_LENGTH:
+            errors.append(f"{where}: narrator_text supera {MAX_FRAGMENT_LENGTH} caracteres")
+
+        choices = fragment.choices or []
+        if fragment.type == "decision" and not choices:
+            errors.append(f"{where}: fragmento de decisión sin opciones")
+        if len(choices) > MAX_CHOICES_PER_FRAGMENT:
+            errors.append(f"{where}: más de {MAX_CHOICES_PER_FRAGMENT} opciones")
+        choice_ids = [c.id for c in choices]
+        if len(choice_ids) != len(set(choice_ids)):
+            errors.append(f"{where}: ids de opción duplicados")
+
+        targets = [("next_fragment", fragment.next_fragment)]
+        targets += [(f"choice '{c.id}'", c.next_fragment) for c in choices]
+        if fragment.rewards:
+            targets += [("unlock_fragments", f) for f in fragment.rewards.unlock_fragments or []]
+        for label, target in targets:
+            if target and target not in fragments:
+                graph_issues.append(f"{where}: {label} apunta a '{target}' que no existe")
+
+        if fragment.type != "ending" and not fragment.next_fragment and not choices:
+            warnings.append(f"{where}: fragmento sin salida que no es un final")
+
+    # Fragmentos inalcanzables desde el inicio (los ocultos se desbloquean por recompensas)
+    reachable = set()
+    pending = [story.starting_fragment]
+    while pending:
+        current = pending.pop()
+        if current in reachable or current not in fragments:
+            continue
+        reachable.add(current)
+        fragment = fragments[current]
+        if fragment.next_fragment:
+            pending.append(fragment.next_fragment)
+        pending.extend(c.next_fragment for c in fragment.choices or [])
+        if fragment.rewards:
+            pending.extend(fragment.rewards.unlock_fragments or [])
+    for frag_id, fragment in fragments.items():
+        if frag_id not in reachable and not fragment.is_hidden:
+            warnings.append(f"{story_id}/{frag_id}: fragmento inalcanzable")
+
+    if story.total_fragments != len(fragments):
+        warnings.append(
+            f"{story_id}: total_fragments={story.total_fragments} pero hay {len(fragments)} fragmentos"
+        )
+
+    return story, errors, warnings
+
+
+# --- Codificación -----------------------------------------------------------
+
+def _encode_fields(model: Any, fields: Iterable[str], table: _StringTable) -> List[Any]:
+    encoded = []
+    for field in fields:
+        value = getattr(model, field)
+        if field in INTERNED_FIELDS:
+            value = table.intern(value)
+        elif field == "choices":
+            value = [_encode_fields(c, CHOICE_FIELDS, table) for c in value or []]
+        elif field == "rewards":
+            value = value.model_dump() if value else None
+        elif field == "tags":
+            value = [table.intern(t) for t in value or []]
+        encoded.append(value)
+    return encoded
+
+
+def encode_bundle(stories: Dict[str, StorySchema], sources_digest: str) -> bytes:
+    """Serializa historias validadas al formato binario del bundle"""
+    table = _StringTable()
+    payload_stories = {}
+    for story_id, story in stories.items():
+        meta = story.model_dump(mode="json", exclude={"fragments"})
+        payload_stories[story_id] = {
+            "meta": meta,
+            "fragments": [
+                _encode_fields(fragment, FRAGMENT_FIELDS, table)
+                for fragment in story.fragments.values()
+            ],
+        }
+
+    payload = {
+        "build": {
+            "built_at": datetime.utcnow().isoformat(),
+            "digest": sources_digest,
+        },
+        "strings": table.strings,
+        "stories": payload_stories,
+    }
+    raw = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    compressed = zlib.compress(raw, 9)
+    header = _HEADER.pack(BUNDLE_MAGIC, STORY_BUNDLE_FORMAT_VERSION, 0, len(compressed))
+    return header + compressed
+
+
+# --- Carga en tiempo de ejecución -------------------------------------------
+
+def _decode_fragment(values: List[Any], strings: List[str]) -> FragmentSchema:
+    data = dict(zip(FRAGMENT_FIELDS, values))
+    for field in INTERNED_FIELDS.intersection(data):
+        if data[field] is not None:
+            data[field] = strings[data[field]]
+    data["tags"] = [strings[t] for t in data["tags"]]
+    choices = []
+    for choice_values in data["choices"]:
+        choice = dict(zip(CHOICE_FIELDS, choice_values))
+        for field in INTERNED_FIELDS.intersection(choice):
+            if choice[field] is not None:
+                choice[field] = strings[choice[field]]
+        choices.append(ChoiceSchema.model_construct(**choice))
+    data["choices"] = choices
+    if data["rewards"] is not None:
+        data["rewards"] = RewardSchema.model_construct(**data["rewards"])
+    # El bundle ya fue validado al compilar: se construye sin revalidar
+    return FragmentSchema.model_construct(**data)
+
+
+def read_bundle(bundle_path: Path) -> Dict[str, Any]:
+    """Lee y descomprime el payload de un bundle verificando su cabecera"""
+    with open(bundle_path, "rb") as f:
+        blob = f.read()
+    magic, version, _flags, length = _HEADER.unpack_from(blob)
+    if magic != BUNDLE_MAGIC:
+        raise ValueError(f"{bundle_path} no es un bundle de historias")
+    if version != STORY_BUNDLE_FORMAT_VERSION:
+        raise ValueError(
+            f"Versión de bundle {version} no soportada (se esperaba {STORY_BUNDLE_FORMAT_VERSION})"
+        )
+    body = blob[_HEADER.size:_HEADER.size + length]
+    return json.loads(zlib.decompress(body))
+
+
+def load_bundle(
+    bundle_path: Path,
+    story_ids: Optional[Iterable[str]] = None
+) -> Tuple[str, Dict[str, Tuple[StorySchema, Dict[str, FragmentSchema]]]]:
+    """
+    Carga historias desde un bundle compilado
+    Returns: (digest_del_build, {story_id: (story, {fragment_id: fragment})})
+    """
+    payload = read_bundle(bundle_path)
+    strings = [sys.intern(s) for s in payload["strings"]]
+    wanted = set(story_ids) if story_ids is not None else None
+
+    loaded = {}
+    for story_id, entry in payload["stories"].items():
+        if wanted is not None and story_id not in wanted:
+            continue
+        fragments = {}
+        for values in entry["fragments"]:
+            fragment = _decode_fragment(values, strings)
+            fragments[fragment.id] = fragment
+        meta = dict(entry["meta"])
+        meta["chapters"] = {int(k): v for k, v in meta.get("chapters", {}).items()}
+        for field in ("created_at", "updated_at"):
+            if isinstance(meta.get(field), str):
+                meta[field] = datetime.fromisoformat(meta[field].replace("Z", "+00:00"))
+        story = StorySchema.model_construct(**meta, fragments=fragments)
+        loaded[story_id] = (story, fragments)
+
+    return payload["build"]["digest"], loaded
+
+
+# --- Compilación ------------------------------------------------------------
+
+def compile_stories(
+    sources: Dict[str, Dict[str, Any]],
+    db_fragments: Optional[Dict[str, Dict[str, Dict[str, Any]]]] = None,
+    strict: bool = False
+) -> Tuple[Dict[str, bytes], Dict[str, Any], List[str]]:
+    """
+    Valida y compila cada historia a su propio bundle
+    Las filas de BD sobrescriben o amplían los fragmentos del JSON con la misma historia
+    Returns: ({story_id: bundle}, índice, advertencias). Lanza StoryCompileError si hay errores.
+    """
+    errors: List[str] = []
+    warnings: List[str] = []
+
+    merged = {story_id: dict(data) for story_id, data in sources.items()}
+    for story_id, fragments in (db_fragments or {}).items():
+        if story_id not in merged:
+            errors.append(f"{story_id}: fragmentos en BD sin metadatos de historia en JSON")
+            continue
+        merged[story_id]["fragments"] = {**merged[story_id].get("fragments", {}), **fragments}
+
+    stories: Dict[str, StorySchema] = {}
+    for story_id, data in merged.items():
+        story, story_errors, story_warnings = validate_story(story_id, data, strict=strict)
+        errors.extend(story_errors)
+        warnings.extend(story_warnings)
+        if story:
+            stories[story_id] = story
+
+    if errors:
+        raise StoryCompileError(errors)
+
+    bundles: Dict[str, bytes] = {}
+    index_stories: Dict[str, Dict[str, Any]] = {}
+    for story_id, story in sorted(stories.items()):
+        canonical = json.dumps(merged[story_id], sort_keys=True, ensure_ascii=False, default=str)
+        digest = hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+        bundles[story_id] = encode_bundle({story_id: story}, digest)
+        index_stories[story_id] = {
+            "file": f"{STORY_BUNDLE_DIRNAME}/{story_id}.bundle",
+            "digest": digest,
+            "title": story.title,
+            "description": story.description,
+            "requires_vip": story.requires_vip,
+            "min_level": story.min_level,
+            "fragments": len(story.fragments),
+            "size": len(bundles[story_id]),
+        }
+
+    catalog_digest = hashlib.sha1(
+        "|".join(entry["digest"] for entry in index_stories.values()).encode("utf-8")
+    ).hexdigest()
+    index = {
+        "format_version": STORY_BUNDLE_FORMAT_VERSION,
+        "digest": catalog_digest,
+        "built_at": datetime.utcnow().isoformat(),
+        "stories": index_stories,
+    }
+    return bundles, index, warnings
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compila las historias narrativas a un bundle")
+    default_data = Path(__file__).parent / "data"
+    parser.add_argument("--data", type=Path, default=default_data, help="Directorio con los JSON")
+    parser.add_argument("--output", type=Path, default=None, help="Directorio de salida del índice")
+    parser.add_argument("--include-db", action="store_true", help="Incluir filas de story_fragments")
+    parser.add_argument("--strict", action="store_true", help="Referencias rotas como errores")
+    parser.add_argument("--check", action="store_true", help="Solo validar, sin escribir")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s - %(message)s")
+    output = args.output or args.data
+
+    try:
+        sources = read_json_sources(args.data)
+        db_fragments = asyncio.run(read_db_fragments()) if args.include_db else None
+        bundles, index, warnings = compile_stories(sources, db_fragments, strict=args.strict)
+    except StoryCompileError as e:
+        for error in e.errors:
+            logger.error(error)
+        return 1
+
+    for warning in warnings:
+        logger.warning(warning)
+
+    if args.check:
+        logger.info(f"{len(sources)} historias válidas")
+        return 0
+
+    (output / STORY_BUNDLE_DIRNAME).mkdir(parents=True, exist_ok=True)
+    for story_id, bundle in bundles.items():
+        (output / index["stories"][story_id]["file"]).write_bytes(bundle)
+    # El índice se escribe al final para que nunca apunte a bundles incompletos
+    with open(output / STORY_INDEX_FILENAME, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+
+    total = sum(len(b) for b in bundles.values())
+    logger.info(f"{len(bundles)} historias compiladas en {output} ({total} bytes)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -48,6 +48,20 @@ MESSAGE_TEMPLATES = {
 # Configuración de caché
 CACHE_TTL = 3600  # 1 hora
 PRELOAD_FRAGMENTS = 3  # Precargar próximos N fragmentos
+REQUIREMENT_SNAPSHOT_TTL = 900  # Duración de una sesión narrativa (15 minutos)
+
+# Bundles compilados de historias (ver narrative/compiler.py)
+STORY_INDEX_FILENAME = "stories.index.json"
+STORY_BUNDLE_DIRNAME = "bundles"
+STORY_BUNDLE_FORMAT_VERSION = 1
+STORY_CATALOG_MAX_FRAGMENTS = 20000  # Presupuesto de memoria del catálogo en fragmentos
+
+# Analítica narrativa (ver narrative/analytics.py)
+ANALYTICS_CHUNK_SIZE = 5000  # Filas por bloque al recorrer decisiones y estados
+ANALYTICS_RESERVOIR_SIZE = 2000  # Muestras por fragmento para la mediana de tiempos
+ANALYTICS_INTERVAL = 3600  # Segundos entre recálculos
+ANALYTICS_TOP_FRAGMENTS = 5  # Fragmentos con más abandono mostrados por historia
+RENDER_CACHE_MAX_ENTRIES = 5000  # Fragmentos renderizados en memoria
 
 # Puntos por acciones narrativas
 NARRATIVE_POINTS = {
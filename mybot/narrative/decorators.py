@@ -6,9 +6,10 @@ from typing import Callable, Any
 from aiogram.types import CallbackQuery, Message
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from database.models import User
+from services.point_ledger import apply_points
 from utils.user_roles import is_vip_active
 from .models import UserNarrativeState
+from .requirement_cache import update_requirement_snapshot
 
 
 def ensure_narrative_state(func: Callable) -> Callable:
@@ -100,10 +101,9 @@ def track_narrative_action(action_type: str, points: float = 0):
                 
                 # REF: [database/models.py] User - Dar puntos si corresponde
                 if points > 0:
-                    user = await session.get(User, user_id)
-                    if user:
-                        user.points += points
-                        await session.commit()
+                    balance = await apply_points(session, user_id, points, f"narrative:{action_type}")
+                    if balance is not None:
+                        update_requirement_snapshot(user_id, points=balance)
             
             return result
         
@@ -2,9 +2,9 @@
 Handlers principales del sistema narrativo
 """
 import logging
-from typing import Optional
+from typing import Dict, Optional, Tuple
 from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery
+from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -18,6 +18,12 @@ from .decorators import ensure_narrative_state, require_vip_for_story, track_nar
 from .keyboards import NarrativeKeyboards
 from .constants import MESSAGE_TEMPLATES, CHARACTERS
 from .schemas import FragmentSchema
+from .render_cache import (
+    availability_mask,
+    render_key,
+    get_rendered_fragment,
+    store_rendered_fragment,
+)
 
 logger = logging.getLogger(__name__)
 router = Router()
@@ -293,6 +299,51 @@ async def _display_fragment(
     user_id = callback.from_user.id
     state = await service.get_user_state(user_id)
     
+    # Verificar si puede retroceder
+    can_go_back = len(state.fragments_visited) > 1 if state else False
+    completion = state.story_completion_percent if state else 0
+    
+    # Disponibilidad de opciones evaluada en una pasada sobre la instantánea del usuario
+    choice_availability = None
+    if fragment.type == "decision" and fragment.choices:
+        choice_availability = await service.get_choice_availability(user_id, fragment)
+    
+    # Lo único que varía entre usuarios es la disponibilidad y la navegación
+    if fragment.type == "ending":
+        variant = ("ending", completion)
+    else:
+        variant = ("fragment", can_go_back)
+    key = render_key(
+        service.story_manager.version,
+        state.active_story if state else None,
+        fragment.id,
+        availability_mask(fragment, choice_availability),
+        *variant
+    )
+    
+    rendered = get_rendered_fragment(key)
+    if rendered is None:
+        rendered = _render_fragment(fragment, can_go_back, completion, choice_availability)
+        store_rendered_fragment(key, *rendered)
+    text, keyboard = rendered
+    
+    # Actualizar menú
+    await menu_manager.update_menu(
+        callback,
+        text,
+        keyboard,
+        session,
+        menu_state=f"narrative_fragment_{fragment.id}"
+    )
+
+
+def _render_fragment(
+    fragment: FragmentSchema,
+    can_go_back: bool,
+    completion: float,
+    choice_availability: Optional[Dict[str, bool]]
+) -> Tuple[str, InlineKeyboardMarkup]:
+    """Construye el texto y el teclado de un fragmento"""
     # Construir texto del fragmento
     text = ""
     
@@ -318,13 +369,9 @@ async def _display_fragment(
         "total": 6  # TODO: Obtener del story manager
     }
     
-    # Verificar si puede retroceder
-    can_go_back = len(state.fragments_visited) > 1 if state else False
-    
     # Generar teclado apropiado
     if fragment.type == "ending":
         # Es un final
-        completion = state.story_completion_percent if state else 0
         keyboard = NarrativeKeyboards.story_ending(
             ending_type="default",
             completion_percent=completion,
@@ -335,17 +382,11 @@ async def _display_fragment(
         keyboard = NarrativeKeyboards.story_fragment(
             fragment=fragment,
             can_go_back=can_go_back,
-            chapter_info=chapter_info
+            chapter_info=chapter_info,
+            choice_availability=choice_availability
         )
     
-    # Actualizar menú
-    await menu_manager.update_menu(
-        callback,
-        sanitize_text(text),
-        keyboard,
-        session,
-        menu_state=f"narrative_fragment_{fragment.id}"
-    )
+    return sanitize_text(text), keyboard
 
 
 # Función auxiliar eliminada - se usa la importada desde utils.user_roles
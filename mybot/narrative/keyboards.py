@@ -111,18 +111,22 @@ class NarrativeKeyboards:
     def story_fragment(
         fragment: FragmentSchema,
         can_go_back: bool = False,
-        chapter_info: Optional[Dict[str, Any]] = None
+        chapter_info: Optional[Dict[str, Any]] = None,
+        choice_availability: Optional[Dict[str, bool]] = None
     ) -> InlineKeyboardMarkup:
         """Teclado para un fragmento de historia"""
         builder = InlineKeyboardBuilder()
+        choice_availability = choice_availability or {}
         
         # Si es un punto de decisión, mostrar opciones
         if fragment.type == "decision" and fragment.choices:
             for i, choice in enumerate(fragment.choices[:MAX_CHOICES_PER_FRAGMENT]):
+                # Marcar opciones cuyos requisitos no se cumplen
+                lock = "" if choice_availability.get(choice.id, True) else "🔒 "
                 # Formato: narrative_choice_{choice_id}
                 builder.row(
                     InlineKeyboardButton(
-                        text=f"{i+1}. {choice.text}",
+                        text=f"{lock}{i+1}. {choice.text}",
                         callback_data=f"narrative_choice_{choice.id}"
                     )
                 )
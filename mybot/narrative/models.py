@@ -110,6 +110,7 @@ class UserDecision(Base):
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(BigInteger, ForeignKey("users.id"), nullable=False)
+    story_id = Column(String, nullable=True, index=True)  # Historia activa al decidir (vacío en registros antiguos)
     fragment_id = Column(String, ForeignKey("story_fragments.id"), nullable=False)
     choice_id = Column(String, nullable=False)  # ID de la opción elegida
     choice_text = Column(Text, nullable=False)  # Texto de la opción (para historial)
@@ -150,3 +151,28 @@ class NarrativeMetrics(Base):
     rating_count = Column(Integer, default=0)
     
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+
+class NarrativeFragmentSummary(Base):
+    """Resumen precalculado de embudo y abandono por fragmento (ver narrative/analytics.py)"""
+    __tablename__ = "narrative_fragment_summaries"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    story_id = Column(String, nullable=False, index=True)
+    fragment_id = Column(String, nullable=False)
+    
+    # Embudo
+    users_reached = Column(Integer, default=0)  # Usuarios que visitaron el fragmento
+    users_stalled = Column(Integer, default=0)  # Usuarios detenidos en el fragmento
+    drop_off_rate = Column(Float, default=0.0)  # users_stalled / users_reached
+    
+    # Decisiones
+    decisions_count = Column(Integer, default=0)
+    choice_ratios = Column(JSON, default=dict)  # {choice_id: proporción}
+    median_seconds_to_decide = Column(Float, nullable=True)  # Desde la decisión anterior
+    
+    computed_at = Column(DateTime, default=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint("story_id", "fragment_id", name="uix_story_fragment_summary"),
+    )
@@ -11,6 +11,15 @@ from .models import StoryFragment, UserNarrativeState, UserDecision, NarrativeMe
 from .story_manager import StoryManager
 from .schemas import FragmentSchema, ChoiceSchema
 from .constants import NARRATIVE_POINTS, AUTO_SAVE_INTERVAL
+from .requirement_cache import (
+    get_requirement_snapshot,
+    store_requirement_snapshot,
+    update_requirement_snapshot,
+    invalidate_requirement_snapshot,
+)
+from services.hint_combination_service import register_user_hint
+from services.backpack_service import record_backpack_unlock
+from services.point_ledger import apply_points
 
 logger = logging.getLogger(__name__)
 
@@ -75,6 +84,9 @@ class NarrativeService:
         starting_fragment = self.story_manager.get_starting_fragment(story_id)
         if not starting_fragment:
             return False, "Error al cargar la historia", None
+
+        # Nueva sesión narrativa: partir de una instantánea fresca
+        invalidate_requirement_snapshot(user_id)
         
         # Actualizar estado del usuario
         state.active_story = story_id
@@ -136,8 +148,6 @@ class NarrativeService:
             return False, "Opción no válida", None
         
         # Verificar requisitos de la elección
-        from database.models import User
-        user = await self.session.get(User, user_id)
         user_data = await self._get_user_data_for_requirements(user_id)
         can_choose, missing = self.story_manager.check_requirements(
             choice.requirements or {},
@@ -159,6 +169,7 @@ class NarrativeService:
         # Registrar la decisión
         decision = UserDecision(
             user_id=user_id,
+            story_id=state.active_story,
             fragment_id=state.current_fragment_id,
             choice_id=choice_id,
             choice_text=choice.text,
@@ -290,6 +301,19 @@ class NarrativeService:
         await self.session.commit()
         
         return True, "Has retrocedido", previous_fragment
+
+    async def get_choice_availability(
+        self,
+        user_id: int,
+        fragment: FragmentSchema
+    ) -> Dict[str, bool]:
+        """Indica qué opciones del fragmento puede elegir el usuario"""
+        if not fragment or not fragment.choices:
+            return {}
+
+        user_data = await self._get_user_data_for_requirements(user_id)
+        results = self.story_manager.check_choices_requirements(fragment, user_data)
+        return {choice_id: allowed for choice_id, (allowed, _) in results.items()}
     
     async def get_user_history(
         self, 
@@ -305,7 +329,7 @@ class NarrativeService:
         
         if story_id:
             # Filtrar por historia específica
-            fragment_ids = list(self.story_manager._story_cache.get(story_id, {}).keys())
+            fragment_ids = list(self.story_manager.get_fragments(story_id).keys())
             query = query.where(UserDecision.fragment_id.in_(fragment_ids))
         
         query = query.limit(limit).offset(offset)
@@ -431,15 +455,21 @@ class NarrativeService:
     # Métodos privados auxiliares
     
     async def _get_user_data_for_requirements(self, user_id: int) -> Dict[str, Any]:
-        """Obtiene datos del usuario necesarios para verificar requisitos"""
+        """
+        Obtiene datos del usuario necesarios para verificar requisitos
+        Usa la instantánea cacheada de la sesión narrativa si existe
+        """
+        snapshot = get_requirement_snapshot(user_id)
+        if snapshot is not None:
+            return snapshot
+
         from database.models import User
         user = await self.session.get(User, user_id)
         state = await self.get_user_state(user_id)
         
         # REF: [database/models.py] User, UserAchievement
         # Obtener logros del usuario
-        from sqlalchemy import select
-        from database.models import UserAchievement
+        from database.models import UserAchievement, LorePiece, UserLorePiece
         
         achievements_query = select(UserAchievement.achievement_id).where(
             UserAchievement.user_id == user_id
@@ -447,16 +477,24 @@ class NarrativeService:
         result = await self.session.execute(achievements_query)
         achievements = [a[0] for a in result.all()]
         
-        # TODO: Integrar con sistema de mochila cuando esté disponible
-        items = []  # Por ahora vacío
+        # REF: [database/models.py] UserLorePiece - Las pistas de la mochila cuentan como items
+        items_query = (
+            select(LorePiece.code_name)
+            .join(UserLorePiece, LorePiece.id == UserLorePiece.lore_piece_id)
+            .where(UserLorePiece.user_id == user_id)
+        )
+        result = await self.session.execute(items_query)
+        items = [row[0] for row in result.all()]
         
-        return {
+        snapshot = {
             "level": user.level if user else 1,
             "points": user.points if user else 0,
             "items": items,
             "achievements": achievements,
-            "story_flags": state.story_flags if state else {}
+            "story_flags": dict(state.story_flags or {}) if state else {}
         }
+        store_requirement_snapshot(user_id, snapshot)
+        return snapshot
     
     async def _apply_choice_effects(
         self, 
@@ -478,6 +516,7 @@ class NarrativeService:
         # Aplicar flags de historia
         if "story_flags" in effects:
             state.story_flags.update(effects["story_flags"])
+            update_requirement_snapshot(user_id, story_flags=dict(state.story_flags))
         
         # Registrar items ganados (para futura integración)
         if "items" in effects:
@@ -526,6 +565,7 @@ class NarrativeService:
                 for fragment_id in rewards.unlock_fragments:
                     if fragment_id not in state.story_flags["discovered_fragments"]:
                         state.story_flags["discovered_fragments"].append(fragment_id)
+                update_requirement_snapshot(user_id, story_flags=dict(state.story_flags))
 
     async def _check_and_award_achievement(
         self,
@@ -560,6 +600,7 @@ class NarrativeService:
         )
         self.session.add(user_achievement)
         await self.session.commit()
+        invalidate_requirement_snapshot(user_id)
         
         return achievement
 
@@ -595,15 +636,15 @@ class NarrativeService:
         )
         self.session.add(user_lore)
         await self.session.commit()
+        invalidate_requirement_snapshot(user_id)
+        register_user_hint(user_id, lore_piece.code_name)
+        record_backpack_unlock(user_id, lore_piece)
 
     async def _give_narrative_points(self, user_id: int, points: int) -> None:
         """Otorga puntos narrativos al usuario"""
-        from database.models import User
-        
-        user = await self.session.get(User, user_id)
-        if user:
-            user.points += points
-            await self.session.commit()
+        balance = await apply_points(self.session, user_id, points, "narrative")
+        if balance is not None:
+            update_requirement_snapshot(user_id, points=balance)
 
     async def _record_fragment_visit(self, fragment_id: str) -> None:
         """Registra la visita a un fragmento para métricas"""
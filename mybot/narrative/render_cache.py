@@ -0,0 +1,71 @@
+"""
+Caché de fragmentos renderizados (texto final + teclado inline)
+"""
+import logging
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+from aiogram.types import InlineKeyboardMarkup
+
+from .constants import RENDER_CACHE_MAX_ENTRIES
+from .schemas import FragmentSchema
+
+logger = logging.getLogger(__name__)
+
+RenderKey = Tuple[Hashable, ...]
+
+# (versión, historia, fragmento, máscara, variante) -> (texto, teclado)
+_RENDER_CACHE: "OrderedDict[RenderKey, Tuple[str, InlineKeyboardMarkup]]" = OrderedDict()
+_cache_version: Optional[str] = None
+
+
+def availability_mask(fragment: FragmentSchema, availability: Optional[Dict[str, bool]]) -> int:
+    """Codifica la disponibilidad de las opciones como bits (1 = disponible)."""
+    if not availability or not fragment.choices:
+        return 0
+    mask = 0
+    for i, choice in enumerate(fragment.choices):
+        if availability.get(choice.id, True):
+            mask |= 1 << i
+    return mask
+
+
+def render_key(
+    story_version: Optional[str],
+    story_id: str,
+    fragment_id: str,
+    mask: int,
+    *variant: Hashable
+) -> RenderKey:
+    """Construye la clave de caché de un fragmento renderizado."""
+    return (story_version, story_id, fragment_id, mask) + tuple(variant)
+
+
+def get_rendered_fragment(key: RenderKey) -> Optional[Tuple[str, InlineKeyboardMarkup]]:
+    """Devuelve (texto, teclado) si el fragmento ya se renderizó para esta versión."""
+    if key[0] != _cache_version:
+        return None
+    rendered = _RENDER_CACHE.get(key)
+    if rendered is not None:
+        _RENDER_CACHE.move_to_end(key)
+    return rendered
+
+
+def store_rendered_fragment(key: RenderKey, text: str, keyboard: InlineKeyboardMarkup) -> None:
+    """Guarda un fragmento renderizado; una versión nueva de historias descarta la anterior."""
+    global _cache_version
+    if key[0] != _cache_version:
+        clear_render_cache()
+        _cache_version = key[0]
+    _RENDER_CACHE[key] = (text, keyboard)
+    _RENDER_CACHE.move_to_end(key)
+    while len(_RENDER_CACHE) > RENDER_CACHE_MAX_ENTRIES:
+        _RENDER_CACHE.popitem(last=False)
+
+
+def clear_render_cache() -> None:
+    """Vacía la caché (se llama al recargar historias)."""
+    global _cache_version
+    _RENDER_CACHE.clear()
+    _cache_version = None
+    logger.debug("Cleared narrative render cache")
@@ -0,0 +1,53 @@
+"""
+Caché de instantáneas de requisitos narrativos por usuario
+"""
+import logging
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from utils.cache_bus import shared_invalidation
+
+from .constants import REQUIREMENT_SNAPSHOT_TTL
+
+logger = logging.getLogger(__name__)
+
+# user_id -> (snapshot, expire_time)
+_REQUIREMENT_SNAPSHOTS: Dict[int, Tuple[Dict[str, Any], float]] = {}
+
+
+def get_requirement_snapshot(user_id: int) -> Optional[Dict[str, Any]]:
+    """Devuelve la instantánea vigente del usuario o None si no existe o expiró."""
+    cached = _REQUIREMENT_SNAPSHOTS.get(user_id)
+    if not cached:
+        return None
+    snapshot, expires_at = cached
+    if time.time() >= expires_at:
+        _REQUIREMENT_SNAPSHOTS.pop(user_id, None)
+        return None
+    return snapshot
+
+
+def store_requirement_snapshot(user_id: int, snapshot: Dict[str, Any]) -> None:
+    """Guarda la instantánea durante la sesión narrativa."""
+    _REQUIREMENT_SNAPSHOTS[user_id] = (snapshot, time.time() + REQUIREMENT_SNAPSHOT_TTL)
+
+
+def update_requirement_snapshot(user_id: int, **changes: Any) -> None:
+    """Actualiza campos de una instantánea existente sin invalidarla."""
+    snapshot = get_requirement_snapshot(user_id)
+    if snapshot is not None:
+        snapshot.update(changes)
+
+
+@shared_invalidation("requirement_snapshot", per_user=True)
+def invalidate_requirement_snapshot(user_id: int = None) -> None:
+    """Invalida la instantánea de un usuario o de todos.
+
+    Debe llamarse cuando cambian puntos, logros o piezas de lore del usuario.
+    """
+    if user_id:
+        _REQUIREMENT_SNAPSHOTS.pop(user_id, None)
+        logger.debug(f"Invalidated requirement snapshot for user {user_id}")
+    else:
+        _REQUIREMENT_SNAPSHOTS.clear()
+        logger.debug("Invalidated all requirement snapshots")
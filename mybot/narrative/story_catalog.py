@@ -0,0 +1,128 @@
+"""
+Catálogo de historias con carga perezosa y desalojo por presupuesto de memoria
+"""
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .schemas import StorySchema, FragmentSchema
+from .constants import STORY_INDEX_FILENAME, STORY_CATALOG_MAX_FRAGMENTS
+from .compiler import load_bundle
+
+logger = logging.getLogger(__name__)
+
+LoadedStory = Tuple[StorySchema, Dict[str, FragmentSchema]]
+
+
+class StoryCatalog:
+    """
+    Índice de historias disponibles que carga cada una al primer acceso.
+    - Al arrancar solo se lee ``stories.index.json`` (generado por el compilador)
+    - Sin índice, descubre ``*.json`` en el directorio de datos (modo desarrollo)
+    - Las historias menos usadas se desalojan al superar el presupuesto de fragmentos
+    """
+
+    def __init__(self, data_path: Path = None, max_fragments: int = STORY_CATALOG_MAX_FRAGMENTS):
+        self.data_path = data_path or Path(__file__).parent / "data"
+        self.max_fragments = max_fragments
+        self.version: Optional[str] = None
+        self._index: Dict[str, Dict[str, Any]] = {}
+        self._from_bundles = False
+        # story_id -> (story, fragments), ordenado de menos a más recientemente usado
+        self._loaded: "OrderedDict[str, LoadedStory]" = OrderedDict()
+        self._loaded_fragments = 0
+        self.reload()
+
+    def reload(self) -> None:
+        """Relee el índice y descarta las historias cargadas"""
+        self._loaded.clear()
+        self._loaded_fragments = 0
+
+        index_path = self.data_path / STORY_INDEX_FILENAME
+        if index_path.exists():
+            with open(index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            self._index = index["stories"]
+            self.version = index["digest"]
+            self._from_bundles = True
+            logger.info(f"Índice de historias cargado: {len(self._index)} historias")
+            return
+
+        logger.warning(
+            f"Índice no encontrado en {index_path}; usando JSON sin compilar. "
+            "Ejecuta 'python -m narrative.compiler' para generarlo."
+        )
+        self._index = {}
+        fingerprint = []
+        for filepath in sorted(self.data_path.glob("*.json")):
+            # Convención de nombres: story_<id>.json
+            story_id = filepath.stem.removeprefix("story_")
+            self._index[story_id] = {"file": filepath.name}
+            fingerprint.append(f"{filepath.name}:{filepath.stat().st_mtime}")
+        self.version = "json:" + hashlib.sha1("|".join(fingerprint).encode("utf-8")).hexdigest()
+        self._from_bundles = False
+
+    def story_ids(self) -> List[str]:
+        """IDs de todas las historias del catálogo (cargadas o no)"""
+        return list(self._index.keys())
+
+    def describe(self, story_id: str) -> Optional[Dict[str, Any]]:
+        """Metadatos del índice sin cargar la historia"""
+        return self._index.get(story_id)
+
+    def loaded_story_ids(self) -> List[str]:
+        """IDs de las historias actualmente en memoria"""
+        return list(self._loaded.keys())
+
+    def get(self, story_id: str) -> Optional[LoadedStory]:
+        """Devuelve (historia, fragmentos), cargándola si es necesario"""
+        loaded = self._loaded.get(story_id)
+        if loaded is not None:
+            self._loaded.move_to_end(story_id)
+            return loaded
+
+        entry = self._index.get(story_id)
+        if entry is None:
+            return None
+
+        try:
+            loaded = self._load(story_id, entry)
+        except Exception as e:
+            logger.error(f"Error cargando historia {story_id}: {e}")
+            return None
+
+        self._loaded[story_id] = loaded
+        self._loaded_fragments += len(loaded[1])
+        self._evict(keep=story_id)
+        return loaded
+
+    def _load(self, story_id: str, entry: Dict[str, Any]) -> LoadedStory:
+        filepath = self.data_path / entry["file"]
+        if self._from_bundles:
+            _, stories = load_bundle(filepath, story_ids=[story_id])
+            story, fragments = stories[story_id]
+            logger.info(f"Historia '{story_id}' cargada desde bundle: {len(fragments)} fragmentos")
+            return story, fragments
+
+        with open(filepath, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        story = StorySchema(**data)
+        logger.info(f"Historia '{story_id}' cargada desde JSON: {len(story.fragments)} fragmentos")
+        return story, story.fragments
+
+    def _evict(self, keep: str) -> None:
+        """Desaloja historias menos usadas mientras se supere el presupuesto"""
+        while self._loaded_fragments > self.max_fragments and len(self._loaded) > 1:
+            story_id = next(iter(self._loaded))
+            if story_id == keep:
+                break
+            _, fragments = self._loaded.pop(story_id)
+            self._loaded_fragments -= len(fragments)
+            logger.info(f"Historia '{story_id}' desalojada del catálogo")
+
+
+# Instancia compartida por todos los StoryManager del proceso
+story_catalog = StoryCatalog()
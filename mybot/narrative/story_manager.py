@@ -1,7 +1,6 @@
 """
 Gestor de historias y contenido narrativo
 """
-import json
 import logging
 from pathlib import Path
 from typing import Dict, List, Optional, Any, Tuple
@@ -9,56 +8,45 @@ from datetime import datetime
 
 from .schemas import StorySchema, FragmentSchema, ChoiceSchema
 from .constants import MAX_CHOICES_PER_FRAGMENT, NARRATIVE_POINTS
+from .story_catalog import StoryCatalog, story_catalog
 
 logger = logging.getLogger(__name__)
 
 
 class StoryManager:
-    """Gestiona la carga y acceso a historias desde JSON"""
+    """Gestiona el acceso a historias a través del catálogo compartido"""
     
-    def __init__(self, data_path: Path = None):
-        self.data_path = data_path or Path(__file__).parent / "data"
-        self.stories: Dict[str, StorySchema] = {}
-        self._story_cache: Dict[str, Dict[str, FragmentSchema]] = {}
-        self._load_stories()
+    def __init__(self, data_path: Path = None, catalog: StoryCatalog = None):
+        if catalog is None:
+            catalog = StoryCatalog(data_path) if data_path else story_catalog
+        self.catalog = catalog
     
-    def _load_stories(self) -> None:
-        """Carga todas las historias disponibles desde JSON"""
-        story_files = {
-            "free": "story_free.json",
-            "vip": "story_vip.json"
-        }
-        
-        for story_id, filename in story_files.items():
-            filepath = self.data_path / filename
-            if filepath.exists():
-                try:
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        story = StorySchema(**data)
-                        self.stories[story_id] = story
-                        
-                        # Cache de fragmentos para acceso rápido
-                        self._story_cache[story_id] = {
-                            frag_id: FragmentSchema(**frag_data)
-                            for frag_id, frag_data in data['fragments'].items()
-                        }
-                        
-                        logger.info(f"Historia '{story_id}' cargada: {story.total_fragments} fragmentos")
-                except Exception as e:
-                    logger.error(f"Error cargando historia {filename}: {e}")
-            else:
-                logger.warning(f"Archivo de historia no encontrado: {filepath}")
+    @property
+    def version(self) -> Optional[str]:
+        """Versión del contenido cargado (invalida cachés de render)"""
+        return self.catalog.version
+    
+    def available_stories(self) -> List[str]:
+        """IDs de las historias disponibles en el catálogo"""
+        return self.catalog.story_ids()
+    
+    def reload(self) -> None:
+        """Vuelve a leer el índice de historias"""
+        self.catalog.reload()
     
     def get_story(self, story_id: str) -> Optional[StorySchema]:
         """Obtiene una historia completa"""
-        return self.stories.get(story_id)
+        loaded = self.catalog.get(story_id)
+        return loaded[0] if loaded else None
+    
+    def get_fragments(self, story_id: str) -> Dict[str, FragmentSchema]:
+        """Obtiene todos los fragmentos de una historia indexados por ID"""
+        loaded = self.catalog.get(story_id)
+        return loaded[1] if loaded else {}
     
     def get_fragment(self, story_id: str, fragment_id: str) -> Optional[FragmentSchema]:
         """Obtiene un fragmento específico"""
-        if story_id in self._story_cache:
-            return self._story_cache[story_id].get(fragment_id)
-        return None
+        return self.get_fragments(story_id).get(fragment_id)
     
     def get_starting_fragment(self, story_id: str) -> Optional[FragmentSchema]:
         """Obtiene el fragmento inicial de una historia"""
@@ -69,11 +57,10 @@ class StoryManager:
     
     def get_chapter_fragments(self, story_id: str, chapter: int) -> List[FragmentSchema]:
         """Obtiene todos los fragmentos de un capítulo"""
-        fragments = []
-        if story_id in self._story_cache:
-            for frag_id, fragment in self._story_cache[story_id].items():
-                if fragment.chapter == chapter:
-                    fragments.append(fragment)
+        fragments = [
+            fragment for fragment in self.get_fragments(story_id).values()
+            if fragment.chapter == chapter
+        ]
         return sorted(fragments, key=lambda f: f.scene)
     
     def validate_choice(self, story_id: str, fragment_id: str, choice_id: str) -> Optional[ChoiceSchema]:
@@ -120,20 +107,42 @@ class StoryManager:
             for flag, value in requirements["story_flags"].items():
                 if user_flags.get(flag) != value:
                     missing.append(f"Decisión previa requerida")
-                    
+
         return len(missing) == 0, missing
-    
+
+    def check_choices_requirements(
+        self,
+        fragment: FragmentSchema,
+        user_data: Dict[str, Any]
+    ) -> Dict[str, Tuple[bool, List[str]]]:
+        """
+        Evalúa en una sola pasada los requisitos de todas las opciones de un fragmento
+        Retorna {choice_id: (cumple_requisitos, lista_de_faltantes)}
+        """
+        if not fragment or not fragment.choices:
+            return {}
+
+        # Convertir colecciones una sola vez para búsquedas O(1) en todas las opciones
+        snapshot = dict(user_data)
+        snapshot["items"] = set(user_data.get("items", []))
+        snapshot["achievements"] = set(user_data.get("achievements", []))
+
+        return {
+            choice.id: self.check_requirements(choice.requirements or {}, snapshot)
+            for choice in fragment.choices
+        }
+
     def calculate_completion_percent(self, story_id: str, visited_fragments: List[str]) -> float:
         """Calcula el porcentaje de completitud de una historia"""
-        story = self.get_story(story_id)
-        if not story:
+        fragments = self.get_fragments(story_id)
+        if not fragments:
             return 0.0
         
         # Contar solo fragmentos principales (no ocultos)
-        main_fragments = [
-            frag_id for frag_id, frag in self._story_cache[story_id].items()
+        main_fragments = {
+            frag_id for frag_id, frag in fragments.items()
             if not frag.is_hidden
-        ]
+        }
         
         if not main_fragments:
             return 0.0
@@ -164,12 +173,11 @@ class StoryManager:
         results = []
         query_lower = query.lower()
         
-        if story_id in self._story_cache:
-            for fragment in self._story_cache[story_id].values():
-                if (query_lower in fragment.narrator_text.lower() or
-                    (fragment.title and query_lower in fragment.title.lower()) or
-                    (fragment.atmosphere_text and query_lower in fragment.atmosphere_text.lower())):
-                    results.append(fragment)
+        for fragment in self.get_fragments(story_id).values():
+            if (query_lower in fragment.narrator_text.lower() or
+                (fragment.title and query_lower in fragment.title.lower()) or
+                (fragment.atmosphere_text and query_lower in fragment.atmosphere_text.lower())):
+                results.append(fragment)
         
         return results
     
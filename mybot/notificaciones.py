@@ -26,7 +26,7 @@ async def enviar_notificacion_gamificada(bot: Bot, user_id: int):
     await bot.send_message(user_id, f"💬 {mensaje}")
 
 
-async def send_narrative_notification(bot: Bot, user_id: int, pista_code: str, origen: str = "Sistema"):
+def narrative_notification_text(pista_code: str, origen: str = "Sistema") -> str:
     mensajes = [
         f"🎩 Lucien: Una nueva pieza ha caído en tus manos... {pista_code}. No la pierdas.",
         f"🎩 Lucien: {pista_code} se ha revelado para ti. ¿Podrás entender su verdadero valor?",
@@ -35,5 +35,8 @@ async def send_narrative_notification(bot: Bot, user_id: int, pista_code: str, o
         f"🎩 Lucien: {pista_code} proviene de {origen}. ¿Accidente o destino?"
     ]
 
-    mensaje = random.choice(mensajes)
-    await bot.send_message(user_id, mensaje)
+    return random.choice(mensajes)
+
+
+async def send_narrative_notification(bot: Bot, user_id: int, pista_code: str, origen: str = "Sistema"):
+    await bot.send_message(user_id, narrative_notification_text(pista_code, origen))
@@ -15,6 +15,7 @@ from database.models import (
     UserStats,
     UserMissionEntry,
 )
+from narrative.requirement_cache import invalidate_requirement_snapshot
 
 PREDEFINED_ACHIEVEMENTS = [
     {
@@ -85,6 +86,7 @@ class AchievementService:
         obj = UserAchievement(user_id=user_id, achievement_id=achievement.id)
         self.session.add(obj)
         await self.session.commit()
+        invalidate_requirement_snapshot(user_id)
         if bot:
             await bot.send_message(user_id, achievement.reward_text)
         return True
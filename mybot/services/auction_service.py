@@ -173,7 +173,9 @@ class AuctionService:
             auction.winner_id = auction.highest_bidder_id
             
             # Deduct points from winner
-            await self.point_service.deduct_points(auction.winner_id, auction.current_highest_bid)
+            await self.point_service.deduct_points(
+                auction.winner_id, auction.current_highest_bid, source="auction"
+            )
             
             # Notify winner
             if bot:
@@ -0,0 +1,148 @@
+import logging
+from collections import Counter, OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, func, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import LorePiece, UserLorePiece
+from utils.cache_bus import cache_bus, shared_invalidation
+
+logger = logging.getLogger(__name__)
+
+# Categoría asignada a las piezas sin categoría
+DEFAULT_CATEGORY = "fragmentos"
+# Pistas recientes guardadas en el resumen
+BACKPACK_RECENT_LIMIT = 10
+# Pistas por página en la vista de categoría
+BACKPACK_PAGE_SIZE = 8
+# Máximo de resúmenes de mochila en memoria
+BACKPACK_SUMMARY_MAX_ENTRIES = 5000
+
+# user_id -> {"total", "categories": Counter, "recent": [(lore_piece_id, title, unlocked_at)]}
+_BACKPACK_SUMMARIES: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+
+
+def record_backpack_unlock(user_id: int, piece: LorePiece, unlocked_at: datetime = None) -> None:
+    """Aplica un desbloqueo al resumen cacheado del usuario sin volver a consultarlo."""
+    if not cache_bus.owns_user(user_id):
+        # El resumen vive en otro worker: que lo descarte allí
+        cache_bus.publish("backpack_summary", user_id)
+    summary = _BACKPACK_SUMMARIES.get(user_id)
+    if summary is None:
+        return
+    summary["total"] += 1
+    summary["categories"][piece.category or DEFAULT_CATEGORY] += 1
+    summary["recent"].insert(0, (piece.id, piece.title, unlocked_at or datetime.now()))
+    del summary["recent"][BACKPACK_RECENT_LIMIT:]
+
+
+@shared_invalidation("backpack_summary", per_user=True)
+def invalidate_backpack_summary(user_id: int = None) -> None:
+    """Descarta el resumen de un usuario o de todos."""
+    if user_id:
+        _BACKPACK_SUMMARIES.pop(user_id, None)
+    else:
+        _BACKPACK_SUMMARIES.clear()
+
+
+class BackpackService:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_summary(self, user_id: int) -> Dict[str, Any]:
+        """Conteo por categoría y pistas recientes del usuario."""
+        summary = _BACKPACK_SUMMARIES.get(user_id)
+        if summary is not None:
+            _BACKPACK_SUMMARIES.move_to_end(user_id)
+            return summary
+
+        category = func.coalesce(LorePiece.category, DEFAULT_CATEGORY)
+        result = await self.session.execute(
+            select(category, func.count(UserLorePiece.lore_piece_id))
+            .join(UserLorePiece, LorePiece.id == UserLorePiece.lore_piece_id)
+            .where(UserLorePiece.user_id == user_id)
+            .group_by(category)
+        )
+        categories = Counter(dict(result.all()))
+
+        result = await self.session.execute(
+            select(LorePiece.id, LorePiece.title, UserLorePiece.unlocked_at)
+            .join(UserLorePiece, LorePiece.id == UserLorePiece.lore_piece_id)
+            .where(UserLorePiece.user_id == user_id)
+            .order_by(UserLorePiece.unlocked_at.desc(), UserLorePiece.lore_piece_id.desc())
+            .limit(BACKPACK_RECENT_LIMIT)
+        )
+
+        summary = {
+            "total": sum(categories.values()),
+            "categories": categories,
+            "recent": [tuple(row) for row in result.all()],
+        }
+        _BACKPACK_SUMMARIES[user_id] = summary
+        while len(_BACKPACK_SUMMARIES) > BACKPACK_SUMMARY_MAX_ENTRIES:
+            _BACKPACK_SUMMARIES.popitem(last=False)
+        return summary
+
+    async def get_category_page(
+        self,
+        user_id: int,
+        category: str,
+        after_id: Optional[int] = None,
+        limit: int = BACKPACK_PAGE_SIZE,
+    ) -> Tuple[List[Tuple[LorePiece, datetime, Optional[dict]]], Optional[int]]:
+        """
+        Página de pistas de una categoría, de la más reciente a la más antigua.
+        ``after_id`` es la última pista de la página anterior (paginación por clave).
+        Returns: (filas, cursor de la siguiente página o None)
+        """
+        category_filter = LorePiece.category == category
+        if category == DEFAULT_CATEGORY:
+            category_filter = or_(category_filter, LorePiece.category.is_(None))
+
+        query = (
+            select(LorePiece, UserLorePiece.unlocked_at, UserLorePiece.context)
+            .join(UserLorePiece, LorePiece.id == UserLorePiece.lore_piece_id)
+            .where(and_(UserLorePiece.user_id == user_id, category_filter))
+            .order_by(UserLorePiece.unlocked_at.desc(), UserLorePiece.lore_piece_id.desc())
+            .limit(limit + 1)
+        )
+
+        if after_id is not None:
+            cursor_at = (
+                select(UserLorePiece.unlocked_at)
+                .where(
+                    UserLorePiece.user_id == user_id,
+                    UserLorePiece.lore_piece_id == after_id,
+                )
+                .scalar_subquery()
+            )
+            query = query.where(
+                or_(
+                    UserLorePiece.unlocked_at < cursor_at,
+                    and_(
+                        UserLorePiece.unlocked_at == cursor_at,
+                        UserLorePiece.lore_piece_id < after_id,
+                    ),
+                )
+            )
+
+        rows = (await self.session.execute(query)).all()
+        next_cursor = rows[limit - 1][0].id if len(rows) > limit else None
+        return [tuple(row) for row in rows[:limit]], next_cursor
+
+    async def get_user_piece(
+        self, user_id: int, lore_piece_id: int
+    ) -> Optional[Tuple[LorePiece, datetime, Optional[dict]]]:
+        """Pista desbloqueada por el usuario junto con su fecha y contexto."""
+        result = await self.session.execute(
+            select(LorePiece, UserLorePiece.unlocked_at, UserLorePiece.context)
+            .join(UserLorePiece, LorePiece.id == UserLorePiece.lore_piece_id)
+            .where(
+                UserLorePiece.user_id == user_id,
+                UserLorePiece.lore_piece_id == lore_piece_id,
+            )
+        )
+        row = result.first()
+        return tuple(row) if row else None
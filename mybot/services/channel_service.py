@@ -8,9 +8,18 @@ from typing import Union
 from database.models import Channel
 from utils.text_utils import sanitize_text
 from utils.config import DEFAULT_REACTION_BUTTONS
+from utils.cache_bus import shared_invalidation
 
 logger = logging.getLogger(__name__)
 
+# channel_id -> (reactions, points); rebuilt after set_reactions/remove_channel
+_CHANNEL_REACTIONS: dict[int, tuple[list[str], dict[str, float]]] = {}
+
+
+@shared_invalidation("channel_reactions")
+def invalidate_channel_reactions(chat_id: int) -> None:
+    _CHANNEL_REACTIONS.pop(chat_id, None)
+
 
 class ChannelService:
     def __init__(self, session: AsyncSession):
@@ -38,6 +47,7 @@ class ChannelService:
         if channel:
             await self.session.delete(channel)
             await self.session.commit()
+        invalidate_channel_reactions(chat_id)
 
     async def set_reactions(
         self,
@@ -76,6 +86,7 @@ class ChannelService:
 
         await self.session.commit()
         await self.session.refresh(channel or new_channel)
+        invalidate_channel_reactions(channel_id_int)
         logger.info(
             "Reacciones actualizadas para el canal %s: %s, Puntos: %s",
             channel_id_int,
@@ -98,6 +109,10 @@ class ChannelService:
                 r: 0.5 for r in DEFAULT_REACTION_BUTTONS
             }
 
+        cached = _CHANNEL_REACTIONS.get(channel_id_int)
+        if cached is not None:
+            return cached
+
         channel = await self.session.get(Channel, channel_id_int)
 
         configured_reactions: list[str] = []
@@ -130,6 +145,7 @@ class ChannelService:
             configured_reactions,
             final_points,
         )
+        _CHANNEL_REACTIONS[channel_id_int] = (configured_reactions, final_points)
         return configured_reactions, final_points
 
     async def get_reaction_points(self, chat_id: int) -> dict[str, float]:
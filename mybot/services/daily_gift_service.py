@@ -26,7 +26,7 @@ class DailyGiftService:
             points = int(amount_str) if amount_str else 5
         except Exception:
             points = 5
-        await self.point_service.add_points(user_id, points, bot=bot)
+        await self.point_service.add_points(user_id, points, bot=bot, source="daily_gift")
         progress.last_daily_gift_at = now
         await self.session.commit()
         return True, points
@@ -365,7 +365,7 @@ class FreeChannelService:
             
             logger.info(f"Message sent to free channel: {sent_message.message_id}")
             if reply_markup:
-                store_message(free_channel_id, sent_message.message_id)
+                await store_message(self.session, free_channel_id, sent_message.message_id)
             return sent_message
             
         except Exception as e:
@@ -0,0 +1,188 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.hint_combination import HintCombination, compute_hints_key
+from database.models import LorePiece, UserLorePiece
+from utils.cache_bus import shared_invalidation
+
+logger = logging.getLogger(__name__)
+
+# Máximo de usuarios con máscara de pistas en memoria
+USER_HINT_MASK_MAX_ENTRIES = 10000
+# Segundos antes de recargar el índice (las combinaciones se editan en la base)
+HINT_COMBINATION_CACHE_TTL = 300
+
+
+class CombinationEntry(NamedTuple):
+    """Copia ligera de una combinación, segura fuera de la sesión que la cargó."""
+    id: int
+    combination_code: str
+    required_hints: Tuple[str, ...]
+    reward_code: str
+
+
+class _CombinationIndex:
+    """
+    Índices precalculados sobre todas las combinaciones:
+    - by_key: hints_key -> combinación (coincidencia exacta)
+    - hint_bits / bit_hints: código de pista <-> bit asignado
+    - masks: posición de combinación -> máscara de pistas requeridas
+    - by_hint: código de pista -> posiciones de combinaciones que la incluyen
+    """
+
+    def __init__(self, combinations: Iterable[HintCombination]):
+        self.entries: List[CombinationEntry] = []
+        self.masks: List[int] = []
+        self.by_key: Dict[str, CombinationEntry] = {}
+        self.hint_bits: Dict[str, int] = {}
+        self.bit_hints: List[str] = []
+        self.by_hint: Dict[str, List[int]] = {}
+
+        for combination in combinations:
+            entry = CombinationEntry(
+                id=combination.id,
+                combination_code=combination.combination_code,
+                required_hints=tuple(combination.required_hints.split(",")),
+                reward_code=combination.reward_code,
+            )
+            position = len(self.entries)
+            mask = 0
+            for code in entry.required_hints:
+                bit = self.hint_bits.get(code)
+                if bit is None:
+                    bit = self.hint_bits[code] = len(self.bit_hints)
+                    self.bit_hints.append(code)
+                mask |= 1 << bit
+                self.by_hint.setdefault(code, []).append(position)
+            self.entries.append(entry)
+            self.masks.append(mask)
+            self.by_key[combination.hints_key] = entry
+
+    def mask_for(self, codes: Iterable[str]) -> int:
+        """Máscara de las pistas dadas; ignora las que no forman parte de ninguna combinación."""
+        mask = 0
+        for code in codes:
+            bit = self.hint_bits.get(code)
+            if bit is not None:
+                mask |= 1 << bit
+        return mask
+
+
+# None mientras no se haya cargado
+_COMBINATION_INDEX: Optional[_CombinationIndex] = None
+_index_loaded_at = 0.0
+# user_id -> máscara de pistas poseídas (bits del índice actual)
+_USER_HINT_MASKS: "OrderedDict[int, int]" = OrderedDict()
+
+
+@shared_invalidation("user_hint", per_user=True)
+def register_user_hint(user_id: int, hint_code: str) -> None:
+    """Añade una pista recién desbloqueada a la máscara cacheada del usuario."""
+    mask = _USER_HINT_MASKS.get(user_id)
+    if mask is None or _COMBINATION_INDEX is None:
+        return
+    bit = _COMBINATION_INDEX.hint_bits.get(hint_code)
+    if bit is not None:
+        _USER_HINT_MASKS[user_id] = mask | (1 << bit)
+
+
+@shared_invalidation("user_hints", per_user=True)
+def invalidate_user_hints(user_id: int = None) -> None:
+    """Descarta la máscara de un usuario o de todos."""
+    if user_id:
+        _USER_HINT_MASKS.pop(user_id, None)
+    else:
+        _USER_HINT_MASKS.clear()
+
+
+class HintCombinationService:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_index(self) -> _CombinationIndex:
+        """Índices de combinaciones, recargados cada HINT_COMBINATION_CACHE_TTL segundos."""
+        global _COMBINATION_INDEX, _index_loaded_at
+        now = time.monotonic()
+        if _COMBINATION_INDEX is None or now - _index_loaded_at > HINT_COMBINATION_CACHE_TTL:
+            result = await self.session.execute(select(HintCombination))
+            _COMBINATION_INDEX = _CombinationIndex(result.scalars().all())
+            _index_loaded_at = now
+            # Las máscaras dependen de los bits asignados por el índice
+            _USER_HINT_MASKS.clear()
+            logger.info(f"Loaded {len(_COMBINATION_INDEX.entries)} hint combinations into index")
+        return _COMBINATION_INDEX
+
+    async def find_combination(self, hint_codes: Iterable[str]) -> Optional[CombinationEntry]:
+        """Busca la combinación que coincide exactamente con las pistas dadas."""
+        index = await self.get_index()
+        return index.by_key.get(compute_hints_key(hint_codes))
+
+    async def list_combinations(self) -> List[CombinationEntry]:
+        index = await self.get_index()
+        return list(index.entries)
+
+    async def get_user_hint_mask(self, user_id: int, index: Optional[_CombinationIndex] = None) -> int:
+        """Máscara de las pistas combinables que posee el usuario."""
+        if index is None:
+            index = await self.get_index()
+        mask = _USER_HINT_MASKS.get(user_id)
+        if mask is not None:
+            _USER_HINT_MASKS.move_to_end(user_id)
+            return mask
+
+        result = await self.session.execute(
+            select(LorePiece.code_name)
+            .join(UserLorePiece, LorePiece.id == UserLorePiece.lore_piece_id)
+            .where(UserLorePiece.user_id == user_id)
+        )
+        mask = index.mask_for(row[0] for row in result.all())
+        _USER_HINT_MASKS[user_id] = mask
+        while len(_USER_HINT_MASKS) > USER_HINT_MASK_MAX_ENTRIES:
+            _USER_HINT_MASKS.popitem(last=False)
+        return mask
+
+    async def get_completable_combinations(
+        self, user_id: int, hint_code: str | None = None
+    ) -> List[CombinationEntry]:
+        """Combinaciones cuyas pistas posee el usuario (opcionalmente, que incluyan hint_code)."""
+        completable, _ = await self.analyze_user_combinations(user_id, hint_code)
+        return completable
+
+    async def analyze_user_combinations(
+        self, user_id: int, hint_code: str | None = None
+    ) -> Tuple[List[CombinationEntry], List[Tuple[CombinationEntry, str]]]:
+        """
+        Clasifica las combinaciones que tocan las pistas del usuario
+        Returns: (completables, [(a_una_pieza, código_que_falta)])
+        """
+        index = await self.get_index()
+        # Mismo índice para la máscara: una recarga entre ambas cambiaría los bits
+        owned = await self.get_user_hint_mask(user_id, index)
+        if not owned:
+            return [], []
+
+        if hint_code is not None:
+            candidates = set(index.by_hint.get(hint_code, ()))
+        else:
+            # Solo las combinaciones que comparten al menos una pista con el usuario
+            candidates = set()
+            remaining = owned
+            while remaining:
+                low = remaining & -remaining
+                candidates.update(index.by_hint[index.bit_hints[low.bit_length() - 1]])
+                remaining ^= low
+
+        completable = []
+        near = []
+        for position in sorted(candidates):
+            missing = index.masks[position] & ~owned
+            if not missing:
+                completable.append(index.entries[position])
+            elif missing & (missing - 1) == 0:
+                near.append((index.entries[position], index.bit_hints[missing.bit_length() - 1]))
+        return completable, near
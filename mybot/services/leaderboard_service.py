@@ -0,0 +1,226 @@
+"""
+In-memory leaderboards kept in sync with every point change.
+
+Three boards are maintained: all-time (current balance), weekly and daily
+(points earned since the period started, from the point ledger). They are
+seeded from the database on first use and then updated incrementally by
+``record_point_change``, so top-K, a user's rank and their neighbours are
+O(log n) lookups instead of ORDER BY/COUNT queries. Other workers are only
+told which user changed and re-read that user's period totals, so a change is
+never counted twice on a worker that seeded its boards after the commit.
+"""
+import asyncio
+import datetime
+import logging
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import User, PointTransaction
+from utils.cache_bus import cache_bus, shared_invalidation
+from utils.skiplist import IndexableSkipList
+
+logger = logging.getLogger(__name__)
+
+BOARD_ALL_TIME = "all_time"
+BOARD_WEEKLY = "weekly"
+BOARD_DAILY = "daily"
+LEADERBOARD_BOARDS = (BOARD_ALL_TIME, BOARD_WEEKLY, BOARD_DAILY)
+# Ledger entries that only align bookkeeping and are not points earned
+_NON_EARNED_SOURCES = ("opening_balance", "reconciliation")
+
+RankedEntry = Tuple[int, int, float]  # (rank, user_id, score)
+
+
+class Leaderboard:
+    """Scores of one board ordered by (score desc, user_id asc)."""
+
+    def __init__(self):
+        self._scores: Dict[int, float] = {}
+        self._ranked = IndexableSkipList()
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def score(self, user_id: int) -> Optional[float]:
+        return self._scores.get(user_id)
+
+    def set(self, user_id: int, score: float) -> None:
+        current = self._scores.get(user_id)
+        if current == score:
+            return
+        if current is not None:
+            self._ranked.remove((-current, user_id))
+        if score > 0:
+            self._scores[user_id] = score
+            self._ranked.insert((-score, user_id))
+        else:
+            # Users without points stay out of the ranking
+            self._scores.pop(user_id, None)
+
+    def add(self, user_id: int, amount: float) -> None:
+        self.set(user_id, self._scores.get(user_id, 0) + amount)
+
+    def rank(self, user_id: int) -> Optional[int]:
+        """1-based position of the user, or None when not ranked."""
+        score = self._scores.get(user_id)
+        if score is None:
+            return None
+        return self._ranked.index((-score, user_id)) + 1
+
+    def top(self, limit: int) -> List[RankedEntry]:
+        return self._slice(0, limit)
+
+    def around(self, user_id: int, radius: int = 2) -> List[RankedEntry]:
+        """The user with up to ``radius`` neighbours above and below."""
+        rank = self.rank(user_id)
+        if rank is None:
+            return []
+        start = max(rank - 1 - radius, 0)
+        return self._slice(start, rank - start + radius)
+
+    def _slice(self, start: int, count: int) -> List[RankedEntry]:
+        return [
+            (start + offset + 1, user_id, -negative_score)
+            for offset, (negative_score, user_id) in enumerate(self._ranked.iter_from(start, count))
+        ]
+
+
+def _period_start(board: str, at: datetime.datetime) -> Optional[datetime.datetime]:
+    if board == BOARD_ALL_TIME:
+        return None
+    day = at.replace(hour=0, minute=0, second=0, microsecond=0)
+    if board == BOARD_WEEKLY:
+        return day - datetime.timedelta(days=day.weekday())
+    return day
+
+
+# board name -> board; empty until seeded from the database
+_BOARDS: Dict[str, Leaderboard] = {}
+# board name -> start of the period the board currently covers
+_PERIOD_STARTS: Dict[str, Optional[datetime.datetime]] = {}
+# users whose weekly/daily scores changed on another worker
+_STALE_USERS: Set[int] = set()
+_load_lock = asyncio.Lock()
+
+
+def _roll_periods(now: datetime.datetime) -> None:
+    """Start empty weekly/daily boards when their period has ended."""
+    for board in (BOARD_WEEKLY, BOARD_DAILY):
+        start = _period_start(board, now)
+        if board in _BOARDS and _PERIOD_STARTS.get(board) != start:
+            logger.info(f"Leaderboard {board} rolled over to {start:%Y-%m-%d}")
+            _BOARDS[board] = Leaderboard()
+            _PERIOD_STARTS[board] = start
+
+
+def record_point_change(user_id: int, amount: float, balance: float) -> None:
+    """Apply a committed balance change to the loaded boards."""
+    if _BOARDS:
+        _roll_periods(datetime.datetime.utcnow())
+        _BOARDS[BOARD_ALL_TIME].set(user_id, balance)
+        if amount > 0:
+            _BOARDS[BOARD_WEEKLY].add(user_id, amount)
+            _BOARDS[BOARD_DAILY].add(user_id, amount)
+    # Deltas are not replayed: other workers reload the user's period totals
+    cache_bus.publish("leaderboard_user", user_id, balance)
+
+
+def _mark_user_stale(user_id: int, balance: float) -> None:
+    """Handle a point change committed on another worker."""
+    if not _BOARDS:
+        return
+    # The balance is absolute, so applying it is safe whenever the boards were seeded
+    _BOARDS[BOARD_ALL_TIME].set(user_id, balance)
+    _STALE_USERS.add(user_id)
+
+
+cache_bus.subscribe("leaderboard_user", _mark_user_stale)
+
+
+@shared_invalidation("leaderboards")
+def invalidate_leaderboards() -> None:
+    """Drop every board; they are rebuilt from the database on next use."""
+    _BOARDS.clear()
+    _PERIOD_STARTS.clear()
+    _STALE_USERS.clear()
+
+
+class LeaderboardService:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def _board(self, board: str) -> Leaderboard:
+        if board not in LEADERBOARD_BOARDS:
+            raise ValueError(f"Unknown leaderboard: {board}")
+        if not _BOARDS:
+            async with _load_lock:
+                if not _BOARDS:
+                    await self._load()
+        _roll_periods(datetime.datetime.utcnow())
+        if _STALE_USERS:
+            await self._refresh_users()
+        return _BOARDS[board]
+
+    async def _period_totals(self, start: datetime.datetime, user_ids: Optional[Iterable[int]] = None):
+        query = (
+            select(PointTransaction.user_id, func.sum(PointTransaction.amount))
+            .where(
+                PointTransaction.created_at >= start,
+                PointTransaction.amount > 0,
+                PointTransaction.source.not_in(_NON_EARNED_SOURCES),
+            )
+            .group_by(PointTransaction.user_id)
+        )
+        if user_ids is not None:
+            query = query.where(PointTransaction.user_id.in_(user_ids))
+        return await self.session.execute(query)
+
+    async def _refresh_users(self) -> None:
+        """Re-read weekly/daily totals of users changed on other workers."""
+        user_ids = set(_STALE_USERS)
+        _STALE_USERS.difference_update(user_ids)
+        for board in (BOARD_WEEKLY, BOARD_DAILY):
+            totals = dict((await self._period_totals(_PERIOD_STARTS[board], user_ids)).all())
+            for user_id in user_ids:
+                _BOARDS[board].set(user_id, totals.get(user_id, 0))
+
+    async def _load(self) -> None:
+        now = datetime.datetime.utcnow()
+        boards = {board: Leaderboard() for board in LEADERBOARD_BOARDS}
+        starts = {board: _period_start(board, now) for board in LEADERBOARD_BOARDS}
+
+        rows = await self.session.execute(select(User.id, User.points).where(User.points > 0))
+        for user_id, points in rows:
+            boards[BOARD_ALL_TIME].set(user_id, points)
+        for board in (BOARD_WEEKLY, BOARD_DAILY):
+            for user_id, total in await self._period_totals(starts[board]):
+                boards[board].set(user_id, total)
+
+        _BOARDS.update(boards)
+        _PERIOD_STARTS.update(starts)
+        logger.info(f"Leaderboards loaded: {len(boards[BOARD_ALL_TIME])} ranked users")
+
+    async def warm_up(self) -> None:
+        """Seed the boards now instead of on the first ranking request."""
+        await self._board(BOARD_ALL_TIME)
+
+    async def get_top(self, limit: int = 10, board: str = BOARD_ALL_TIME) -> List[RankedEntry]:
+        return (await self._board(board)).top(limit)
+
+    async def get_rank(self, user_id: int, board: str = BOARD_ALL_TIME) -> Optional[int]:
+        return (await self._board(board)).rank(user_id)
+
+    async def get_neighbors(self, user_id: int, radius: int = 2, board: str = BOARD_ALL_TIME) -> List[RankedEntry]:
+        return (await self._board(board)).around(user_id, radius)
+
+    async def get_ranked_count(self, board: str = BOARD_ALL_TIME) -> int:
+        return len(await self._board(board))
+
+    async def load_users(self, user_ids: List[int]) -> Dict[int, User]:
+        """Fetch the users shown on a board in a single query."""
+        if not user_ids:
+            return {}
+        result = await self.session.execute(select(User).where(User.id.in_(user_ids)))
+        return {user.id: user for user in result.scalars()}
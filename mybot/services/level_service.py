@@ -4,6 +4,9 @@ from aiogram import Bot
 
 from database.models import User, Level, LorePiece, UserLorePiece
 from utils.messages import BOT_MESSAGES
+from narrative.requirement_cache import invalidate_requirement_snapshot
+from services.hint_combination_service import register_user_hint
+from services.backpack_service import record_backpack_unlock
 import logging
 
 logger = logging.getLogger(__name__)
@@ -168,6 +171,9 @@ class LevelService:
                     if not exists:
                         self.session.add(UserLorePiece(user_id=user.id, lore_piece_id=lore_piece.id))
                         await self.session.commit()
+                        invalidate_requirement_snapshot(user.id)
+                        register_user_hint(user.id, lore_piece.code_name)
+                        record_backpack_unlock(user.id, lore_piece)
                         if bot:
                             await bot.send_message(user.id, f"Has desbloqueado una nueva pista: {lore_piece.title}")
                         logger.info(
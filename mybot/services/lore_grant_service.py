@@ -0,0 +1,148 @@
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from aiogram import Bot
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import LorePiece, User, UserLorePiece
+from database.upsert import upsert_insert
+from narrative.requirement_cache import invalidate_requirement_snapshot
+from notificaciones import narrative_notification_text
+from services.backpack_service import record_backpack_unlock
+from services.hint_combination_service import register_user_hint
+from utils.notification_queue import notification_queue
+
+logger = logging.getLogger(__name__)
+
+# Filas insertadas por sentencia/commit
+LORE_GRANT_BATCH_SIZE = 1000
+
+
+class LoreGrantService:
+    """Concede una pieza de lore a un segmento de usuarios en lotes."""
+
+    def __init__(self, session: AsyncSession, bot: Bot | None = None, batch_size: int = LORE_GRANT_BATCH_SIZE):
+        self.session = session
+        self.bot = bot
+        self.batch_size = batch_size
+
+    async def grant_to_segment(
+        self,
+        code_name: str,
+        *,
+        user_ids: Iterable[int] | None = None,
+        role: str | None = None,
+        min_level: int | None = None,
+        max_level: int | None = None,
+        context: dict | None = None,
+        notify: bool = True,
+        origen: str = "Sistema",
+    ) -> Optional[Dict[str, int]]:
+        """
+        Concede ``code_name`` a los usuarios que cumplan todos los filtros dados.
+        Los usuarios que ya la tienen se omiten sin consultarlos uno a uno.
+        Returns: {"targeted", "granted"} o None si la pieza no existe.
+        """
+        piece = (
+            await self.session.execute(select(LorePiece).where(LorePiece.code_name == code_name))
+        ).scalar_one_or_none()
+        if not piece:
+            return None
+
+        explicit_ids = sorted(set(user_ids)) if user_ids is not None else None
+        targeted = 0
+        granted = 0
+        last_id = None
+        while True:
+            batch = await self._next_batch(explicit_ids, last_id, role, min_level, max_level)
+            if not batch:
+                break
+            last_id = batch[-1]
+            targeted += len(batch)
+
+            new_ids = await self._insert_batch(batch, piece, context or {})
+            await self.session.commit()
+            granted += len(new_ids)
+
+            for user_id in new_ids:
+                invalidate_requirement_snapshot(user_id)
+                register_user_hint(user_id, piece.code_name)
+                record_backpack_unlock(user_id, piece)
+                if notify and self.bot:
+                    notification_queue.enqueue(
+                        self.bot, user_id, narrative_notification_text(piece.title, origen)
+                    )
+
+        logger.info(
+            f"Lore piece {code_name} granted to {granted}/{targeted} users "
+            f"(role={role}, levels={min_level}-{max_level})"
+        )
+        return {"targeted": targeted, "granted": granted}
+
+    async def _next_batch(
+        self,
+        explicit_ids: Optional[List[int]],
+        last_id: Optional[int],
+        role: Optional[str],
+        min_level: Optional[int],
+        max_level: Optional[int],
+    ) -> List[int]:
+        """Siguiente lote de IDs del segmento, paginado por User.id."""
+        query = select(User.id).order_by(User.id).limit(self.batch_size)
+        if last_id is not None:
+            query = query.where(User.id > last_id)
+        if explicit_ids is not None:
+            start = 0
+            if last_id is not None:
+                # explicit_ids está ordenado: continuar tras el último procesado
+                start = next((i for i, uid in enumerate(explicit_ids) if uid > last_id), len(explicit_ids))
+            chunk = explicit_ids[start:start + self.batch_size]
+            if not chunk:
+                return []
+            query = query.where(User.id.in_(chunk))
+        if role is not None:
+            query = query.where(User.role == role)
+        if min_level is not None:
+            query = query.where(User.level >= min_level)
+        if max_level is not None:
+            query = query.where(User.level <= max_level)
+        batch = list((await self.session.execute(query)).scalars().all())
+        if not batch and explicit_ids is not None and chunk:
+            # Ningún ID del bloque cumple los filtros: pasar al siguiente bloque
+            return await self._next_batch(explicit_ids, chunk[-1], role, min_level, max_level)
+        return batch
+
+    async def _insert_batch(self, user_ids: List[int], piece: LorePiece, context: dict) -> List[int]:
+        """Inserta las filas que falten y devuelve los usuarios realmente nuevos."""
+        now = datetime.now()
+        rows = [
+            {"user_id": user_id, "lore_piece_id": piece.id, "unlocked_at": now, "context": context}
+            for user_id in user_ids
+        ]
+        insert = upsert_insert(self.session)
+        if insert is not None:
+            stmt = (
+                insert(UserLorePiece)
+                .values(rows)
+                .on_conflict_do_nothing(index_elements=["user_id", "lore_piece_id"])
+                .returning(UserLorePiece.user_id)
+            )
+            return list((await self.session.execute(stmt)).scalars().all())
+
+        # Otros motores: descartar primero los que ya la tienen
+        existing = set(
+            (
+                await self.session.execute(
+                    select(UserLorePiece.user_id).where(
+                        UserLorePiece.lore_piece_id == piece.id,
+                        UserLorePiece.user_id.in_(user_ids),
+                    )
+                )
+            ).scalars().all()
+        )
+        new_rows = [row for row in rows if row["user_id"] not in existing]
+        if new_rows:
+            await self.session.execute(UserLorePiece.__table__.insert(), new_rows)
+        return [row["user_id"] for row in new_rows]
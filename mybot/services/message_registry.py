@@ -1,32 +1,170 @@
+import asyncio
 import logging
-from typing import Set, Tuple
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from sqlalchemy import select, delete, func, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import SentMessage
+from utils.bloom_filter import BloomFilter
+from utils.cache_bus import shared_invalidation
+from utils.config import MESSAGE_REGISTRY_TTL_DAYS
 
 logger = logging.getLogger(__name__)
 
-# In-memory storage of messages sent by the bot
-_SENT_MESSAGES: Set[Tuple[int, int]] = set()
+# Recently stored/validated messages kept in memory
+MESSAGE_REGISTRY_LRU_SIZE = 10000
+# Minimum number of keys the Bloom filter is sized for
+MESSAGE_REGISTRY_BLOOM_CAPACITY = 200000
+# Rows read per query when the Bloom filter is (re)built
+MESSAGE_REGISTRY_LOAD_BATCH = 5000
 
+MessageKey = Tuple[int, int]
 
-def store_message(chat_id: int | str, message_id: int) -> None:
-    """Store chat_id and message_id for a message sent by the bot."""
+# (chat_id, message_id) -> stored at, least recently used first
+_RECENT: "OrderedDict[MessageKey, datetime]" = OrderedDict()
+# Every registered message within the TTL; None until loaded from the database
+_bloom: Optional[BloomFilter] = None
+# Keys registered while the filter is being loaded; None when no load runs
+_pending_keys: Optional[list] = None
+_bloom_lock = asyncio.Lock()
+
+
+def _ttl_cutoff() -> datetime:
+    return datetime.utcnow() - timedelta(days=MESSAGE_REGISTRY_TTL_DAYS)
+
+
+def _bloom_key(key: MessageKey) -> str:
+    return f"{key[0]}:{key[1]}"
+
+
+def _remember(key: MessageKey, stored_at: datetime) -> None:
+    _RECENT[key] = stored_at
+    _RECENT.move_to_end(key)
+    while len(_RECENT) > MESSAGE_REGISTRY_LRU_SIZE:
+        _RECENT.popitem(last=False)
+
+
+def _to_int(chat_id: int | str, action: str) -> Optional[int]:
     try:
-        chat_int = int(chat_id)
+        return int(chat_id)
     except (TypeError, ValueError):
-        logger.error(f"Invalid chat_id provided for store_message: {chat_id}")
+        logger.error(f"Invalid chat_id provided for {action}: {chat_id}")
+        return None
+
+
+@shared_invalidation("sent_message")
+def _register_sent(chat_id: int, message_id: int) -> None:
+    """Add a stored message to the Bloom filter (on every worker)."""
+    global _bloom
+    if _bloom is not None:
+        _bloom.add(_bloom_key((chat_id, message_id)))
+        if _bloom.count > _bloom.capacity:
+            # Over capacity the false-positive rate climbs: rebuild on next use
+            _bloom = None
+    elif _pending_keys is not None:
+        # The running load may have read past this row already
+        _pending_keys.append((chat_id, message_id))
+
+
+async def store_message(session: AsyncSession, chat_id: int | str, message_id: int) -> None:
+    """Store chat_id and message_id for a message sent by the bot."""
+    chat_int = _to_int(chat_id, "store_message")
+    if chat_int is None:
         return
-    _SENT_MESSAGES.add((chat_int, message_id))
+    now = datetime.utcnow()
+    await session.merge(SentMessage(chat_id=chat_int, message_id=message_id, created_at=now))
+    await session.commit()
+
+    _remember((chat_int, message_id), now)
+    _register_sent(chat_int, message_id)
     logger.info(f"Stored message ({chat_int}, {message_id})")
 
 
-def validate_message(chat_id: int | str, message_id: int) -> bool:
-    """Return True if the message pair exists in the store."""
-    try:
-        chat_int = int(chat_id)
-    except (TypeError, ValueError):
-        logger.error(f"Invalid chat_id provided for validate_message: {chat_id}")
+async def validate_message(session: AsyncSession, chat_id: int | str, message_id: int) -> bool:
+    """Return True if the bot sent the message and it has not expired."""
+    chat_int = _to_int(chat_id, "validate_message")
+    if chat_int is None:
         return False
-    valid = (chat_int, message_id) in _SENT_MESSAGES
+    key = (chat_int, message_id)
+    cutoff = _ttl_cutoff()
+
+    stored_at = _RECENT.get(key)
+    if stored_at is not None and stored_at >= cutoff:
+        _RECENT.move_to_end(key)
+        valid = True
+    elif not (await _get_bloom(session)).might_contain(_bloom_key(key)):
+        valid = False
+    else:
+        row = await session.get(SentMessage, key)
+        valid = row is not None and row.created_at is not None and row.created_at >= cutoff
+        if valid:
+            _remember(key, row.created_at)
+
     logger.info(
         f"Validation attempt for chat_id={chat_int}, message_id={message_id}: {valid}"
     )
     return valid
+
+
+async def purge_expired_messages(session: AsyncSession) -> int:
+    """Delete messages older than the TTL and rebuild the Bloom filter lazily."""
+    global _bloom
+    cutoff = _ttl_cutoff()
+    result = await session.execute(delete(SentMessage).where(SentMessage.created_at < cutoff))
+    await session.commit()
+    for key in [key for key, stored_at in _RECENT.items() if stored_at < cutoff]:
+        del _RECENT[key]
+    # Bloom filters cannot forget keys
+    _bloom = None
+    if result.rowcount:
+        logger.info(f"Purged {result.rowcount} expired messages from the registry")
+    return result.rowcount or 0
+
+
+async def _get_bloom(session: AsyncSession) -> BloomFilter:
+    """Return the Bloom filter, loading it from the database on first use."""
+    global _bloom, _pending_keys
+    if _bloom is not None:
+        return _bloom
+    async with _bloom_lock:
+        if _bloom is not None:
+            return _bloom
+        _pending_keys = []
+        try:
+            bloom = await _load_bloom(session)
+            for key in _pending_keys:
+                bloom.add(_bloom_key(key))
+        finally:
+            _pending_keys = None
+        _bloom = bloom
+        logger.info(f"Message registry Bloom filter loaded with {bloom.count} messages")
+        return _bloom
+
+
+async def _load_bloom(session: AsyncSession) -> BloomFilter:
+    """Build a Bloom filter with every message within the TTL."""
+    cutoff = _ttl_cutoff()
+    total = await session.scalar(
+        select(func.count()).select_from(SentMessage).where(SentMessage.created_at >= cutoff)
+    )
+    bloom = BloomFilter(max(MESSAGE_REGISTRY_BLOOM_CAPACITY, 2 * (total or 0)))
+    last_key = None
+    while True:
+        query = (
+            select(SentMessage.chat_id, SentMessage.message_id)
+            .where(SentMessage.created_at >= cutoff)
+            .order_by(SentMessage.chat_id, SentMessage.message_id)
+            .limit(MESSAGE_REGISTRY_LOAD_BATCH)
+        )
+        if last_key is not None:
+            query = query.where(tuple_(SentMessage.chat_id, SentMessage.message_id) > last_key)
+        rows = (await session.execute(query)).all()
+        if not rows:
+            break
+        for row in rows:
+            bloom.add(_bloom_key(tuple(row)))
+        last_key = tuple(rows[-1])
+    return bloom
@@ -8,19 +8,73 @@ from aiogram.exceptions import (
     TelegramAPIError,
 )
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, delete, func
+from sqlalchemy.exc import IntegrityError
+from collections import Counter, OrderedDict
 import datetime
 import logging
+import time
 
 from .config_service import ConfigService
 from .channel_service import ChannelService
-from database.models import ButtonReaction
+from database.models import ButtonReaction, ReactionBucket
+from database.upsert import upsert_insert
 from keyboards.inline_post_kb import get_reaction_kb
 from services.message_registry import store_message
+from utils.markup_debouncer import markup_debouncer
+from utils.cache_bus import cache_bus, shared_invalidation
 from utils.config import VIP_CHANNEL_ID, FREE_CHANNEL_ID
 
 logger = logging.getLogger(__name__)
 
+# Interactive posts whose reaction counters are kept in memory
+REACTION_COUNTER_MAX_MESSAGES = 2000
+
+# message_id -> Counter(reaction_type -> count), seeded once from ButtonReaction
+_REACTION_COUNTS: "OrderedDict[int, Counter]" = OrderedDict()
+# message_id -> seeding queries in flight; changes meanwhile make their result stale
+_SEEDING: dict[int, int] = {}
+_STALE_SEEDS: set[int] = set()
+
+# Sliding window of the weekly reaction ranking, in days
+WEEKLY_RANKING_WINDOW_DAYS = 7
+# Seconds a computed weekly ranking is served from memory
+WEEKLY_RANKING_CACHE_TTL = 60
+# Ranking positions computed (and cached) per refresh
+WEEKLY_RANKING_CACHE_SIZE = 10
+
+# (computed at, [(user_id, count), ...]) of the last weekly ranking
+_WEEKLY_RANKING: tuple[float, list[tuple[int, int]]] | None = None
+_reaction_buckets_checked = False
+_next_bucket_purge = 0.0
+
+
+def _bucket_start(at: datetime.datetime) -> datetime.datetime:
+    return at.replace(minute=0, second=0, microsecond=0)
+
+
+def bump_reaction_count(message_id: int, reaction_type: str) -> None:
+    """Count a new reaction on a post whose counters are already loaded."""
+    counts = _REACTION_COUNTS.get(message_id)
+    if counts is not None:
+        counts[reaction_type] += 1
+    elif message_id in _SEEDING:
+        _STALE_SEEDS.add(message_id)
+    # Other workers may have seeded after the commit; they reseed instead of adding
+    cache_bus.publish("reaction_counts", message_id)
+
+
+@shared_invalidation("reaction_counts")
+def invalidate_reaction_counts(message_id: int | None = None) -> None:
+    """Drop cached counters so they are reseeded from the database."""
+    if message_id is None:
+        _REACTION_COUNTS.clear()
+        _STALE_SEEDS.update(_SEEDING)
+    else:
+        _REACTION_COUNTS.pop(message_id, None)
+        if message_id in _SEEDING:
+            _STALE_SEEDS.add(message_id)
+
 
 class MessageService:
     def __init__(self, session: AsyncSession, bot: Bot):
@@ -88,7 +142,7 @@ class MessageService:
                 message_id=real_message_id,
                 reply_markup=updated_markup,
             )
-            store_message(target_channel_id, real_message_id)
+            await store_message(self.session, target_channel_id, real_message_id)
 
             if channel_type == "vip":
                 vip_reactions = await config.get_vip_reactions()
@@ -142,7 +196,10 @@ class MessageService:
             reaction_type=reaction_type,
         )
         self.session.add(reaction)
+        await self._count_in_bucket(user_id)
         await self.session.commit()
+        # No await before the bump: a seed reading the committed row must not see it twice
+        bump_reaction_count(message_id, reaction_type)
         await self.session.refresh(reaction)
 
         from services.mission_service import MissionService
@@ -161,57 +218,141 @@ class MessageService:
         return reaction
 
     async def get_reaction_counts(self, message_id: int) -> dict[str, int]:
-        """Return reaction counts for the given message."""
-        stmt = (
-            select(ButtonReaction.reaction_type, func.count(ButtonReaction.id))
-            .where(ButtonReaction.message_id == message_id)
-            .group_by(ButtonReaction.reaction_type)
-        )
-        result = await self.session.execute(stmt)
-        return {row[0]: row[1] for row in result.all()}
+        """Return reaction counts for the given message.
+
+        Counts are aggregated from ``ButtonReaction`` only the first time a
+        post is seen; afterwards ``register_reaction`` keeps them current.
+        """
+        counts = _REACTION_COUNTS.get(message_id)
+        if counts is None:
+            stmt = (
+                select(ButtonReaction.reaction_type, func.count(ButtonReaction.id))
+                .where(ButtonReaction.message_id == message_id)
+                .group_by(ButtonReaction.reaction_type)
+            )
+            _SEEDING[message_id] = _SEEDING.get(message_id, 0) + 1
+            try:
+                seeded = Counter(dict((await self.session.execute(stmt)).all()))
+            finally:
+                stale = message_id in _STALE_SEEDS
+                _SEEDING[message_id] -= 1
+                if not _SEEDING[message_id]:
+                    del _SEEDING[message_id]
+                    _STALE_SEEDS.discard(message_id)
+            if stale:
+                # A reaction landed while the query ran: it may or may not be included
+                return dict(seeded)
+            # Another request may have seeded it while the query ran
+            counts = _REACTION_COUNTS.setdefault(message_id, seeded)
+            while len(_REACTION_COUNTS) > REACTION_COUNTER_MAX_MESSAGES:
+                _REACTION_COUNTS.popitem(last=False)
+        else:
+            _REACTION_COUNTS.move_to_end(message_id)
+        return dict(counts)
 
     async def update_reaction_markup(self, chat_id: int, message_id: int) -> None:
-        """Update inline keyboard of an interactive post with current counts."""
-        chat_id_str = str(chat_id)
+        """Update inline keyboard of an interactive post with current counts.
 
+        The edit itself is debounced: bursts of reactions on the same post
+        end up as a single edit carrying the latest counts.
+        """
         counts = await self.get_reaction_counts(message_id)
 
         raw_reactions, _ = await self.channel_service.get_reactions_and_points(chat_id)
 
-        try:
-            markup_to_edit = get_reaction_kb(
-                reactions=raw_reactions,
-                current_counts=counts,
-                message_id=message_id,
-                channel_id=chat_id,
-            )
-            logger.info(f"DEBUG: Markup being sent for update: {markup_to_edit}")
+        markup_to_edit = get_reaction_kb(
+            reactions=raw_reactions,
+            current_counts=counts,
+            message_id=message_id,
+            channel_id=chat_id,
+        )
+        markup_debouncer.request(self.bot, chat_id, message_id, markup_to_edit)
 
-            await self.bot.edit_message_reply_markup(
-                chat_id=chat_id_str,
-                message_id=message_id,
-                reply_markup=markup_to_edit,
-            )
-        except TelegramBadRequest as e:
-            logger.error(
-                f"Failed to update reaction markup for chat {chat_id}, message {message_id}: {e}",
-                exc_info=True,
-            )
-        except TelegramAPIError as e:
-            logger.error(
-                f"Unexpected API error updating reaction markup for chat {chat_id}, message {message_id}: {e}",
-                exc_info=True,
+    async def _count_in_bucket(self, user_id: int) -> None:
+        """Add one reaction to the user's hourly bucket (committed by the caller)."""
+        bucket = _bucket_start(datetime.datetime.utcnow())
+        insert = upsert_insert(self.session)
+        if insert is not None:
+            stmt = insert(ReactionBucket).values(user_id=user_id, bucket_start=bucket, count=1)
+            await self.session.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=["user_id", "bucket_start"],
+                    set_={"count": ReactionBucket.count + 1},
+                )
             )
+        else:
+            row = await self.session.get(ReactionBucket, (user_id, bucket))
+            if row:
+                row.count += 1
+            else:
+                self.session.add(ReactionBucket(user_id=user_id, bucket_start=bucket, count=1))
+
+    async def _backfill_reaction_buckets(self, since: datetime.datetime) -> None:
+        """Build buckets for reactions made before they existed (once per process)."""
+        global _reaction_buckets_checked
+        if _reaction_buckets_checked:
+            return
+        _reaction_buckets_checked = True
+        # Reactions after the oldest bucket were already counted on insert
+        stmt = select(ButtonReaction.user_id, ButtonReaction.created_at).where(ButtonReaction.created_at >= since)
+        oldest = await self.session.scalar(select(func.min(ReactionBucket.bucket_start)))
+        if oldest is not None:
+            stmt = stmt.where(ButtonReaction.created_at < oldest)
+        buckets: Counter = Counter()
+        rows = await self.session.execute(stmt)
+        for user_id, created_at in rows:
+            buckets[(user_id, _bucket_start(created_at))] += 1
+        if buckets:
+            values = [
+                {"user_id": user_id, "bucket_start": start, "count": count}
+                for (user_id, start), count in buckets.items()
+            ]
+            # Other workers may backfill the same buckets concurrently: first one wins
+            insert = upsert_insert(self.session)
+            if insert is not None:
+                await self.session.execute(
+                    insert(ReactionBucket).values(values).on_conflict_do_nothing(
+                        index_elements=["user_id", "bucket_start"]
+                    )
+                )
+            else:
+                for row in values:
+                    try:
+                        async with self.session.begin_nested():
+                            self.session.add(ReactionBucket(**row))
+                    except IntegrityError:
+                        pass
+            await self.session.commit()
+            logger.info(f"Backfilled {len(buckets)} reaction buckets")
 
     async def get_weekly_reaction_ranking(self, limit: int = 3) -> list[tuple[int, int]]:
-        """Return a list of (user_id, count) for reactions in last 7 days."""
-        since = datetime.datetime.utcnow() - datetime.timedelta(days=7)
+        """Return a list of (user_id, count) for reactions in last 7 days.
+
+        Sums the hourly ``ReactionBucket`` rows of the window and keeps the
+        result for ``WEEKLY_RANKING_CACHE_TTL`` seconds.
+        """
+        global _WEEKLY_RANKING, _next_bucket_purge
+        if _WEEKLY_RANKING is not None and limit <= WEEKLY_RANKING_CACHE_SIZE:
+            computed_at, ranking = _WEEKLY_RANKING
+            if time.monotonic() - computed_at < WEEKLY_RANKING_CACHE_TTL:
+                return ranking[:limit]
+
+        since = _bucket_start(datetime.datetime.utcnow() - datetime.timedelta(days=WEEKLY_RANKING_WINDOW_DAYS))
+        await self._backfill_reaction_buckets(since)
+        if time.monotonic() >= _next_bucket_purge:
+            # Buckets that left the window are no longer needed
+            _next_bucket_purge = time.monotonic() + 3600
+            await self.session.execute(delete(ReactionBucket).where(ReactionBucket.bucket_start < since))
+            await self.session.commit()
+
+        total = func.sum(ReactionBucket.count)
         stmt = (
-            select(ButtonReaction.user_id, func.count(ButtonReaction.id))
-            .where(ButtonReaction.created_at >= since)
-            .group_by(ButtonReaction.user_id)
-            .order_by(func.count(ButtonReaction.id).desc())
-            .limit(limit)
+            select(ReactionBucket.user_id, total)
+            .where(ReactionBucket.bucket_start >= since)
+            .group_by(ReactionBucket.user_id)
+            .order_by(total.desc())
+            .limit(max(limit, WEEKLY_RANKING_CACHE_SIZE))
         )
-        result = await self.session.execute(stmt)
-        return result.all()
+        ranking = [(user_id, int(count)) for user_id, count in await self.session.execute(stmt)]
+        _WEEKLY_RANKING = (time.monotonic(), ranking)
+        return ranking[:limit]
@@ -21,12 +21,12 @@ class MiniGameService:
         free_available = not progress.last_roulette_at or (now - progress.last_roulette_at).total_seconds() >= 86400
         is_free = free_available
         if not free_available:
-            await self.point_service.deduct_points(user_id, cost)
+            await self.point_service.deduct_points(user_id, cost, source="minigame")
         progress.last_roulette_at = now
         score = bot.dice_emoji if hasattr(bot, "dice_emoji") else None
         dice_msg = await bot.send_dice(user_id)
         score = dice_msg.dice.value
-        await self.point_service.add_points(user_id, score, bot=bot)
+        await self.point_service.add_points(user_id, score, bot=bot, source="minigame")
         play = MiniGamePlay(
             user_id=user_id,
             game_type="roulette",
@@ -50,6 +50,7 @@ class MiniGameService:
             duration_days=0,
             requires_action=False,
             action_data={"duration_minutes": duration_minutes, "penalty_points": penalty},
+            expires_at=datetime.datetime.utcnow() + datetime.timedelta(minutes=duration_minutes),
         )
         entry = UserMissionEntry(user_id=user_id, mission_id=mission.id)
         self.session.add(entry)
@@ -2,17 +2,26 @@
 import datetime
 import random
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import select, update, delete, func, case
 from database.models import (
     Mission,
+    MissionExpiry,
+    ArchivedMission,
     User,
     UserMissionEntry,
+    UserMissionCompletion,
     Challenge,
     UserChallengeProgress,
     LorePiece,
     UserLorePiece,
 )
+from database.upsert import upsert_insert
+from utils.cache_bus import shared_invalidation
 from utils.text_utils import sanitize_text
+from narrative.requirement_cache import invalidate_requirement_snapshot
+from services.hint_combination_service import invalidate_user_hints
+from services.backpack_service import invalidate_backpack_summary
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,6 +29,96 @@ logger = logging.getLogger(__name__)
 # Placeholder structure for future missions
 MISSION_PLACEHOLDER: list = []
 
+# Seconds before the in-memory mission catalog is reloaded even without edits
+MISSION_CATALOG_TTL = 300
+# Missions archived per transaction by the expiry job
+MISSION_GC_BATCH_SIZE = 500
+# Users scanned per transaction when migrating legacy JSON completions
+COMPLETION_MIGRATION_BATCH_SIZE = 500
+# period_start for missions that can only be completed once
+COMPLETION_PERIOD_ONCE = datetime.datetime(1970, 1, 1)
+# Seconds before the cached challenge list is reloaded; challenges are edited
+# in the database, so this is how new or changed ones reach every worker
+CHALLENGE_CACHE_TTL = 300
+# Points awarded for each completed challenge
+CHALLENGE_REWARD_POINTS = 100
+
+
+class _MissionCatalog:
+    """Active missions indexed by type, with expiry precomputed from duration_days."""
+
+    def __init__(self, missions: list[tuple[Mission, datetime.datetime | None]]):
+        self.loaded_at = datetime.datetime.utcnow()
+        self.by_type: dict[str, list[tuple[Mission, datetime.datetime | None]]] = {}
+        self.all: list[tuple[Mission, datetime.datetime | None]] = []
+        for mission, expires_at in missions:
+            if expires_at is None:
+                expires_at = _default_expiry(mission)
+            entry = (mission, expires_at)
+            self.all.append(entry)
+            self.by_type.setdefault(mission.type, []).append(entry)
+
+    def is_stale(self) -> bool:
+        return (datetime.datetime.utcnow() - self.loaded_at).total_seconds() > MISSION_CATALOG_TTL
+
+    def active(self, mission_type: str | None = None) -> list[Mission]:
+        entries = self.by_type.get(mission_type, []) if mission_type else self.all
+        now = datetime.datetime.utcnow()
+        return [mission for mission, expires_at in entries if expires_at is None or expires_at > now]
+
+
+_MISSION_CATALOG: _MissionCatalog | None = None
+
+
+def _default_expiry(mission: Mission) -> datetime.datetime | None:
+    """Expiry implied by the mission definition when no MissionExpiry row exists."""
+    created_at = mission.created_at or datetime.datetime.utcnow()
+    if mission.duration_days:
+        return created_at + datetime.timedelta(days=mission.duration_days)
+    if mission.type == "reaction_challenge" and mission.action_data:
+        minutes = mission.action_data.get("duration_minutes")
+        if minutes:
+            return created_at + datetime.timedelta(minutes=minutes)
+    return None
+
+
+# Mission types limited to one completion per period, and the reason reported
+_COMPLETION_LIMIT_REASONS = {
+    "one_time": "already_completed",
+    "reaction": "already_completed",
+    "daily": "daily_limit_reached",
+    "weekly": "weekly_limit_reached",
+}
+# Set once every user's legacy JSON completions were moved to the table
+_legacy_completions_migrated = False
+
+
+def _completion_period_start(mission_type: str | None, at: datetime.datetime) -> datetime.datetime:
+    """Start of the reset period containing ``at`` for the given mission type."""
+    if mission_type == "daily":
+        return at.replace(hour=0, minute=0, second=0, microsecond=0)
+    if mission_type == "weekly":
+        day = at.replace(hour=0, minute=0, second=0, microsecond=0)
+        return day - datetime.timedelta(days=day.weekday())
+    if mission_type in _COMPLETION_LIMIT_REASONS:
+        return COMPLETION_PERIOD_ONCE
+    # Unlimited types: every completion gets its own row
+    return at
+
+
+# goal_type -> challenges not yet ended at load time, plus load timestamp
+_CHALLENGES_BY_GOAL: dict[str, list[Challenge]] | None = None
+_challenges_loaded_at: datetime.datetime | None = None
+
+
+@shared_invalidation("mission_catalog")
+def invalidate_mission_catalog() -> None:
+    """Drop the cached catalog; the next lookup reloads it from the database."""
+    global _MISSION_CATALOG
+    _MISSION_CATALOG = None
+    logger.debug("Invalidated mission catalog")
+
+
 class MissionService:
     def __init__(self, session: AsyncSession):
         self.session = session
@@ -30,24 +129,52 @@ class MissionService:
         """
         Retrieves active missions, optionally filtered by user completion status and type.
         """
-        stmt = select(Mission).where(Mission.is_active == True)
-        if mission_type:
-            stmt = stmt.where(Mission.type == mission_type)
-        result = await self.session.execute(stmt)
-        missions = [m for m in result.scalars().all() if not m.duration_days or (m.created_at + datetime.timedelta(days=m.duration_days)) > datetime.datetime.utcnow()]
+        catalog = await self._get_catalog()
+        missions = catalog.active(mission_type)
 
         if user_id: # Filter out completed missions for a specific user based on reset rules
             user = await self.session.get(User, user_id)
             if user:
-                filtered_missions = []
+                completed = await self._completed_in_period(user, missions)
                 now = datetime.datetime.now()
+                missions = [
+                    mission
+                    for mission in missions
+                    if (mission.id, _completion_period_start(mission.type, now)) not in completed
+                ]
+        # Cached objects are shared by every session: hand out copies bound to this one
+        return [await self.session.merge(mission, load=False) for mission in missions]
 
-                for mission in missions:
-                    is_completed_for_period, _ = await self.check_mission_completion_status(user, mission)
-                    if not is_completed_for_period:
-                        filtered_missions.append(mission)
-                return filtered_missions
-        return missions
+    async def _completed_in_period(self, user: User, missions: list[Mission]) -> set[tuple[str, datetime.datetime]]:
+        """(mission_id, period_start) completions of ``user`` among ``missions``, in one query."""
+        limited_ids = [mission.id for mission in missions if mission.type in _COMPLETION_LIMIT_REASONS]
+        if not limited_ids:
+            return set()
+        if user.missions_completed:
+            await self._migrate_user_completions([user])
+        result = await self.session.execute(
+            select(UserMissionCompletion.mission_id, UserMissionCompletion.period_start).where(
+                UserMissionCompletion.user_id == user.id,
+                UserMissionCompletion.mission_id.in_(limited_ids),
+            )
+        )
+        return set(result.all())
+
+    async def _get_catalog(self) -> _MissionCatalog:
+        global _MISSION_CATALOG
+        if _MISSION_CATALOG is None or _MISSION_CATALOG.is_stale():
+            result = await self.session.execute(
+                select(Mission, MissionExpiry.expires_at)
+                .outerjoin(MissionExpiry, MissionExpiry.mission_id == Mission.id)
+                .where(Mission.is_active == True)
+            )
+            missions = [tuple(row) for row in result.all()]
+            # Detach so the cached objects outlive this session
+            for mission, _ in missions:
+                self.session.expunge(mission)
+            _MISSION_CATALOG = _MissionCatalog(missions)
+            logger.debug(f"Loaded mission catalog with {len(missions)} active missions")
+        return _MISSION_CATALOG
 
     async def get_daily_active_missions(self, user_id: int | None = None) -> list[Mission]:
         """Return missions of type 'daily' that are active today."""
@@ -62,27 +189,128 @@ class MissionService:
         or if it's a one-time mission already completed.
         Returns (is_completed_for_period, reason_if_completed)
         """
-        mission_completion_record = user.missions_completed.get(mission.id)
-        
-        if mission.type == "one_time":
-            if mission_completion_record:
-                return True, "already_completed"
-        elif mission.type == "daily":
-            if mission_completion_record:
-                last_completed = datetime.datetime.fromisoformat(mission_completion_record)
-                if (datetime.datetime.now() - last_completed) < datetime.timedelta(days=1):
-                    return True, "daily_limit_reached"
-        elif mission.type == "weekly":
-            if mission_completion_record:
-                last_completed = datetime.datetime.fromisoformat(mission_completion_record)
-                if (datetime.datetime.now() - last_completed) < datetime.timedelta(weeks=1):
-                    return True, "weekly_limit_reached"
-        elif mission.type == "reaction":
-            # For reaction missions, check if already completed once
-            if mission_completion_record:
-                return True, "already_completed"
-        
-        return False, "" # Not completed for current period or not a one-time mission
+        reason = _COMPLETION_LIMIT_REASONS.get(mission.type)
+        if reason is None:
+            return False, ""  # Mission type without completion limit
+
+        if user.missions_completed:
+            await self._migrate_user_completions([user])
+
+        period_start = _completion_period_start(mission.type, datetime.datetime.now())
+        completed_at = await self.session.scalar(
+            select(UserMissionCompletion.completed_at).where(
+                UserMissionCompletion.user_id == user.id,
+                UserMissionCompletion.mission_id == mission.id,
+                UserMissionCompletion.period_start == period_start,
+            )
+        )
+        if completed_at is not None:
+            return True, reason
+        return False, ""  # Not completed for current period
+
+    async def _record_completion(self, user_id: int, mission: Mission, now: datetime.datetime) -> bool:
+        """Insert the completion row. Returns False if it already existed."""
+        values = {
+            "user_id": user_id,
+            "mission_id": mission.id,
+            "period_start": _completion_period_start(mission.type, now),
+            "completed_at": now,
+        }
+        insert = upsert_insert(self.session)
+        if insert is not None:
+            result = await self.session.execute(
+                insert(UserMissionCompletion)
+                .values(**values)
+                .on_conflict_do_nothing()
+                .returning(UserMissionCompletion.mission_id)
+            )
+            return result.first() is not None
+        try:
+            async with self.session.begin_nested():
+                self.session.add(UserMissionCompletion(**values))
+        except IntegrityError:
+            return False
+        return True
+
+    async def migrate_legacy_completions(self, batch_size: int = COMPLETION_MIGRATION_BATCH_SIZE) -> int:
+        """
+        Move every user's ``missions_completed`` JSON into UserMissionCompletion.
+        Runs in batches keyed by user id; returns the number of users migrated.
+        """
+        global _legacy_completions_migrated
+        if _legacy_completions_migrated:
+            return 0
+
+        migrated = 0
+        last_id = None
+        while True:
+            query = select(User).order_by(User.id).limit(batch_size)
+            if last_id is not None:
+                query = query.where(User.id > last_id)
+            users = (await self.session.execute(query)).scalars().all()
+            if not users:
+                break
+            last_id = users[-1].id
+            pending = [user for user in users if user.missions_completed]
+            if pending:
+                await self._migrate_user_completions(pending)
+                migrated += len(pending)
+            # Free the batch: only the JSON column was needed
+            self.session.expunge_all()
+
+        _legacy_completions_migrated = True
+        if migrated:
+            logger.info(f"Migrated legacy mission completions for {migrated} users")
+        return migrated
+
+    async def _migrate_user_completions(self, users: list[User]) -> None:
+        """Copy legacy JSON completions of ``users`` into the table and clear the JSON."""
+        mission_ids = {mission_id for user in users for mission_id in user.missions_completed}
+        result = await self.session.execute(
+            select(Mission.id, Mission.type).where(Mission.id.in_(mission_ids))
+        )
+        mission_types = dict(result.all())
+
+        rows = {}
+        for user in users:
+            for mission_id, completed_at in user.missions_completed.items():
+                # Completions of deleted missions are dropped with the JSON
+                if mission_id not in mission_types:
+                    continue
+                try:
+                    completed_at = datetime.datetime.fromisoformat(completed_at)
+                except (TypeError, ValueError):
+                    completed_at = COMPLETION_PERIOD_ONCE
+                period_start = _completion_period_start(mission_types[mission_id], completed_at)
+                rows[(user.id, mission_id, period_start)] = completed_at
+            user.missions_completed = {}
+
+        if rows:
+            values = [
+                {"user_id": user_id, "mission_id": mission_id, "period_start": period_start, "completed_at": completed_at}
+                for (user_id, mission_id, period_start), completed_at in rows.items()
+            ]
+            insert = upsert_insert(self.session)
+            if insert is not None:
+                await self.session.execute(
+                    insert(UserMissionCompletion).values(values).on_conflict_do_nothing()
+                )
+            else:
+                existing = await self.session.execute(
+                    select(
+                        UserMissionCompletion.user_id,
+                        UserMissionCompletion.mission_id,
+                        UserMissionCompletion.period_start,
+                    ).where(UserMissionCompletion.user_id.in_([user.id for user in users]))
+                )
+                existing_keys = {tuple(row) for row in existing.all()}
+                values = [
+                    row for row in values
+                    if (row["user_id"], row["mission_id"], row["period_start"]) not in existing_keys
+                ]
+                if values:
+                    await self.session.execute(UserMissionCompletion.__table__.insert(), values)
+        await self.session.commit()
 
     async def complete_mission(
         self,
@@ -110,10 +338,11 @@ class MissionService:
             logger.info(f"User {user_id} attempted to complete mission {mission_id} but it was already completed ({reason}).")
             return False, None
 
-        # Add mission to user's completed list with timestamp
-        now = datetime.datetime.now().isoformat()
-        user.missions_completed[mission.id] = now
-        
+        # Record the completion for the current reset period; a concurrent
+        # completion of the same period wins and this one is discarded
+        if not await self._record_completion(user_id, mission, datetime.datetime.now()):
+            logger.info(f"User {user_id} completed mission {mission_id} concurrently; ignoring duplicate.")
+            return False, None
 
         # Add points to user. Event multiplier should be handled by PointService or calling context.
         # For simplicity here, we just add the base points.
@@ -124,7 +353,7 @@ class MissionService:
              from services.point_service import PointService
              point_service = PointService(self.session)
 
-        await point_service.add_points(user_id, mission.reward_points, bot=bot)
+        await point_service.add_points(user_id, mission.reward_points, bot=bot, source="mission")
 
         # Update last reset timestamps for daily/weekly missions
         if mission.type == "daily":
@@ -151,11 +380,12 @@ class MissionService:
                         f"User {user_id} unlocked lore piece {unlock_code} via mission {mission_id}"
                     )
 
-        # Ensure JSON field updates are marked for SQLAlchemy
-        self.session.add(user) # Mark user as modified
-
         await self.session.commit()
         await self.session.refresh(user)
+        invalidate_requirement_snapshot(user_id)
+        if unlock_code:
+            invalidate_user_hints(user_id)
+            invalidate_backpack_summary(user_id)
 
         if bot:
             from utils.message_utils import get_mission_completed_message
@@ -184,6 +414,7 @@ class MissionService:
         *,
         requires_action: bool = False,
         action_data: dict | None = None,
+        expires_at: datetime.datetime | None = None,
     ) -> Mission:
         mission_id = f"{mission_type}_{sanitize_text(name).lower().replace(' ', '_').replace('.', '').replace(',', '')}"
         new_mission = Mission(
@@ -199,8 +430,13 @@ class MissionService:
             is_active=True,
         )
         self.session.add(new_mission)
+        if expires_at is None and duration_days:
+            expires_at = datetime.datetime.utcnow() + datetime.timedelta(days=duration_days)
+        if expires_at is not None:
+            self.session.add(MissionExpiry(mission_id=mission_id, expires_at=expires_at))
         await self.session.commit()
         await self.session.refresh(new_mission)
+        invalidate_mission_catalog()
         return new_mission
 
     async def toggle_mission_status(self, mission_id: str, status: bool) -> bool:
@@ -208,6 +444,7 @@ class MissionService:
         if mission:
             mission.is_active = status
             await self.session.commit()
+            invalidate_mission_catalog()
             return True
         return False
 
@@ -221,13 +458,19 @@ class MissionService:
         bot=None,
     ) -> None:
         missions = await self.get_active_missions(mission_type=mission_type)
+        if not missions:
+            return
+
+        # One query for the user's entries on every matching mission
+        stmt = select(UserMissionEntry).where(
+            UserMissionEntry.user_id == user_id,
+            UserMissionEntry.mission_id.in_([mission.id for mission in missions]),
+        )
+        result = await self.session.execute(stmt)
+        records = {record.mission_id: record for record in result.scalars().all()}
+
         for mission in missions:
-            stmt = select(UserMissionEntry).where(
-                UserMissionEntry.user_id == user_id,
-                UserMissionEntry.mission_id == mission.id,
-            )
-            result = await self.session.execute(stmt)
-            record = result.scalar_one_or_none()
+            record = records.get(mission.id)
             if not record:
                 record = UserMissionEntry(user_id=user_id, mission_id=mission.id)
                 self.session.add(record)
@@ -244,7 +487,7 @@ class MissionService:
             if progress >= mission.target_value:
                 record.completed = True
                 record.completed_at = datetime.datetime.utcnow()
-                await self.point_service.add_points(user_id, mission.reward_points, bot=bot)
+                await self.point_service.add_points(user_id, mission.reward_points, bot=bot, source="mission")
                 if bot:
                     from utils.message_utils import get_mission_completed_message
                     from utils.keyboard_utils import get_mission_completed_keyboard
@@ -260,11 +503,109 @@ class MissionService:
     async def delete_mission(self, mission_id: str) -> bool:
         mission = await self.session.get(Mission, mission_id)
         if mission:
+            await self.session.execute(delete(MissionExpiry).where(MissionExpiry.mission_id == mission_id))
+            await self.session.execute(
+                delete(UserMissionCompletion).where(UserMissionCompletion.mission_id == mission_id)
+            )
             await self.session.delete(mission)
             await self.session.commit()
+            invalidate_mission_catalog()
             return True
         return False
 
+    async def archive_expired_missions(
+        self, now: datetime.datetime | None = None, batch_size: int = MISSION_GC_BATCH_SIZE
+    ) -> int:
+        """
+        Archive missions whose expiry has passed: store a summary row, drop their
+        UserMissionEntry and UserMissionCompletion rows and delete the mission.
+        Returns the number archived.
+        """
+        now = now or datetime.datetime.utcnow()
+        await self._backfill_expiries(batch_size)
+
+        archived = 0
+        while True:
+            result = await self.session.execute(
+                select(Mission, MissionExpiry.expires_at)
+                .join(MissionExpiry, MissionExpiry.mission_id == Mission.id)
+                .where(MissionExpiry.expires_at <= now)
+                .order_by(MissionExpiry.expires_at)
+                .limit(batch_size)
+            )
+            rows = result.all()
+            if not rows:
+                break
+
+            mission_ids = [mission.id for mission, _ in rows]
+            stats_result = await self.session.execute(
+                select(
+                    UserMissionEntry.mission_id,
+                    func.count(UserMissionEntry.id),
+                    func.sum(case((UserMissionEntry.completed == True, 1), else_=0)),
+                )
+                .where(UserMissionEntry.mission_id.in_(mission_ids))
+                .group_by(UserMissionEntry.mission_id)
+            )
+            stats = {mission_id: (total, done or 0) for mission_id, total, done in stats_result.all()}
+
+            self.session.add_all(
+                ArchivedMission(
+                    mission_id=mission.id,
+                    name=mission.name,
+                    type=mission.type,
+                    reward_points=mission.reward_points,
+                    action_data=mission.action_data,
+                    created_at=mission.created_at,
+                    expired_at=expires_at,
+                    archived_at=now,
+                    participants=stats.get(mission.id, (0, 0))[0],
+                    completions=stats.get(mission.id, (0, 0))[1],
+                )
+                for mission, expires_at in rows
+            )
+            await self.session.execute(delete(UserMissionEntry).where(UserMissionEntry.mission_id.in_(mission_ids)))
+            await self.session.execute(
+                delete(UserMissionCompletion).where(UserMissionCompletion.mission_id.in_(mission_ids))
+            )
+            await self.session.execute(delete(MissionExpiry).where(MissionExpiry.mission_id.in_(mission_ids)))
+            await self.session.execute(delete(Mission).where(Mission.id.in_(mission_ids)))
+            await self.session.commit()
+            # Rows were deleted in bulk: drop the stale instances from the identity map
+            self.session.expunge_all()
+            archived += len(mission_ids)
+
+        if archived:
+            invalidate_mission_catalog()
+            logger.info(f"Archived {archived} expired missions")
+        return archived
+
+    async def _backfill_expiries(self, batch_size: int) -> None:
+        """Create MissionExpiry rows for missions created before expiries were indexed."""
+        while True:
+            result = await self.session.execute(
+                select(Mission)
+                .outerjoin(MissionExpiry, MissionExpiry.mission_id == Mission.id)
+                .where(
+                    MissionExpiry.mission_id.is_(None),
+                    (Mission.duration_days > 0) | (Mission.type == "reaction_challenge"),
+                )
+                .order_by(Mission.id)
+                .limit(batch_size)
+            )
+            missions = result.scalars().all()
+            expiries = []
+            for mission in missions:
+                expires_at = _default_expiry(mission)
+                if expires_at is not None:
+                    expiries.append(MissionExpiry(mission_id=mission.id, expires_at=expires_at))
+            if not expiries:
+                return
+            self.session.add_all(expiries)
+            await self.session.commit()
+            if len(missions) < batch_size:
+                return
+
     async def get_active_challenges(self, challenge_type: str | None = None) -> list[Challenge]:
         now = datetime.datetime.utcnow()
         stmt = select(Challenge).where(Challenge.start_date <= now, Challenge.end_date >= now)
@@ -273,25 +614,104 @@ class MissionService:
         result = await self.session.execute(stmt)
         return result.scalars().all()
 
+    async def _get_challenges_by_goal(self) -> dict[str, list[Challenge]]:
+        global _CHALLENGES_BY_GOAL, _challenges_loaded_at
+        now = datetime.datetime.utcnow()
+        if (
+            _CHALLENGES_BY_GOAL is None
+            or (now - _challenges_loaded_at).total_seconds() > CHALLENGE_CACHE_TTL
+        ):
+            result = await self.session.execute(select(Challenge).where(Challenge.end_date >= now))
+            challenges = result.scalars().all()
+            by_goal: dict[str, list[Challenge]] = {}
+            for challenge in challenges:
+                self.session.expunge(challenge)
+                by_goal.setdefault(challenge.goal_type, []).append(challenge)
+            _CHALLENGES_BY_GOAL = by_goal
+            _challenges_loaded_at = now
+        return _CHALLENGES_BY_GOAL
+
     async def increment_challenge_progress(self, user_id: int, goal_type: str, increment: int = 1, bot=None) -> list[Challenge]:
         """Increment progress for active challenges matching goal_type.
         Returns list of challenges completed in this call."""
-        completed = []
-        challenges = await self.get_active_challenges()
+        now = datetime.datetime.utcnow()
+        challenges = [
+            challenge
+            for challenge in (await self._get_challenges_by_goal()).get(goal_type, [])
+            if challenge.start_date <= now <= challenge.end_date
+        ]
+        if not challenges:
+            return []
+
+        insert = upsert_insert(self.session)
+        if insert is None:
+            completed_ids = await self._increment_challenges_rowwise(user_id, challenges, increment, now)
+        else:
+            # One statement for every matching challenge; completed rows are left untouched
+            table = UserChallengeProgress.__table__
+            stmt = insert(UserChallengeProgress).values(
+                [
+                    {"user_id": user_id, "challenge_id": challenge.id, "current_value": increment, "completed": False}
+                    for challenge in challenges
+                ]
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["user_id", "challenge_id"],
+                set_={"current_value": table.c.current_value + increment},
+                where=table.c.completed == False,
+            ).returning(UserChallengeProgress.challenge_id, UserChallengeProgress.current_value)
+            progress = dict((await self.session.execute(stmt)).all())
+
+            reached = [
+                challenge.id for challenge in challenges
+                if challenge.id in progress and progress[challenge.id] >= challenge.goal_value
+            ]
+            completed_ids = set()
+            if reached:
+                result = await self.session.execute(
+                    update(UserChallengeProgress)
+                    .where(
+                        UserChallengeProgress.user_id == user_id,
+                        UserChallengeProgress.challenge_id.in_(reached),
+                        UserChallengeProgress.completed == False,
+                    )
+                    .values(completed=True, completed_at=now)
+                    .returning(UserChallengeProgress.challenge_id)
+                    .execution_options(synchronize_session=False)
+                )
+                completed_ids = set(result.scalars().all())
+        await self.session.commit()
+
+        completed = [challenge for challenge in challenges if challenge.id in completed_ids]
+        if completed:
+            # Single award for everything completed by this event
+            await self.point_service.add_points(
+                user_id, CHALLENGE_REWARD_POINTS * len(completed), bot=bot, source="challenge"
+            )
+        return completed
+
+    async def _increment_challenges_rowwise(
+        self, user_id: int, challenges: list[Challenge], increment: int, now: datetime.datetime
+    ) -> set[int]:
+        """Fallback for engines without ON CONFLICT support."""
+        result = await self.session.execute(
+            select(UserChallengeProgress).where(
+                UserChallengeProgress.user_id == user_id,
+                UserChallengeProgress.challenge_id.in_([challenge.id for challenge in challenges]),
+            )
+        )
+        records = {prog.challenge_id: prog for prog in result.scalars().all()}
+        completed_ids = set()
         for challenge in challenges:
-            if challenge.goal_type != goal_type:
-                continue
-            prog = await self.session.get(UserChallengeProgress, {"user_id": user_id, "challenge_id": challenge.id})
+            prog = records.get(challenge.id)
             if not prog:
-                prog = UserChallengeProgress(user_id=user_id, challenge_id=challenge.id)
+                prog = UserChallengeProgress(user_id=user_id, challenge_id=challenge.id, current_value=0)
                 self.session.add(prog)
             if prog.completed:
                 continue
-            prog.current_value += increment
+            prog.current_value = (prog.current_value or 0) + increment
             if prog.current_value >= challenge.goal_value:
                 prog.completed = True
-                prog.completed_at = datetime.datetime.utcnow()
-                completed.append(challenge)
-                await self.point_service.add_points(user_id, 100, bot=bot)
-        await self.session.commit()
-        return completed
+                prog.completed_at = now
+                completed_ids.add(challenge.id)
+        return completed_ids
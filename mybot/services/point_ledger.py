@@ -0,0 +1,105 @@
+"""
+Point ledger: every balance change is a single guarded UPDATE plus an
+append-only ``point_transactions`` row, so concurrent awards and deductions
+never overwrite each other and no SELECT is needed beforehand.
+"""
+import logging
+from typing import Optional
+
+from sqlalchemy import select, update, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+
+from database.models import User, PointTransaction
+from services.leaderboard_service import record_point_change
+
+logger = logging.getLogger(__name__)
+
+# Differences below this are float noise, not missing ledger entries
+RECONCILIATION_TOLERANCE = 1e-6
+
+
+async def apply_points(
+    session: AsyncSession,
+    user_id: int,
+    amount: float,
+    source: str,
+    *,
+    commit: bool = True,
+) -> Optional[float]:
+    """Add ``amount`` (negative to deduct) to the user's balance.
+
+    Returns the new balance, or ``None`` when the user does not exist or the
+    balance would become negative; nothing is written in that case. With
+    ``commit=False`` the caller commits and then calls ``record_point_change``.
+    """
+    new_points = func.coalesce(User.points, 0) + amount
+    stmt = (
+        update(User)
+        .where(User.id == user_id, new_points >= 0)
+        .values(points=new_points)
+        .execution_options(synchronize_session=False)
+    )
+    if session.get_bind().dialect.update_returning:
+        balance = (await session.execute(stmt.returning(User.points))).scalar_one_or_none()
+    else:
+        result = await session.execute(stmt)
+        balance = (
+            await session.scalar(select(User.points).where(User.id == user_id))
+            if result.rowcount
+            else None
+        )
+    if balance is None:
+        return None
+
+    session.add(PointTransaction(user_id=user_id, amount=amount, source=source, balance_after=balance))
+    # Keep an already loaded User in sync without reloading it
+    user = session.identity_map.get(session.identity_key(User, user_id))
+    if user is not None:
+        set_committed_value(user, "points", balance)
+    if commit:
+        await session.commit()
+        record_point_change(user_id, amount, balance)
+    return balance
+
+
+async def reconcile_balances(session: AsyncSession) -> int:
+    """Compare every balance with the sum of its ledger and record the gap.
+
+    Balances from before the ledger existed, or changed outside it, get an
+    ``opening_balance``/``reconciliation`` entry so ledger and balance agree
+    again; the balance itself is never modified. Returns users adjusted.
+    """
+    ledger = (
+        select(
+            PointTransaction.user_id,
+            func.sum(PointTransaction.amount).label("total"),
+        )
+        .group_by(PointTransaction.user_id)
+        .subquery()
+    )
+    rows = (
+        await session.execute(
+            select(User.id, func.coalesce(User.points, 0), ledger.c.total)
+            .outerjoin(ledger, ledger.c.user_id == User.id)
+            .where(
+                func.abs(func.coalesce(User.points, 0) - func.coalesce(ledger.c.total, 0))
+                > RECONCILIATION_TOLERANCE
+            )
+        )
+    ).all()
+    for user_id, balance, total in rows:
+        gap = balance - (total or 0)
+        if total is not None:
+            logger.warning(f"User {user_id} balance {balance} differs from ledger {total} by {gap}")
+        session.add(
+            PointTransaction(
+                user_id=user_id,
+                amount=gap,
+                source="reconciliation" if total is not None else "opening_balance",
+                balance_after=balance,
+            )
+        )
+    if rows:
+        await session.commit()
+    return len(rows)
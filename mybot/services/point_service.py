@@ -1,11 +1,14 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, exists
 from database.models import User, UserStats
 from utils.user_roles import get_points_multiplier
 from aiogram import Bot
 from services.level_service import LevelService
 from services.achievement_service import AchievementService
 from services.event_service import EventService
+from narrative.requirement_cache import invalidate_requirement_snapshot
+from services.point_ledger import apply_points
+from services.leaderboard_service import LeaderboardService, record_point_change
 import datetime
 import logging
 
@@ -29,7 +32,7 @@ class PointService:
         now = datetime.datetime.utcnow()
         if progress.last_activity_at and (now - progress.last_activity_at).total_seconds() < 30:
             return None
-        progress = await self.add_points(user_id, 1, bot=bot)
+        progress = await self.add_points(user_id, 1, bot=bot, source="message")
         progress.messages_sent += 1
         await self.session.commit()
         ach_service = AchievementService(self.session)
@@ -47,7 +50,7 @@ class PointService:
     async def award_reaction(
         self, user: User, message_id: int, bot: Bot
     ) -> UserStats | None:
-        progress = await self.add_points(user.id, 0.5, bot=bot)
+        progress = await self.add_points(user.id, 0.5, bot=bot, source="reaction")
         ach_service = AchievementService(self.session)
         new_badges = await ach_service.check_user_badges(user.id)
         for badge in new_badges:
@@ -60,7 +63,7 @@ class PointService:
         return progress
 
     async def award_poll(self, user_id: int, bot: Bot) -> UserStats:
-        progress = await self.add_points(user_id, 2, bot=bot)
+        progress = await self.add_points(user_id, 2, bot=bot, source="poll")
         ach_service = AchievementService(self.session)
         new_badges = await ach_service.check_user_badges(user_id)
         for badge in new_badges:
@@ -77,7 +80,7 @@ class PointService:
         now = datetime.datetime.utcnow()
         if progress.last_checkin_at and (now - progress.last_checkin_at).total_seconds() < 86400:
             return False, progress
-        progress = await self.add_points(user_id, 10, bot=bot)
+        progress = await self.add_points(user_id, 10, bot=bot, source="checkin")
         if progress.last_checkin_at and (now.date() - progress.last_checkin_at.date()).days == 1:
             progress.checkin_streak += 1
         else:
@@ -96,17 +99,14 @@ class PointService:
                 )
         return True, progress
 
-    async def add_points(self, user_id: int, points: float, *, bot: Bot | None = None) -> UserStats:
-        user = await self.session.get(User, user_id)
-        if not user:
-            logger.warning(
-                f"Attempted to add points to non-existent user {user_id}. Creating new user."
-            )
-            user = User(id=user_id, points=0)
-            self.session.add(user)
-            await self.session.commit()
-            await self.session.refresh(user)
-
+    async def add_points(
+        self,
+        user_id: int,
+        points: float,
+        *,
+        bot: Bot | None = None,
+        source: str = "activity",
+    ) -> UserStats:
         multiplier = 1
         if bot:
             multiplier = await get_points_multiplier(bot, user_id, session=self.session)
@@ -114,12 +114,29 @@ class PointService:
             multiplier *= event_mult
 
         total = points * multiplier
-        user.points += total
+        if not await self.session.scalar(select(exists().where(User.id == user_id))):
+            logger.warning(
+                f"Attempted to add points to non-existent user {user_id}. Creating new user."
+            )
+            self.session.add(User(id=user_id, points=0))
+            await self.session.flush()
+        balance = await apply_points(self.session, user_id, total, source, commit=False)
+        if balance is None:
+            # The user exists, so the amount would overdraw the balance: clamp at zero
+            current = await self.session.scalar(select(User.points).where(User.id == user_id)) or 0
+            logger.warning(
+                f"Deduction of {-total} exceeds balance {current} of user {user_id}. Clamping to 0."
+            )
+            total = -current
+            if total:
+                balance = await apply_points(self.session, user_id, total, source, commit=False)
         progress = await self._get_or_create_progress(user_id)
         progress.last_activity_at = datetime.datetime.utcnow()
         await self.session.commit()
-        await self.session.refresh(progress)
-        await self.session.refresh(user)
+        if balance is not None:
+            record_point_change(user_id, total, balance)
+        invalidate_requirement_snapshot(user_id)
+        user = await self.session.get(User, user_id)
         level_service = LevelService(self.session)
         await level_service.check_for_level_up(user, bot=bot)
 
@@ -144,14 +161,12 @@ class PointService:
             await self.session.commit()
         return progress
 
-    async def deduct_points(self, user_id: int, points: int) -> User | None:
-        user = await self.session.get(User, user_id)
-        if user and user.points >= points:
-            user.points -= points
-            await self.session.commit()
-            await self.session.refresh(user)
-            logger.info(f"User {user_id} lost {points} points. Total: {user.points}")
-            return user
+    async def deduct_points(self, user_id: int, points: int, *, source: str = "deduction") -> User | None:
+        balance = await apply_points(self.session, user_id, -points, source)
+        if balance is not None:
+            invalidate_requirement_snapshot(user_id)
+            logger.info(f"User {user_id} lost {points} points. Total: {balance}")
+            return await self.session.get(User, user_id)
         logger.warning(f"Failed to deduct {points} points from user {user_id}. Not enough points or user not found.")
         return None
 
@@ -161,7 +176,7 @@ class PointService:
 
     async def get_top_users(self, limit: int = 10) -> list[User]:
         """Return the top users ordered by points."""
-        stmt = select(User).order_by(User.points.desc()).limit(limit)
-        result = await self.session.execute(stmt)
-        top_users = result.scalars().all()
-        return top_users
+        leaderboard = LeaderboardService(self.session)
+        top = await leaderboard.get_top(limit)
+        users = await leaderboard.load_users([user_id for _, user_id, _ in top])
+        return [users[user_id] for _, user_id, _ in top if user_id in users]
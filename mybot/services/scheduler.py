@@ -6,11 +6,24 @@ from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
 from sqlalchemy import select
 
 from database.models import PendingChannelRequest, BotConfig, User
-from utils.config import CHANNEL_SCHEDULER_INTERVAL, VIP_SCHEDULER_INTERVAL
+from utils.config import (
+    CHANNEL_SCHEDULER_INTERVAL,
+    VIP_SCHEDULER_INTERVAL,
+    MISSION_GC_INTERVAL,
+    MESSAGE_REGISTRY_CLEANUP_INTERVAL,
+    POINT_RECONCILIATION_INTERVAL,
+    STATS_SNAPSHOT_INTERVAL,
+)
 from services.config_service import ConfigService
 from services.auction_service import AuctionService
 from services.free_channel_service import FreeChannelService
 from services.subscription_service import SubscriptionService
+from services.mission_service import MissionService
+from services.message_registry import purge_expired_messages
+from services.point_ledger import reconcile_balances
+from services.stats_snapshot_service import StatsSnapshotService
+from narrative.analytics import NarrativeAnalyticsService
+from narrative.constants import ANALYTICS_INTERVAL
 
 
 async def run_channel_request_check(bot: Bot, session_factory: async_sessionmaker[AsyncSession]):
@@ -212,3 +225,127 @@ async def free_channel_cleanup_scheduler(bot: Bot, session_factory: async_sessio
         raise
     except Exception:
         logging.exception("Unhandled error in free channel cleanup scheduler")
+
+
+async def run_narrative_analytics(bot: Bot, session_factory: async_sessionmaker[AsyncSession]):
+    """Rebuild the narrative funnel summaries once."""
+    async with session_factory() as session:
+        try:
+            await NarrativeAnalyticsService(session).rebuild_summaries()
+        except Exception as e:
+            logging.exception("Error rebuilding narrative analytics: %s", e)
+
+
+async def narrative_analytics_scheduler(bot: Bot, session_factory: async_sessionmaker[AsyncSession]):
+    """Background task refreshing narrative analytics summaries."""
+    logging.info("Narrative analytics scheduler started")
+    interval = ANALYTICS_INTERVAL
+    try:
+        while True:
+            await run_narrative_analytics(bot, session_factory)
+            await asyncio.sleep(interval)
+    except asyncio.CancelledError:
+        logging.info("Narrative analytics scheduler cancelled")
+        raise
+    except Exception:
+        logging.exception("Unhandled error in narrative analytics scheduler")
+
+
+async def run_mission_expiry_check(bot: Bot, session_factory: async_sessionmaker[AsyncSession]):
+    """Archive expired missions once (migrating legacy completions on the first run)."""
+    async with session_factory() as session:
+        try:
+            service = MissionService(session)
+            await service.migrate_legacy_completions()
+            await service.archive_expired_missions()
+        except Exception as e:
+            logging.exception("Error archiving expired missions: %s", e)
+
+
+async def mission_expiry_scheduler(bot: Bot, session_factory: async_sessionmaker[AsyncSession]):
+    """Background task archiving expired missions."""
+    logging.info("Mission expiry scheduler started")
+    interval = MISSION_GC_INTERVAL
+    try:
+        while True:
+            await run_mission_expiry_check(bot, session_factory)
+            await asyncio.sleep(interval)
+    except asyncio.CancelledError:
+        logging.info("Mission expiry scheduler cancelled")
+        raise
+    except Exception:
+        logging.exception("Unhandled error in mission expiry scheduler")
+
+
+async def run_message_registry_cleanup(bot: Bot, session_factory: async_sessionmaker[AsyncSession]):
+    """Purge expired interactive messages from the registry once."""
+    async with session_factory() as session:
+        try:
+            await purge_expired_messages(session)
+        except Exception as e:
+            logging.exception("Error purging message registry: %s", e)
+
+
+async def message_registry_cleanup_scheduler(bot: Bot, session_factory: async_sessionmaker[AsyncSession]):
+    """Background task purging expired interactive messages."""
+    logging.info("Message registry cleanup scheduler started")
+    interval = MESSAGE_REGISTRY_CLEANUP_INTERVAL
+    try:
+        while True:
+            await run_message_registry_cleanup(bot, session_factory)
+            await asyncio.sleep(interval)
+    except asyncio.CancelledError:
+        logging.info("Message registry cleanup scheduler cancelled")
+        raise
+    except Exception:
+        logging.exception("Unhandled error in message registry cleanup scheduler")
+
+
+async def run_point_reconciliation(bot: Bot, session_factory: async_sessionmaker[AsyncSession]):
+    """Align the point ledger with user balances once."""
+    async with session_factory() as session:
+        try:
+            adjusted = await reconcile_balances(session)
+            if adjusted:
+                logging.info("Point reconciliation adjusted %s users", adjusted)
+        except Exception as e:
+            logging.exception("Error reconciling point ledger: %s", e)
+
+
+async def point_reconciliation_scheduler(bot: Bot, session_factory: async_sessionmaker[AsyncSession]):
+    """Background task reconciling the point ledger with balances."""
+    logging.info("Point reconciliation scheduler started")
+    interval = POINT_RECONCILIATION_INTERVAL
+    try:
+        while True:
+            await run_point_reconciliation(bot, session_factory)
+            await asyncio.sleep(interval)
+    except asyncio.CancelledError:
+        logging.info("Point reconciliation scheduler cancelled")
+        raise
+    except Exception:
+        logging.exception("Unhandled error in point reconciliation scheduler")
+
+
+async def run_stats_snapshot_refresh(bot: Bot, session_factory: async_sessionmaker[AsyncSession]):
+    """Recompute the admin statistics snapshot once."""
+    async with session_factory() as session:
+        try:
+            await StatsSnapshotService(session).refresh()
+        except Exception as e:
+            logging.exception("Error refreshing stats snapshot: %s", e)
+
+
+async def stats_snapshot_scheduler(bot: Bot, session_factory: async_sessionmaker[AsyncSession]):
+    """Background task keeping the admin statistics snapshot fresh."""
+    logging.info("Stats snapshot scheduler started")
+    interval = STATS_SNAPSHOT_INTERVAL
+    try:
+        while True:
+            await run_stats_snapshot_refresh(bot, session_factory)
+            await asyncio.sleep(interval)
+    except asyncio.CancelledError:
+        logging.info("Stats snapshot scheduler cancelled")
+        raise
+    except Exception:
+        logging.exception("Unhandled error in stats snapshot scheduler")
@@ -0,0 +1,102 @@
+"""
+Admin statistics served from a precomputed snapshot.
+
+The aggregates shown in the admin panel (users, subscriptions, revenue,
+tariffs, free channel requests) are computed by a background scheduler and
+stored in one ``stats_snapshots`` row, so opening the panel is a primary key
+lookup instead of a batch of COUNT/SUM queries.
+"""
+import datetime
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import (
+    StatsSnapshot,
+    User,
+    VipSubscription,
+    Token,
+    Tariff,
+    PendingChannelRequest,
+)
+from services.config_service import ConfigService
+
+logger = logging.getLogger(__name__)
+
+ADMIN_SNAPSHOT = "admin"
+
+
+class StatsSnapshotService:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def compute(self) -> Dict[str, Any]:
+        """Run every aggregate of the admin panel once."""
+        now = datetime.datetime.utcnow()
+        expired = VipSubscription.expires_at.is_not(None) & (VipSubscription.expires_at <= now)
+        subs_total, subs_expired = (
+            await self.session.execute(
+                select(func.count(), func.count().filter(expired)).select_from(VipSubscription)
+            )
+        ).one()
+        users_total = await self.session.scalar(select(func.count()).select_from(User)) or 0
+        revenue_total = await self.session.scalar(
+            select(func.sum(Tariff.price))
+            .select_from(Token)
+            .join(Tariff, Token.tariff_id == Tariff.id)
+            .where(Token.is_used.is_(True))
+        ) or 0
+        tariff_count = await self.session.scalar(select(func.count()).select_from(Tariff)) or 0
+
+        config = ConfigService(self.session)
+        vip_channel_id = await config.get_vip_channel_id()
+        free_channel_id = await config.get_free_channel_id()
+        pending_requests = processed_requests = 0
+        if free_channel_id:
+            pending_requests, processed_requests = (
+                await self.session.execute(
+                    select(
+                        func.count().filter(PendingChannelRequest.approved.is_(False)),
+                        func.count().filter(PendingChannelRequest.approved.is_(True)),
+                    ).where(PendingChannelRequest.chat_id == free_channel_id)
+                )
+            ).one()
+
+        return {
+            "users_total": users_total,
+            "subscriptions_total": subs_total,
+            "subscriptions_active": subs_total - subs_expired,
+            "subscriptions_expired": subs_expired,
+            "revenue_total": revenue_total,
+            "tariff_count": tariff_count,
+            "vip_channel_configured": bool(vip_channel_id),
+            "free_channel_configured": bool(free_channel_id),
+            "free_requests_pending": pending_requests,
+            "free_requests_processed": processed_requests,
+        }
+
+    async def refresh(self) -> Tuple[Dict[str, Any], datetime.datetime]:
+        """Recompute the snapshot and store it."""
+        data = await self.compute()
+        computed_at = datetime.datetime.utcnow()
+        await self.session.merge(StatsSnapshot(name=ADMIN_SNAPSHOT, data=data, computed_at=computed_at))
+        await self.session.commit()
+        return data, computed_at
+
+    async def get_snapshot(self) -> Tuple[Dict[str, Any], datetime.datetime]:
+        """Return the stored snapshot, computing it if none exists yet."""
+        snapshot: Optional[StatsSnapshot] = await self.session.get(StatsSnapshot, ADMIN_SNAPSHOT)
+        if snapshot is None:
+            return await self.refresh()
+        return snapshot.data, snapshot.computed_at
+
+
+def format_snapshot_age(computed_at: datetime.datetime) -> str:
+    seconds = max(int((datetime.datetime.utcnow() - computed_at).total_seconds()), 0)
+    if seconds < 60:
+        return "hace unos segundos"
+    if seconds < 3600:
+        return f"hace {seconds // 60} min"
+    return f"hace {seconds // 3600} h {seconds % 3600 // 60} min"
@@ -0,0 +1,196 @@
+"""
+Cache invalidation bus for multi-worker deployments.
+
+Functions decorated with ``shared_invalidation`` run locally as usual and,
+when a backend is installed, are replayed with the same arguments on every
+other worker. In single-process mode no backend is installed and publishing
+is a no-op.
+"""
+import asyncio
+import functools
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import select, delete, func, or_
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from database.models import CacheEvent
+from utils.config import CACHE_BUS_POLL_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# Minutes cache events are kept in the database bus
+CACHE_EVENT_RETENTION_MINUTES = 10
+# Seconds a skipped event id is re-checked in case its transaction commits late
+CACHE_EVENT_GAP_TIMEOUT = 30
+# Most skipped ids tracked for a single jump of the id sequence
+CACHE_EVENT_MAX_GAP = 1000
+
+
+class CacheBus:
+    def __init__(self):
+        self.origin = f"{socket.gethostname()}:{os.getpid()}"
+        self.worker_index = 0
+        self.worker_count = 1
+        self._handlers: Dict[str, Callable] = {}
+        self._backend = None
+        self.published = 0
+        self.delivered = 0
+
+    def configure(self, worker_index: int, worker_count: int, backend=None) -> None:
+        self.worker_index = worker_index
+        self.worker_count = worker_count
+        self._backend = backend
+
+    def owns_user(self, user_id: Optional[int]) -> bool:
+        """True when updates of ``user_id`` are routed to this worker."""
+        if self.worker_count <= 1 or user_id is None:
+            return True
+        return user_id % self.worker_count == self.worker_index
+
+    def subscribe(self, channel: str, handler: Callable) -> None:
+        self._handlers[channel] = handler
+
+    def publish(self, channel: str, *args: Any, **kwargs: Any) -> None:
+        if self._backend is None:
+            return
+        self.published += 1
+        self._backend.send(channel, list(args), kwargs)
+
+    def deliver(self, channel: str, args: list, kwargs: dict) -> None:
+        """Apply an invalidation received from another worker."""
+        handler = self._handlers.get(channel)
+        if handler is None:
+            logger.warning(f"No cache handler for channel {channel}")
+            return
+        self.delivered += 1
+        try:
+            handler(*args, **kwargs)
+        except Exception as e:
+            logger.error(f"Error applying cache event {channel}: {e}")
+
+
+cache_bus = CacheBus()
+
+
+def shared_invalidation(channel: str, per_user: bool = False):
+    """Replay the decorated function on the other workers.
+
+    Arguments must be JSON serializable. With ``per_user`` the first argument
+    is a user id and nothing is published when this worker owns that user,
+    since no other worker caches it.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        cache_bus.subscribe(channel, func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            result = func(*args, **kwargs)
+            if not (per_user and args and args[0] and cache_bus.owns_user(args[0])):
+                cache_bus.publish(channel, *args, **kwargs)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+class PipeBusBackend:
+    """Sends events to the supervisor, which relays them to the other workers."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def send(self, channel: str, args: list, kwargs: dict) -> None:
+        try:
+            self.conn.send(("bus", channel, args, kwargs))
+        except (OSError, ValueError) as e:
+            logger.error(f"Cache bus pipe unavailable: {e}")
+
+
+class DatabaseBusBackend:
+    """Stores events in ``cache_events``; every worker polls for new rows."""
+
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession], interval: float = CACHE_BUS_POLL_INTERVAL):
+        self.session_factory = session_factory
+        self.interval = interval
+        self._outbox: list = []
+        self._last_id = 0
+        # Ids below _last_id not seen yet -> when they were first skipped
+        self._gaps: Dict[int, float] = {}
+        self._wakeup = asyncio.Event()
+
+    def send(self, channel: str, args: list, kwargs: dict) -> None:
+        self._outbox.append({"channel": channel, "payload": {"args": args, "kwargs": kwargs}})
+        self._wakeup.set()
+
+    async def run(self) -> None:
+        async with self.session_factory() as session:
+            self._last_id = await session.scalar(select(func.max(CacheEvent.id))) or 0
+        next_cleanup = datetime.utcnow()
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self._write_outbox()
+                await self._read_events()
+                if datetime.utcnow() >= next_cleanup:
+                    await self._cleanup()
+                    next_cleanup = datetime.utcnow() + timedelta(minutes=CACHE_EVENT_RETENTION_MINUTES)
+            except Exception as e:
+                logger.error(f"Cache bus database error: {e}")
+
+    async def _write_outbox(self) -> None:
+        if not self._outbox:
+            return
+        events, self._outbox = self._outbox, []
+        async with self.session_factory() as session:
+            await session.execute(
+                CacheEvent.__table__.insert(),
+                [{**event, "origin": cache_bus.origin, "created_at": datetime.utcnow()} for event in events],
+            )
+            await session.commit()
+
+    async def _read_events(self) -> None:
+        # Sequence values are not committed in order: a lower id can become
+        # visible after a higher one, so skipped ids are re-checked for a while
+        now = time.monotonic()
+        self._gaps = {
+            event_id: skipped_at
+            for event_id, skipped_at in self._gaps.items()
+            if now - skipped_at < CACHE_EVENT_GAP_TIMEOUT
+        }
+        condition = CacheEvent.id > self._last_id
+        if self._gaps:
+            condition = or_(condition, CacheEvent.id.in_(list(self._gaps)))
+        async with self.session_factory() as session:
+            rows = (
+                await session.execute(
+                    select(CacheEvent.id, CacheEvent.channel, CacheEvent.payload, CacheEvent.origin)
+                    .where(condition)
+                    .order_by(CacheEvent.id)
+                )
+            ).all()
+        for event_id, channel, payload, origin in rows:
+            if self._gaps.pop(event_id, None) is None:
+                if event_id <= self._last_id:
+                    continue
+                for missing in range(max(self._last_id + 1, event_id - CACHE_EVENT_MAX_GAP), event_id):
+                    self._gaps[missing] = now
+                self._last_id = event_id
+            if origin != cache_bus.origin:
+                cache_bus.deliver(channel, payload.get("args", []), payload.get("kwargs", {}))
+
+    async def _cleanup(self) -> None:
+        cutoff = datetime.utcnow() - timedelta(minutes=CACHE_EVENT_RETENTION_MINUTES)
+        async with self.session_factory() as session:
+            await session.execute(delete(CacheEvent).where(CacheEvent.created_at < cutoff))
+            await session.commit()
@@ -0,0 +1,289 @@
+"""
+Multi-worker mode: a supervisor process receives updates and routes them by
+user ID to N worker processes, each running its own dispatcher.
+
+- Every update of a given user goes to the same worker, so per-user caches,
+  FSM state and menu state stay coherent without cross-process locking
+- Workers talk to the supervisor through a pipe; the same pipe relays cache
+  invalidations between workers when ``CACHE_BUS_BACKEND=socket``
+- Schedulers run only on the worker holding the DB lease (``LeaderLease``)
+"""
+import asyncio
+import logging
+import multiprocessing
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+from utils.cache_bus import cache_bus
+from utils.config import (
+    BOT_RUN_MODE,
+    WEBHOOK_BASE_URL,
+    WEBHOOK_PATH,
+    WEBHOOK_SECRET,
+    WEBHOOK_DRAIN_TIMEOUT,
+    WORKER_MAX_CONCURRENT_UPDATES,
+)
+from utils.webhook_server import WebhookServer
+
+logger = logging.getLogger(__name__)
+
+# Seconds of long polling per getUpdates call in the supervisor
+SUPERVISOR_POLL_TIMEOUT = 25
+
+
+def update_user_id(update: Update) -> Optional[int]:
+    """User (or chat, for channel posts) that owns an update."""
+    try:
+        event = update.event
+    except Exception:
+        return None
+    user = getattr(event, "from_user", None) or getattr(event, "user", None)
+    if user is not None:
+        return user.id
+    chat = getattr(event, "chat", None)
+    return chat.id if chat is not None else None
+
+
+def partition(user_id: Optional[int], worker_count: int) -> int:
+    return user_id % worker_count if user_id is not None else 0
+
+
+class Supervisor:
+    """Spawns the workers, feeds them updates and relays their cache events."""
+
+    def __init__(self, bot: Bot, worker_target: Callable, worker_count: int, allowed_updates: List[str]):
+        self.bot = bot
+        self.worker_target = worker_target
+        self.worker_count = worker_count
+        self.allowed_updates = allowed_updates
+        self._processes: list = []
+        self._conns: list = []
+        self._outboxes: List[asyncio.Queue] = []
+        self._senders: List[asyncio.Task] = []
+        self._executors: List[ThreadPoolExecutor] = []
+        self._stop = asyncio.Event()
+        self.routed = [0] * worker_count
+
+    def route(self, update: Update) -> None:
+        index = partition(update_user_id(update), self.worker_count)
+        self.routed[index] += 1
+        data = update.model_dump(mode="json", by_alias=True, exclude_none=True)
+        self._outboxes[index].put_nowait(("update", data))
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self._stop.set)
+            except NotImplementedError:  # Windows
+                pass
+
+        self._start_workers()
+        try:
+            if BOT_RUN_MODE == "webhook":
+                await self._serve_webhook()
+            else:
+                await self.bot.delete_webhook()
+                await self._poll()
+        finally:
+            await self._stop_workers()
+
+    def _start_workers(self) -> None:
+        # spawn: los hijos no heredan el bucle de eventos ni conexiones abiertas
+        ctx = multiprocessing.get_context("spawn")
+        loop = asyncio.get_running_loop()
+        for index in range(self.worker_count):
+            parent_conn, child_conn = ctx.Pipe()
+            process = ctx.Process(
+                target=self.worker_target,
+                args=(index, self.worker_count, child_conn),
+                name=f"bot-worker-{index}",
+            )
+            process.start()
+            child_conn.close()
+            self._processes.append(process)
+            self._conns.append(parent_conn)
+            self._outboxes.append(asyncio.Queue())
+            self._executors.append(ThreadPoolExecutor(max_workers=1))
+            self._senders.append(asyncio.create_task(self._sender(index)))
+            loop.add_reader(parent_conn.fileno(), self._on_worker_message, index)
+        logger.info(f"Started {self.worker_count} bot workers")
+
+    async def _sender(self, index: int) -> None:
+        """Writes to one worker's pipe in order, off the event loop."""
+        loop = asyncio.get_running_loop()
+        outbox = self._outboxes[index]
+        while True:
+            message = await outbox.get()
+            try:
+                await loop.run_in_executor(self._executors[index], self._conns[index].send, message)
+            except (OSError, ValueError) as e:
+                logger.error(f"Worker {index} pipe closed: {e}")
+                return
+            if message[0] == "stop":
+                return
+
+    def _on_worker_message(self, index: int) -> None:
+        try:
+            message = self._conns[index].recv()
+        except (EOFError, OSError):
+            asyncio.get_running_loop().remove_reader(self._conns[index].fileno())
+            logger.error(f"Worker {index} exited")
+            self._stop.set()
+            return
+        if message[0] == "bus":
+            for other, outbox in enumerate(self._outboxes):
+                if other != index:
+                    outbox.put_nowait(message)
+
+    async def _poll(self) -> None:
+        offset = None
+        backoff = 1
+        logger.info("Supervisor polling updates...")
+        while not self._stop.is_set():
+            poll = asyncio.create_task(
+                self.bot.get_updates(
+                    offset=offset,
+                    timeout=SUPERVISOR_POLL_TIMEOUT,
+                    allowed_updates=self.allowed_updates,
+                )
+            )
+            stop = asyncio.create_task(self._stop.wait())
+            done, _ = await asyncio.wait({poll, stop}, return_when=asyncio.FIRST_COMPLETED)
+            if stop in done:
+                poll.cancel()
+                break
+            stop.cancel()
+            try:
+                updates = poll.result()
+            except Exception as e:
+                logger.error(f"Error fetching updates: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+                continue
+            backoff = 1
+            for update in updates:
+                self.route(update)
+                offset = update.update_id + 1
+
+    async def _serve_webhook(self) -> None:
+        if not WEBHOOK_BASE_URL:
+            raise ValueError("WEBHOOK_BASE_URL must be set when BOT_RUN_MODE=webhook")
+        server = _RoutingWebhookServer(self, self.bot)
+        await server.start()
+        await self.bot.set_webhook(
+            url=WEBHOOK_BASE_URL.rstrip("/") + WEBHOOK_PATH,
+            secret_token=WEBHOOK_SECRET or None,
+            allowed_updates=self.allowed_updates,
+        )
+        try:
+            await self._stop.wait()
+        finally:
+            await server.drain()
+
+    async def _stop_workers(self) -> None:
+        loop = asyncio.get_running_loop()
+        for conn in self._conns:
+            try:
+                loop.remove_reader(conn.fileno())
+            except (OSError, ValueError):
+                pass
+        for outbox in self._outboxes:
+            outbox.put_nowait(("stop",))
+        await asyncio.gather(*self._senders, return_exceptions=True)
+        for process in self._processes:
+            await loop.run_in_executor(None, process.join, WEBHOOK_DRAIN_TIMEOUT + 10)
+            if process.is_alive():
+                logger.warning(f"{process.name} did not stop in time, terminating")
+                process.terminate()
+        for executor in self._executors:
+            executor.shutdown(wait=False)
+        logger.info(f"Workers stopped; updates routed per worker: {self.routed}")
+
+
+class _RoutingWebhookServer(WebhookServer):
+    """Webhook que reparte las actualizaciones en lugar de procesarlas."""
+
+    def __init__(self, supervisor: Supervisor, bot: Bot):
+        super().__init__(None, bot)
+        self.supervisor = supervisor
+
+    async def _process(self, update: Update) -> None:
+        try:
+            self.supervisor.route(update)
+            self.processed += 1
+        finally:
+            self._semaphore.release()
+
+
+class WorkerRuntime:
+    """Receives updates from the supervisor pipe and feeds them to the dispatcher."""
+
+    def __init__(self, conn, dp: Dispatcher, bot: Bot, max_concurrent: int = WORKER_MAX_CONCURRENT_UPDATES, **dispatch_kwargs):
+        self.conn = conn
+        self.dp = dp
+        self.bot = bot
+        self.max_concurrent = max_concurrent
+        self.dispatch_kwargs = dispatch_kwargs
+        self._in_flight: set = set()
+        self._reading = False
+        self._stopped = asyncio.Event()
+        self.processed = 0
+
+    async def run(self) -> None:
+        self._resume()
+        await self._stopped.wait()
+        self._pause()
+        if self._in_flight:
+            await asyncio.wait(set(self._in_flight), timeout=WEBHOOK_DRAIN_TIMEOUT)
+
+    def _resume(self) -> None:
+        if not self._reading and not self._stopped.is_set():
+            asyncio.get_running_loop().add_reader(self.conn.fileno(), self._on_message)
+            self._reading = True
+
+    def _pause(self) -> None:
+        if self._reading:
+            asyncio.get_running_loop().remove_reader(self.conn.fileno())
+            self._reading = False
+
+    def _on_message(self) -> None:
+        try:
+            message = self.conn.recv()
+        except (EOFError, OSError):
+            # Supervisor gone: stop as if asked to
+            self._stopped.set()
+            self._pause()
+            return
+
+        kind = message[0]
+        if kind == "update":
+            update = Update.model_validate(message[1], context={"bot": self.bot})
+            task = asyncio.create_task(self._process(update))
+            self._in_flight.add(task)
+            task.add_done_callback(self._done)
+            if len(self._in_flight) >= self.max_concurrent:
+                # Backpressure: the supervisor's pipe fills up until we catch up
+                self._pause()
+        elif kind == "bus":
+            _, channel, args, kwargs = message
+            cache_bus.deliver(channel, args, kwargs)
+        elif kind == "stop":
+            self._stopped.set()
+            self._pause()
+
+    def _done(self, task: asyncio.Task) -> None:
+        self._in_flight.discard(task)
+        self.processed += 1
+        if len(self._in_flight) < self.max_concurrent:
+            self._resume()
+
+    async def _process(self, update: Update) -> None:
+        try:
+            await self.dp.feed_update(self.bot, update, **self.dispatch_kwargs)
+        except Exception as e:
+            logger.error(f"Error processing update {update.update_id}: {e}", exc_info=True)
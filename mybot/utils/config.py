@@ -39,6 +39,60 @@ FREE_CHANNEL_ID = int(os.environ.get("FREE_CHANNEL_ID", "0"))
 # configuration menu.
 CHANNEL_SCHEDULER_INTERVAL = int(os.environ.get("CHANNEL_SCHEDULER_INTERVAL", "30"))
 VIP_SCHEDULER_INTERVAL = int(os.environ.get("VIP_SCHEDULER_INTERVAL", "3600"))
+MISSION_GC_INTERVAL = int(os.environ.get("MISSION_GC_INTERVAL", "3600"))
+
+# Seconds between checks that every user's balance matches their point ledger.
+POINT_RECONCILIATION_INTERVAL = int(os.environ.get("POINT_RECONCILIATION_INTERVAL", "86400"))
+
+# Seconds between refreshes of the admin statistics snapshot.
+STATS_SNAPSHOT_INTERVAL = int(os.environ.get("STATS_SNAPSHOT_INTERVAL", "300"))
+
+# Maximum messages per second sent by background notification queues (bulk
+# grants, broadcasts). Telegram allows roughly 30 messages per second per bot.
+NOTIFICATION_RATE_PER_SECOND = int(os.environ.get("NOTIFICATION_RATE_PER_SECOND", "25"))
+
+# Minimum seconds between keyboard edits of the same interactive post. Reaction
+# updates arriving in between are coalesced into a single edit.
+REACTION_EDIT_INTERVAL = float(os.environ.get("REACTION_EDIT_INTERVAL", "1.5"))
+
+# Updates of the same user are processed one at a time; this many more may wait
+# behind the running one; further updates (e.g. button mashing) are dropped.
+USER_UPDATE_QUEUE_SIZE = int(os.environ.get("USER_UPDATE_QUEUE_SIZE", "5"))
+
+# Days an interactive post keeps accepting button callbacks, and how often
+# expired entries are purged from the message registry.
+MESSAGE_REGISTRY_TTL_DAYS = int(os.environ.get("MESSAGE_REGISTRY_TTL_DAYS", "30"))
+MESSAGE_REGISTRY_CLEANUP_INTERVAL = int(os.environ.get("MESSAGE_REGISTRY_CLEANUP_INTERVAL", "86400"))
+
+# How updates are received: ``polling`` (default) or ``webhook``. Webhook mode
+# needs ``WEBHOOK_BASE_URL`` (public https URL Telegram will call) and should
+# set ``WEBHOOK_SECRET`` so requests not coming from Telegram are rejected.
+BOT_RUN_MODE = os.environ.get("BOT_RUN_MODE", "polling").lower()
+WEBHOOK_BASE_URL = os.environ.get("WEBHOOK_BASE_URL", "")
+WEBHOOK_PATH = os.environ.get("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.environ.get("WEBHOOK_SECRET", "")
+WEBHOOK_HOST = os.environ.get("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.environ.get("WEBHOOK_PORT", os.environ.get("PORT", "8080")))
+# Updates processed concurrently before the server stops acknowledging new
+# ones, and seconds allowed to finish in-flight updates on shutdown.
+WEBHOOK_MAX_CONCURRENT_UPDATES = int(os.environ.get("WEBHOOK_MAX_CONCURRENT_UPDATES", "100"))
+WEBHOOK_DRAIN_TIMEOUT = float(os.environ.get("WEBHOOK_DRAIN_TIMEOUT", "30"))
+
+# FSM flows (wizards, auctions, trivia...) are stored in the database so they
+# survive restarts. Flows untouched for this many hours are discarded.
+FSM_STATE_TTL_HOURS = int(os.environ.get("FSM_STATE_TTL_HOURS", "72"))
+
+# Multi-worker mode. With ``WORKER_COUNT`` > 1 a supervisor receives updates
+# (polling or webhook) and routes each user to a fixed worker process. Only the
+# worker holding the scheduler lease runs background jobs; lease holders renew
+# every ``SCHEDULER_LEASE_TTL / 3`` seconds. Cache invalidations travel between
+# workers through ``CACHE_BUS_BACKEND``: ``socket`` (via the supervisor, single
+# host) or ``db`` (cache_events table, works across hosts).
+WORKER_COUNT = int(os.environ.get("WORKER_COUNT", "1"))
+WORKER_MAX_CONCURRENT_UPDATES = int(os.environ.get("WORKER_MAX_CONCURRENT_UPDATES", "100"))
+SCHEDULER_LEASE_TTL = int(os.environ.get("SCHEDULER_LEASE_TTL", "30"))
+CACHE_BUS_BACKEND = os.environ.get("CACHE_BUS_BACKEND", "socket").lower()
+CACHE_BUS_POLL_INTERVAL = float(os.environ.get("CACHE_BUS_POLL_INTERVAL", "1"))
 
 # Default reaction button texts used on channel posts when no custom values
 
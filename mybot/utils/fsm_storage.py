@@ -0,0 +1,166 @@
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from database.models import FSMRecord
+from database.upsert import upsert_insert
+from utils.config import FSM_STATE_TTL_HOURS
+
+logger = logging.getLogger(__name__)
+
+# Conversaciones cuyo estado se mantiene en memoria
+FSM_CACHE_MAX_ENTRIES = 10000
+# Segundos entre purgas de estados caducados
+FSM_PURGE_INTERVAL = 3600
+
+Record = Tuple[Optional[str], Dict[str, Any]]
+# (estado, datos, última escritura); la fecha es None si no hay fila
+CachedRecord = Tuple[Optional[str], Dict[str, Any], Optional[datetime]]
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _decode(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 1 and "__datetime__" in obj:
+        return datetime.fromisoformat(obj["__datetime__"])
+    return obj
+
+
+def _key(key: StorageKey) -> str:
+    return ":".join(
+        str(part) if part is not None else ""
+        for part in (
+            key.bot_id,
+            key.chat_id,
+            key.user_id,
+            key.thread_id,
+            key.business_connection_id,
+            key.destiny,
+        )
+    )
+
+
+class DatabaseStorage(BaseStorage):
+    """Almacenamiento FSM en la base de datos del bot.
+
+    - Cada escritura va directa a ``fsm_records`` (write-through); las lecturas
+      salen de un LRU en memoria y solo van a la base la primera vez
+    - Escribir el mismo estado o los mismos datos no genera consultas
+    - Los registros sin tocar en ``ttl`` se consideran vacíos y se purgan
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        ttl: timedelta = timedelta(hours=FSM_STATE_TTL_HOURS),
+        max_entries: int = FSM_CACHE_MAX_ENTRIES,
+    ):
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, CachedRecord]" = OrderedDict()
+        self._next_purge = time.monotonic() + FSM_PURGE_INTERVAL
+
+    async def close(self) -> None:
+        self._cache.clear()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        state = state.state if isinstance(state, State) else state
+        current_state, data = await self._get(key)
+        if state != current_state:
+            await self._write(key, state, data, {"state": state})
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        state, _ = await self._get(key)
+        return state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            msg = f"Data must be a dict or dict-like object, got {type(data).__name__}"
+            raise DataNotDictLikeError(msg)
+        state, current_data = await self._get(key)
+        # Copia profunda vía JSON: el caché no comparte objetos con el handler
+        encoded = json.dumps(data, default=_encode)
+        data = json.loads(encoded, object_hook=_decode)
+        if data != current_data:
+            await self._write(key, state, data, {"data": encoded})
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        _, data = await self._get(key)
+        return json.loads(json.dumps(data, default=_encode), object_hook=_decode)
+
+    async def _get(self, key: StorageKey) -> Record:
+        db_key = _key(key)
+        cached = self._cache.get(db_key)
+        if cached is not None:
+            state, data, updated_at = cached
+            if updated_at is None or updated_at >= datetime.utcnow() - self.ttl:
+                self._cache.move_to_end(db_key)
+                return state, data
+            # Caducado en memoria igual que en la base: la conversación se da por vacía
+            self._remember(db_key, (None, {}, None))
+            return None, {}
+
+        async with self.session_factory() as session:
+            row = await session.get(FSMRecord, db_key)
+        cached = (None, {}, None)
+        if row is not None and row.updated_at and row.updated_at >= datetime.utcnow() - self.ttl:
+            cached = (row.state, json.loads(row.data, object_hook=_decode) if row.data else {}, row.updated_at)
+        self._remember(db_key, cached)
+        return cached[0], cached[1]
+
+    async def _write(self, key: StorageKey, state: Optional[str], data: Dict[str, Any], changes: Dict[str, Any]) -> None:
+        db_key = _key(key)
+        now = datetime.utcnow()
+        async with self.session_factory() as session:
+            if state is None and not data:
+                # Conversación terminada: no se guarda una fila vacía
+                await session.execute(delete(FSMRecord).where(FSMRecord.key == db_key))
+            else:
+                values = {
+                    "key": db_key,
+                    "state": state,
+                    "data": json.dumps(data, default=_encode),
+                    "updated_at": now,
+                }
+                insert = upsert_insert(session)
+                if insert is not None:
+                    await session.execute(
+                        insert(FSMRecord)
+                        .values(values)
+                        .on_conflict_do_update(index_elements=["key"], set_={**changes, "updated_at": now})
+                    )
+                else:
+                    await session.merge(FSMRecord(**values))
+            await self._maybe_purge(session)
+            await session.commit()
+        self._remember(db_key, (state, data, now if state is not None or data else None))
+
+    def _remember(self, db_key: str, record: CachedRecord) -> None:
+        self._cache[db_key] = record
+        self._cache.move_to_end(db_key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    async def _maybe_purge(self, session: AsyncSession) -> None:
+        if time.monotonic() < self._next_purge:
+            return
+        self._next_purge = time.monotonic() + FSM_PURGE_INTERVAL
+        result = await session.execute(
+            delete(FSMRecord).where(FSMRecord.updated_at < datetime.utcnow() - self.ttl)
+        )
+        if result.rowcount:
+            logger.info(f"Purged {result.rowcount} expired FSM records")
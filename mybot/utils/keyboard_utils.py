@@ -122,11 +122,16 @@ def get_reward_keyboard(
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 
-def get_ranking_keyboard():
+def get_ranking_keyboard(menu_state: str = "ranking"):
     """Returns the keyboard for the ranking section."""
+    boards = [("🏆 General", "ranking"), ("📅 Semana", "ranking_weekly"), ("☀️ Hoy", "ranking_daily")]
     keyboard = [
         [
-            InlineKeyboardButton(text="🔄 Actualizar", callback_data="menu:ranking"),
+            InlineKeyboardButton(text=f"• {text} •" if state == menu_state else text, callback_data=f"menu:{state}")
+            for text, state in boards
+        ],
+        [
+            InlineKeyboardButton(text="🔄 Actualizar", callback_data=f"menu:{menu_state}"),
             InlineKeyboardButton(text="🏠 Menú Principal", callback_data="menu_principal")
         ]
     ]
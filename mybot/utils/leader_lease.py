@@ -0,0 +1,100 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable
+
+from sqlalchemy import update, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from database.models import SchedulerLease
+from utils.config import SCHEDULER_LEASE_TTL
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderLease:
+    """Elección de líder mediante una fila con caducidad en ``scheduler_leases``.
+
+    Solo el proceso que tiene la concesión vigente ejecuta los schedulers; la
+    renueva cada ``ttl / 3`` segundos y, si deja de poder hacerlo, otro proceso
+    la toma cuando caduca.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        holder: str,
+        name: str = "schedulers",
+        ttl: int = SCHEDULER_LEASE_TTL,
+    ):
+        self.session_factory = session_factory
+        self.holder = holder
+        self.name = name
+        self.ttl = ttl
+        self.is_leader = False
+
+    async def try_acquire(self) -> bool:
+        """Toma o renueva la concesión. Returns: True si este proceso es líder."""
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.ttl)
+        async with self.session_factory() as session:
+            result = await session.execute(
+                update(SchedulerLease)
+                .where(
+                    SchedulerLease.name == self.name,
+                    (SchedulerLease.holder == self.holder) | (SchedulerLease.expires_at < now),
+                )
+                .values(holder=self.holder, expires_at=expires_at)
+            )
+            if result.rowcount:
+                await session.commit()
+                return True
+            try:
+                session.add(SchedulerLease(name=self.name, holder=self.holder, expires_at=expires_at))
+                await session.commit()
+                return True
+            except IntegrityError:
+                # Otro proceso tiene una concesión vigente
+                await session.rollback()
+                return False
+
+    async def release(self) -> None:
+        if not self.is_leader:
+            return
+        async with self.session_factory() as session:
+            await session.execute(
+                delete(SchedulerLease).where(
+                    SchedulerLease.name == self.name,
+                    SchedulerLease.holder == self.holder,
+                )
+            )
+            await session.commit()
+        self.is_leader = False
+
+    async def run(
+        self,
+        on_elected: Callable[[], Awaitable[None]],
+        on_demoted: Callable[[], Awaitable[None]],
+    ) -> None:
+        """Bucle de elección: llama a ``on_elected``/``on_demoted`` en cada cambio."""
+        try:
+            while True:
+                try:
+                    leader = await self.try_acquire()
+                except Exception as e:
+                    logger.error(f"Error renewing scheduler lease: {e}")
+                    leader = False
+                if leader and not self.is_leader:
+                    logger.info(f"{self.holder} elected scheduler leader")
+                    self.is_leader = True
+                    await on_elected()
+                elif not leader and self.is_leader:
+                    logger.warning(f"{self.holder} lost the scheduler lease")
+                    self.is_leader = False
+                    await on_demoted()
+                await asyncio.sleep(self.ttl / 3)
+        finally:
+            if self.is_leader:
+                await on_demoted()
+                await self.release()
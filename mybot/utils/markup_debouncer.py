@@ -0,0 +1,111 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter, TelegramBadRequest, TelegramAPIError
+from aiogram.types import InlineKeyboardMarkup
+
+from utils.config import REACTION_EDIT_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# Mensajes cuyo último teclado enviado se recuerda para evitar ediciones idénticas
+MARKUP_DEBOUNCER_MAX_MESSAGES = 2000
+
+MessageKey = Tuple[int, int]
+
+
+class MarkupEditDebouncer:
+    """Agrupa las ediciones de teclado de un mismo mensaje.
+
+    Cada mensaje se edita como mucho una vez por ``interval`` segundos con el
+    último teclado solicitado; las peticiones intermedias se descartan y las
+    que no cambian nada no llegan a Telegram.
+    """
+
+    def __init__(self, interval: float = REACTION_EDIT_INTERVAL):
+        self.interval = interval
+        self._pending: Dict[MessageKey, Tuple[Bot, InlineKeyboardMarkup]] = {}
+        self._tasks: Dict[MessageKey, asyncio.Task] = {}
+        self._last_markup: "OrderedDict[MessageKey, InlineKeyboardMarkup]" = OrderedDict()
+        self.requested = 0
+        self.edited = 0
+        self.unchanged = 0
+        self.failed = 0
+
+    def request(self, bot: Bot, chat_id: int, message_id: int, markup: InlineKeyboardMarkup) -> None:
+        """Solicita editar el teclado; la edición real se hace en segundo plano."""
+        key = (int(chat_id), message_id)
+        self.requested += 1
+        self._pending[key] = (bot, markup)
+        task = self._tasks.get(key)
+        if task is None or task.done():
+            self._tasks[key] = asyncio.create_task(self._flush(key))
+
+    def stats(self) -> Dict[str, int]:
+        """Ediciones solicitadas, enviadas y ahorradas desde el arranque."""
+        return {
+            "requested": self.requested,
+            "edited": self.edited,
+            "unchanged": self.unchanged,
+            "failed": self.failed,
+            "saved": self.requested - self.edited - self.failed,
+            "pending": len(self._pending),
+        }
+
+    async def _flush(self, key: MessageKey) -> None:
+        try:
+            while key in self._pending:
+                bot, markup = self._pending.pop(key)
+                if self._last_markup.get(key) == markup:
+                    self.unchanged += 1
+                    continue
+                await self._edit(bot, key, markup)
+                # La tarea sigue viva durante el intervalo: lo que llegue mientras
+                # tanto se acumula en _pending y sale en la siguiente vuelta
+                await asyncio.sleep(self.interval)
+        finally:
+            self._tasks.pop(key, None)
+
+    async def _edit(self, bot: Bot, key: MessageKey, markup: InlineKeyboardMarkup) -> None:
+        chat_id, message_id = key
+        try:
+            await bot.edit_message_reply_markup(
+                chat_id=str(chat_id),
+                message_id=message_id,
+                reply_markup=markup,
+            )
+            self.edited += 1
+            self._remember(key, markup)
+            if self.edited % 100 == 0:
+                logger.info(f"Reaction markup edits: {self.stats()}")
+        except TelegramRetryAfter as e:
+            logger.warning(f"Markup edit for {key} rate limited, retrying in {e.retry_after}s")
+            await asyncio.sleep(e.retry_after)
+            # Si llegó un teclado más reciente mientras esperábamos, se envía ese
+            bot, markup = self._pending.pop(key, (bot, markup))
+            await self._edit(bot, key, markup)
+        except TelegramBadRequest as e:
+            if "message is not modified" in str(e):
+                self.unchanged += 1
+                self._remember(key, markup)
+                return
+            self.failed += 1
+            logger.error(f"Failed to update reaction markup for chat {chat_id}, message {message_id}: {e}")
+        except TelegramAPIError as e:
+            self.failed += 1
+            logger.error(
+                f"Unexpected API error updating reaction markup for chat {chat_id}, message {message_id}: {e}"
+            )
+
+    def _remember(self, key: MessageKey, markup: InlineKeyboardMarkup) -> None:
+        self._last_markup[key] = markup
+        self._last_markup.move_to_end(key)
+        while len(self._last_markup) > MARKUP_DEBOUNCER_MAX_MESSAGES:
+            self._last_markup.popitem(last=False)
+
+
+# Instancia compartida del proceso
+markup_debouncer = MarkupEditDebouncer()
@@ -15,7 +15,12 @@ from utils.keyboard_utils import (
 from utils.message_utils import get_profile_message, get_ranking_message
 from services.mission_service import MissionService
 from services.reward_service import RewardService
-from services.point_service import PointService
+from services.leaderboard_service import (
+    LeaderboardService,
+    BOARD_ALL_TIME,
+    BOARD_WEEKLY,
+    BOARD_DAILY,
+)
 from keyboards.auction_kb import get_auction_main_kb
 
 async def create_profile_menu(user_id: int, session: AsyncSession) -> Tuple[str, InlineKeyboardMarkup]:
@@ -87,10 +92,32 @@ async def create_auction_menu(user_id: int, session: AsyncSession) -> Tuple[str,
     
     return text, get_auction_main_kb()
 
-async def create_ranking_menu(user_id: int, session: AsyncSession) -> Tuple[str, InlineKeyboardMarkup]:
+RANKING_BOARDS = {
+    "ranking": BOARD_ALL_TIME,
+    "ranking_weekly": BOARD_WEEKLY,
+    "ranking_daily": BOARD_DAILY,
+}
+
+
+async def create_ranking_menu(
+    user_id: int, session: AsyncSession, menu_state: str = "ranking"
+) -> Tuple[str, InlineKeyboardMarkup]:
     """Create the ranking menu for a user."""
-    point_service = PointService(session)
-    top_users = await point_service.get_top_users(limit=10)
-    
-    ranking_text = await get_ranking_message(top_users, user_id)
-    return ranking_text, get_ranking_keyboard()
+    board = RANKING_BOARDS.get(menu_state, BOARD_ALL_TIME)
+    leaderboard = LeaderboardService(session)
+    top = await leaderboard.get_top(10, board)
+    viewer_rank = await leaderboard.get_rank(user_id, board)
+    # Outside the top 10 the viewer also sees who is right above and below
+    neighbors = await leaderboard.get_neighbors(user_id, 1, board) if viewer_rank and viewer_rank > 10 else []
+    users = await leaderboard.load_users([entry[1] for entry in top + neighbors])
+
+    ranking_text = await get_ranking_message(
+        top,
+        users,
+        user_id,
+        board=board,
+        viewer_rank=viewer_rank,
+        total=await leaderboard.get_ranked_count(board),
+        neighbors=neighbors,
+    )
+    return ranking_text, get_ranking_keyboard(menu_state)
@@ -241,8 +241,8 @@ class MenuFactory:
             return await create_rewards_menu(user_id, session)
         elif menu_state == "auctions":
             return await create_auction_menu(user_id, session)
-        elif menu_state == "ranking":
-            return await create_ranking_menu(user_id, session)
+        elif menu_state in ("ranking", "ranking_weekly", "ranking_daily"):
+            return await create_ranking_menu(user_id, session, menu_state)
         
         elif menu_state == "admin_gamification_main": # Asegúrate de que este estado es reconocido si alguna otra parte lo invoca
             # Aunque el handler directo lo gestiona, si por alguna razón menu_factory
@@ -15,6 +15,7 @@ from utils.message_safety import (
 from aiogram.exceptions import TelegramBadRequest, TelegramAPIError
 from sqlalchemy.ext.asyncio import AsyncSession
 from database.models import User, set_user_menu_state
+from utils.menu_state_store import menu_state_store
 
 logger = logging.getLogger(__name__)
 
@@ -27,12 +28,10 @@ class MenuManager:
     """
     
     def __init__(self):
-        # Store the current menu message for each user
-        self._active_menus: Dict[int, Tuple[int, int]] = {}  # user_id -> (chat_id, message_id)
+        # Active menu message and navigation history live in menu_state_store
+        # (bounded, persisted in batches and rehydrated after restarts).
         # Store temporary messages that should be auto-deleted
         self._temp_messages: Dict[int, Tuple[int, int, float]] = {}  # user_id -> (chat_id, message_id, expire_time)
-        # Navigation history for back button functionality
-        self._nav_history: Dict[int, list] = {}  # user_id -> [menu_states]
     
     async def show_menu(
         self, 
@@ -58,7 +57,7 @@ class MenuManager:
         await self._cleanup_temp_messages(bot, user_id)
         
         # Try to update existing menu if it exists
-        existing = self._active_menus.get(user_id)
+        existing = (await menu_state_store.get(user_id)).active_menu
         if existing:
             chat_id, msg_id = existing
             try:
@@ -102,11 +101,11 @@ class MenuManager:
                 reply_markup=keyboard,
                 parse_mode=parse_mode,
             )
-            self._active_menus[user_id] = (sent_message.chat.id, sent_message.message_id)
+            await menu_state_store.set_active_menu(user_id, sent_message.chat.id, sent_message.message_id)
             await set_user_menu_state(session, user_id, menu_state)
             
             # Update navigation history
-            self._update_nav_history(user_id, menu_state)
+            await self._update_nav_history(user_id, menu_state)
             
             # Delete the original command message if requested
             if delete_origin_message and message.message_id:
@@ -148,12 +147,12 @@ class MenuManager:
                 parse_mode=parse_mode,
             )
             
-            # Update stored menu reference - this is crucial to ensure _active_menus points to the correct message
-            self._active_menus[user_id] = (message.chat.id, message.message_id) # Corregido de message.message.id a message.message_id
+            # Update stored menu reference - this is crucial to ensure the active menu points to the correct message
+            await menu_state_store.set_active_menu(user_id, message.chat.id, message.message_id)
             await set_user_menu_state(session, user_id, menu_state)
             
             # Update navigation history
-            self._update_nav_history(user_id, menu_state)
+            await self._update_nav_history(user_id, menu_state)
             
             return True
         except TelegramBadRequest as e:
@@ -214,21 +213,7 @@ class MenuManager:
         Navigate back to the previous menu in the history.
         """
         user_id = callback.from_user.id
-        history = self._nav_history.get(user_id, [])
-        
-        # Ensure we always have at least one state (the current one) if history is not empty
-        if len(history) > 1:
-            # Remove current state
-            history.pop() 
-            previous_state = history[-1]
-        elif len(history) == 1:
-            # If only one item, it means we are at the "root" of the history for this session.
-            # We should try to go back to it, but not pop it.
-            previous_state = history[0] # Stay at the current state
-            logger.debug(f"User {user_id} is at the start of navigation history. Staying at '{previous_state}'.")
-        else:
-            previous_state = default_menu_state
-            logger.debug(f"User {user_id} has no navigation history. Falling back to default: '{default_menu_state}'.")
+        previous_state = await menu_state_store.pop_history(user_id, default_menu_state)
         
         # Import here to avoid circular imports
         from utils.menu_factory import menu_factory # Usa la instancia global si existe
@@ -250,26 +235,13 @@ class MenuManager:
         # Clean up temporary messages
         await self._cleanup_temp_messages(bot, user_id)
         
-        # Remove active menu reference
-        self._active_menus.pop(user_id, None)
-        
-        # Clear navigation history
-        self._nav_history.pop(user_id, None)
+        # Remove active menu reference and navigation history
+        await menu_state_store.clear(user_id)
     
-    def _update_nav_history(self, user_id: int, menu_state: str) -> None:
+    async def _update_nav_history(self, user_id: int, menu_state: str) -> None:
         """Update navigation history for back button functionality."""
-        if user_id not in self._nav_history:
-            self._nav_history[user_id] = []
-        
-        history = self._nav_history[user_id]
-        
-        # Don't add duplicate consecutive states
-        if not history or history[-1] != menu_state:
-            history.append(menu_state)
-            
-            # Limit history size to prevent memory issues
-            if len(history) > 10: # Keep a reasonable history length
-                history.pop(0)
+        # Duplicates and depth are handled by the store
+        await menu_state_store.push_history(user_id, menu_state)
     
     async def _cleanup_temp_messages(self, bot, user_id: int) -> None:
         """Clean up expired temporary messages for a user."""
@@ -0,0 +1,232 @@
+"""
+Bounded, lazily persisted store for per-user menu state.
+Keeps the active menu message, current menu and navigation history of
+recently active users in memory and writes changes to ``user_menu_states``
+in batches instead of committing on every click.
+"""
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from database.models import User, UserMenuState
+from database.upsert import upsert_insert
+
+logger = logging.getLogger(__name__)
+
+# Users whose menu state is kept in memory
+MENU_STATE_MAX_ENTRIES = 20000
+# Menu states remembered for the back button
+MENU_HISTORY_DEPTH = 10
+# Seconds between batched writes of changed entries
+MENU_STATE_FLUSH_INTERVAL = 5.0
+
+
+class MenuStateEntry:
+    __slots__ = ("menu_state", "active_menu", "history")
+
+    def __init__(
+        self,
+        menu_state: Optional[str] = None,
+        active_menu: Optional[Tuple[int, int]] = None,
+        history: Optional[List[str]] = None,
+    ):
+        self.menu_state = menu_state
+        self.active_menu = active_menu  # (chat_id, message_id)
+        self.history = history or []
+
+    def to_row(self, user_id: int) -> dict:
+        chat_id, message_id = self.active_menu or (None, None)
+        return {
+            "user_id": user_id,
+            "menu_state": self.menu_state,
+            "chat_id": chat_id,
+            "message_id": message_id,
+            "history": list(self.history),
+            "updated_at": datetime.utcnow(),
+        }
+
+
+class MenuStateStore:
+    def __init__(
+        self,
+        max_entries: int = MENU_STATE_MAX_ENTRIES,
+        history_depth: int = MENU_HISTORY_DEPTH,
+        flush_interval: float = MENU_STATE_FLUSH_INTERVAL,
+    ):
+        self.max_entries = max_entries
+        self.history_depth = history_depth
+        self.flush_interval = flush_interval
+        self._session_factory: Optional[async_sessionmaker[AsyncSession]] = None
+        self._entries: "OrderedDict[int, MenuStateEntry]" = OrderedDict()
+        # user_id -> row to write; survives eviction of the entry itself
+        self._dirty: Dict[int, dict] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def configure(self, session_factory: async_sessionmaker[AsyncSession]) -> None:
+        """Enable persistence; without it the store only lives in memory."""
+        self._session_factory = session_factory
+
+    async def get(self, user_id: int) -> MenuStateEntry:
+        """Return the user's entry, rehydrating it from the database on a miss."""
+        entry = self._entries.get(user_id)
+        if entry is not None:
+            self._entries.move_to_end(user_id)
+            return entry
+
+        entry = MenuStateEntry()
+        if self._session_factory is not None:
+            async with self._session_factory() as session:
+                row = (
+                    await session.execute(
+                        select(UserMenuState, User.menu_state)
+                        .select_from(User)
+                        .outerjoin(UserMenuState, UserMenuState.user_id == User.id)
+                        .where(User.id == user_id)
+                    )
+                ).first()
+            if row is not None:
+                stored, legacy_state = row
+                if stored is not None:
+                    active = (stored.chat_id, stored.message_id) if stored.message_id else None
+                    entry = MenuStateEntry(stored.menu_state, active, list(stored.history or []))
+                else:
+                    entry = MenuStateEntry(legacy_state)
+        self._remember(user_id, entry)
+        return entry
+
+    async def set_state(self, user_id: int, menu_state: str) -> None:
+        entry = await self.get(user_id)
+        if entry.menu_state != menu_state:
+            entry.menu_state = menu_state
+            self._mark_dirty(user_id, entry)
+
+    async def set_active_menu(self, user_id: int, chat_id: int, message_id: int) -> None:
+        entry = await self.get(user_id)
+        if entry.active_menu != (chat_id, message_id):
+            entry.active_menu = (chat_id, message_id)
+            self._mark_dirty(user_id, entry)
+
+    async def push_history(self, user_id: int, menu_state: str) -> None:
+        entry = await self.get(user_id)
+        # Don't add duplicate consecutive states
+        if entry.history and entry.history[-1] == menu_state:
+            return
+        entry.history.append(menu_state)
+        del entry.history[:-self.history_depth]
+        self._mark_dirty(user_id, entry)
+
+    async def pop_history(self, user_id: int, default: str) -> str:
+        """Drop the current state and return the previous one (or stay at the root)."""
+        entry = await self.get(user_id)
+        history = entry.history
+        if len(history) > 1:
+            history.pop()
+            self._mark_dirty(user_id, entry)
+            return history[-1]
+        if history:
+            logger.debug(f"User {user_id} is at the start of navigation history. Staying at '{history[0]}'.")
+            return history[0]
+        logger.debug(f"User {user_id} has no navigation history. Falling back to default: '{default}'.")
+        return default
+
+    async def clear(self, user_id: int) -> None:
+        entry = await self.get(user_id)
+        entry.active_menu = None
+        entry.history = []
+        self._mark_dirty(user_id, entry)
+
+    async def flush(self) -> int:
+        """Write every pending change in one statement. Returns rows written."""
+        if not self._dirty or self._session_factory is None:
+            return 0
+        rows = list(self._dirty.values())
+        self._dirty = {}
+        try:
+            async with self._session_factory() as session:
+                await self._write_rows(session, rows)
+                await session.commit()
+            return len(rows)
+        except IntegrityError as e:
+            # One invalid row (e.g. a deleted user) must not block the others
+            logger.warning(f"Menu state batch of {len(rows)} rejected, writing row by row: {e}")
+        except Exception as e:
+            self._requeue(rows)
+            logger.error(f"Error flushing {len(rows)} menu states: {e}")
+            return 0
+        return await self._flush_row_by_row(rows)
+
+    async def _flush_row_by_row(self, rows: List[dict]) -> int:
+        written = 0
+        try:
+            async with self._session_factory() as session:
+                for row in rows:
+                    try:
+                        async with session.begin_nested():
+                            await self._write_rows(session, [row])
+                        written += 1
+                    except IntegrityError as e:
+                        logger.warning(f"Dropping menu state of user {row['user_id']}: {e}")
+                await session.commit()
+        except Exception as e:
+            self._requeue(rows)
+            logger.error(f"Error flushing {len(rows)} menu states: {e}")
+            return 0
+        return written
+
+    async def _write_rows(self, session: AsyncSession, rows: List[dict]) -> None:
+        insert = upsert_insert(session)
+        if insert is not None:
+            stmt = insert(UserMenuState).values(rows)
+            await session.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=["user_id"],
+                    set_={
+                        column: stmt.excluded[column]
+                        for column in ("menu_state", "chat_id", "message_id", "history", "updated_at")
+                    },
+                )
+            )
+        else:
+            for row in rows:
+                await session.merge(UserMenuState(**row))
+            await session.flush()
+
+    def _requeue(self, rows: List[dict]) -> None:
+        """Keep failed changes for the next attempt unless newer ones replaced them."""
+        for row in rows:
+            self._dirty.setdefault(row["user_id"], row)
+        self._schedule_flush()
+
+    def _remember(self, user_id: int, entry: MenuStateEntry) -> None:
+        self._entries[user_id] = entry
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _mark_dirty(self, user_id: int, entry: MenuStateEntry) -> None:
+        if self._session_factory is None:
+            return
+        self._dirty[user_id] = entry.to_row(user_id)
+        self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        # Keep going while changes remain: new ones or a failed flush's
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+            if not self._dirty:
+                return
+
+
+# Global store shared by MenuManager and the menu helpers
+menu_state_store = MenuStateStore()
@@ -101,28 +101,49 @@ async def get_reward_details_message(reward: Reward, user_points: int) -> str:
     )
 
 
-async def get_ranking_message(users_ranking: list[User], viewer_user_id: int) -> str:
+_RANKING_TITLES = {
+    "all_time": "ranking_title",
+    "weekly": "ranking_title_weekly",
+    "daily": "ranking_title_daily",
+}
+
+
+async def get_ranking_message(
+    entries: list[tuple[int, int, float]],
+    users: dict[int, User],
+    viewer_user_id: int,
+    *,
+    board: str = "all_time",
+    viewer_rank: int | None = None,
+    total: int = 0,
+    neighbors: list[tuple[int, int, float]] | None = None,
+) -> str:
     """
     Generates a formatted message for the user ranking with anonymized usernames.
+    ``entries``/``neighbors`` are (rank, user_id, points) tuples from a leaderboard.
     """
-    ranking_text = BOT_MESSAGES["ranking_title"] + "\n\n"
+    ranking_text = BOT_MESSAGES[_RANKING_TITLES.get(board, "ranking_title")] + "\n\n"
 
-    if not users_ranking:
+    if not entries:
         return ranking_text + BOT_MESSAGES["no_ranking_data"]
 
-    for i, user in enumerate(users_ranking):
-        display_name = anonymize_username(user, viewer_user_id)
-        
-        ranking_text += (
-            BOT_MESSAGES["ranking_entry"].format(
-                rank=i + 1, 
-                username=display_name, 
-                points=user.points, 
-                level=user.level
-            )
-            + "\n"
+    def format_entry(rank: int, user_id: int, points: float) -> str:
+        user = users.get(user_id)
+        return BOT_MESSAGES["ranking_entry"].format(
+            rank=rank,
+            username=anonymize_username(user, viewer_user_id),
+            points=points,
+            level=user.level if user else 1,
         )
 
+    ranking_text += "\n".join(format_entry(*entry) for entry in entries) + "\n"
+    if neighbors:
+        ranking_text += "…\n" + "\n".join(format_entry(*entry) for entry in neighbors) + "\n"
+
+    if viewer_rank:
+        ranking_text += "\n" + BOT_MESSAGES["ranking_your_position"].format(rank=viewer_rank, total=total)
+    else:
+        ranking_text += "\n" + BOT_MESSAGES["ranking_not_ranked"]
     return ranking_text
 
 
@@ -130,8 +151,10 @@ async def get_weekly_reaction_ranking_message(ranking: list[tuple[int, int]], se
     text = BOT_MESSAGES["weekly_ranking_title"] + "\n\n"
     if not ranking:
         return text + BOT_MESSAGES["no_ranking_data"]
+    result = await session.execute(select(User).where(User.id.in_([user_id for user_id, _ in ranking])))
+    users = {user.id: user for user in result.scalars()}
     for idx, (user_id, count) in enumerate(ranking):
-        user = await session.get(User, user_id)
+        user = users.get(user_id)
         display_name = anonymize_username(user, viewer_user_id)
         text += BOT_MESSAGES["weekly_ranking_entry"].format(rank=idx + 1, username=display_name, count=count) + "\n"
     return text
@@ -38,6 +38,10 @@ BUTLER_MESSAGES = {
     "ranking_title": "🏆 *Tabla de Posiciones*",
     "ranking_entry": "#{rank}. @{username} - Puntos: `{points}`, Nivel: `{level}`",
     "no_ranking_data": "Aún no hay datos en el ranking. Sea usted el primero en aparecer.",
+    "ranking_title_weekly": "📅 *Tabla de Posiciones · Esta semana*",
+    "ranking_title_daily": "☀️ *Tabla de Posiciones · Hoy*",
+    "ranking_your_position": "📍 Su posición: *#{rank}* de {total}",
+    "ranking_not_ranked": "📍 Aún no aparece en esta tabla.",
     "no_active_subscription": "No tiene una suscripción activa.",
 }
 
@@ -0,0 +1,73 @@
+import asyncio
+import logging
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter, TelegramForbiddenError, TelegramBadRequest
+
+from utils.config import NOTIFICATION_RATE_PER_SECOND
+
+logger = logging.getLogger(__name__)
+
+# Reintentos por mensaje cuando Telegram pide esperar (RetryAfter)
+NOTIFICATION_MAX_RETRIES = 3
+
+
+class NotificationQueue:
+    """Cola de mensajes enviada en segundo plano a ritmo controlado.
+
+    Los envíos masivos encolan aquí en lugar de llamar a ``bot.send_message``
+    en bucle, para no superar el límite de Telegram ni bloquear al handler.
+    """
+
+    def __init__(self, rate_per_second: int = NOTIFICATION_RATE_PER_SECOND):
+        self.interval = 1 / max(rate_per_second, 1)
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._worker: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.failed = 0
+
+    def enqueue(self, bot: Bot, user_id: int, text: str, **kwargs) -> None:
+        """Encola un mensaje y arranca el worker si no está activo."""
+        self._queue.put_nowait((bot, user_id, text, kwargs))
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    async def _run(self) -> None:
+        while not self._queue.empty():
+            bot, user_id, text, kwargs = await self._queue.get()
+            try:
+                await self._send(bot, user_id, text, kwargs)
+            finally:
+                self._queue.task_done()
+            await asyncio.sleep(self.interval)
+
+    async def _send(self, bot: Bot, user_id: int, text: str, kwargs: dict) -> None:
+        for attempt in range(NOTIFICATION_MAX_RETRIES + 1):
+            try:
+                await bot.send_message(user_id, text, **kwargs)
+                self.sent += 1
+                return
+            except TelegramRetryAfter as e:
+                if attempt == NOTIFICATION_MAX_RETRIES:
+                    self.failed += 1
+                    logger.error(f"Notification to {user_id} dropped after {attempt} rate-limit retries")
+                    return
+                logger.warning(f"Notification rate limited, retrying in {e.retry_after}s")
+                await asyncio.sleep(e.retry_after)
+            except (TelegramForbiddenError, TelegramBadRequest) as e:
+                # Usuario que bloqueó al bot o chat inexistente: no se reintenta
+                self.failed += 1
+                logger.debug(f"Notification to {user_id} dropped: {e}")
+                return
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Error sending notification to {user_id}: {e}")
+                return
+
+
+# Cola compartida del proceso
+notification_queue = NotificationQueue()
@@ -0,0 +1,115 @@
+import math
+import random
+from typing import Any, Iterator, List, Optional
+
+
+class _Node:
+    __slots__ = ("key", "next", "width")
+
+    def __init__(self, key: Any, levels: int):
+        self.key = key
+        self.next: List[Optional["_Node"]] = [None] * levels
+        # Posiciones que avanza cada enlace; permite saber el índice de un nodo
+        self.width: List[int] = [1] * levels
+
+
+class IndexableSkipList:
+    """Lista ordenada de claves únicas con acceso por posición.
+
+    Insertar, eliminar, buscar la posición de una clave y obtener la clave de
+    una posición cuestan O(log n); recorrer ``k`` elementos desde una posición
+    cuesta O(log n + k).
+    """
+
+    def __init__(self, expected_size: int = 1 << 20):
+        self.levels = max(1, int(1 + math.log2(max(expected_size, 2))))
+        self._head = _Node(None, self.levels)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _random_height(self) -> int:
+        return min(self.levels, 1 - int(math.log2(1.0 - random.random())))
+
+    def insert(self, key: Any) -> None:
+        chain: List[_Node] = [self._head] * self.levels
+        steps_at_level = [0] * self.levels
+        node = self._head
+        for level in reversed(range(self.levels)):
+            while node.next[level] is not None and node.next[level].key < key:
+                steps_at_level[level] += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+
+        height = self._random_height()
+        new = _Node(key, height)
+        steps = 0
+        for level in range(height):
+            prev = chain[level]
+            new.next[level] = prev.next[level]
+            prev.next[level] = new
+            new.width[level] = prev.width[level] - steps
+            prev.width[level] = steps + 1
+            steps += steps_at_level[level]
+        for level in range(height, self.levels):
+            chain[level].width[level] += 1
+        self._size += 1
+
+    def remove(self, key: Any) -> None:
+        chain: List[_Node] = [self._head] * self.levels
+        node = self._head
+        for level in reversed(range(self.levels)):
+            while node.next[level] is not None and node.next[level].key < key:
+                node = node.next[level]
+            chain[level] = node
+        target = chain[0].next[0]
+        if target is None or target.key != key:
+            raise KeyError(key)
+
+        for level in range(len(target.next)):
+            prev = chain[level]
+            prev.width[level] += target.width[level] - 1
+            prev.next[level] = target.next[level]
+        for level in range(len(target.next), self.levels):
+            chain[level].width[level] -= 1
+        self._size -= 1
+
+    def index(self, key: Any) -> int:
+        """Posición (desde 0) de ``key``; ``KeyError`` si no está."""
+        position = 0
+        node = self._head
+        for level in reversed(range(self.levels)):
+            while node.next[level] is not None and node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+        target = node.next[0]
+        if target is None or target.key != key:
+            raise KeyError(key)
+        return position
+
+    def _node_at(self, index: int) -> _Node:
+        remaining = index + 1
+        node = self._head
+        for level in reversed(range(self.levels)):
+            while node.next[level] is not None and node.width[level] <= remaining:
+                remaining -= node.width[level]
+                node = node.next[level]
+        return node
+
+    def __getitem__(self, index: int) -> Any:
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError(index)
+        return self._node_at(index).key
+
+    def iter_from(self, start: int, count: int) -> Iterator[Any]:
+        """Hasta ``count`` claves a partir de la posición ``start``."""
+        if count <= 0 or start >= self._size:
+            return
+        node = self._node_at(max(start, 0))
+        while node is not None and count > 0:
+            yield node.key
+            node = node.next[0]
+            count -= 1
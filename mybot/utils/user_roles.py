@@ -3,6 +3,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from .config import ADMIN_IDS, VIP_CHANNEL_ID
 from database.models import User, VipSubscription
+from .cache_bus import shared_invalidation
 import os
 import time
 from typing import Dict, Tuple
@@ -155,6 +156,7 @@ async def get_user_role(
     return role
 
 
+@shared_invalidation("role_cache", per_user=True)
 def clear_role_cache(user_id: int = None):
     """Clear role cache for a specific user or all users."""
     if user_id:
@@ -0,0 +1,168 @@
+import asyncio
+import hmac
+import logging
+import signal
+import time
+from typing import Optional, Set
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+from utils.config import (
+    WEBHOOK_BASE_URL,
+    WEBHOOK_PATH,
+    WEBHOOK_SECRET,
+    WEBHOOK_HOST,
+    WEBHOOK_PORT,
+    WEBHOOK_MAX_CONCURRENT_UPDATES,
+    WEBHOOK_DRAIN_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookServer:
+    """Servidor aiohttp que recibe las actualizaciones de Telegram por webhook.
+
+    - Rechaza peticiones sin el ``secret_token`` configurado en ``setWebhook``
+    - Responde en cuanto la actualización queda en proceso; como mucho
+      ``max_concurrent`` a la vez, el resto espera antes de recibir el 200
+      (Telegram reduce el ritmo de envío)
+    - Al cerrar deja de aceptar actualizaciones y espera a las pendientes
+    """
+
+    def __init__(
+        self,
+        dp: Dispatcher,
+        bot: Bot,
+        *,
+        path: str = WEBHOOK_PATH,
+        secret: str = WEBHOOK_SECRET,
+        max_concurrent: int = WEBHOOK_MAX_CONCURRENT_UPDATES,
+        drain_timeout: float = WEBHOOK_DRAIN_TIMEOUT,
+        **dispatch_kwargs,
+    ):
+        self.dp = dp
+        self.bot = bot
+        self.path = path
+        self.secret = secret
+        self.drain_timeout = drain_timeout
+        self.dispatch_kwargs = dispatch_kwargs
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._in_flight: Set[asyncio.Task] = set()
+        self._draining = False
+        self._runner: Optional[web.AppRunner] = None
+        self.received = 0
+        self.processed = 0
+        self.rejected = 0
+        self.total_processing_time = 0.0
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(self.path, self.handle)
+        app.router.add_get("/healthz", self.health)
+        return app
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if self.secret and not hmac.compare_digest(
+            request.headers.get(SECRET_HEADER, ""), self.secret
+        ):
+            self.rejected += 1
+            return web.Response(status=401)
+        if self._draining:
+            # Telegram reintenta la actualización más tarde (la recibirá la nueva instancia)
+            return web.Response(status=503)
+
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": self.bot})
+        except Exception as e:
+            self.rejected += 1
+            logger.warning(f"Invalid webhook payload: {e}")
+            return web.Response(status=400)
+
+        self.received += 1
+        await self._semaphore.acquire()
+        task = asyncio.create_task(self._process(update))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+        return web.Response()
+
+    async def health(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats())
+
+    def stats(self) -> dict:
+        return {
+            "received": self.received,
+            "processed": self.processed,
+            "rejected": self.rejected,
+            "in_flight": len(self._in_flight),
+            "avg_processing_ms": round(1000 * self.total_processing_time / self.processed, 2)
+            if self.processed else None,
+        }
+
+    async def _process(self, update: Update) -> None:
+        started = time.perf_counter()
+        try:
+            await self.dp.feed_update(self.bot, update, **self.dispatch_kwargs)
+        except Exception as e:
+            logger.error(f"Error processing update {update.update_id}: {e}", exc_info=True)
+        finally:
+            self._semaphore.release()
+            self.processed += 1
+            self.total_processing_time += time.perf_counter() - started
+
+    async def start(self, host: str = WEBHOOK_HOST, port: int = WEBHOOK_PORT) -> None:
+        self._runner = web.AppRunner(self.build_app())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        logger.info(f"Webhook server listening on {host}:{port}{self.path}")
+
+    async def drain(self) -> None:
+        """Deja de aceptar actualizaciones y espera a las que están en proceso."""
+        self._draining = True
+        if self._in_flight:
+            logger.info(f"Draining {len(self._in_flight)} in-flight updates...")
+            done, pending = await asyncio.wait(set(self._in_flight), timeout=self.drain_timeout)
+            for task in pending:
+                task.cancel()
+            if pending:
+                logger.warning(f"{len(pending)} updates cancelled after drain timeout")
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot, allowed_updates: list[str]) -> None:
+    """Registra el webhook en Telegram y atiende actualizaciones hasta SIGINT/SIGTERM."""
+    if not WEBHOOK_BASE_URL:
+        raise ValueError("WEBHOOK_BASE_URL must be set when BOT_RUN_MODE=webhook")
+    if not WEBHOOK_SECRET:
+        logger.warning("WEBHOOK_SECRET is empty: webhook requests are not authenticated")
+
+    workflow_data = {"dispatcher": dp, "bots": [bot], **dp.workflow_data}
+    server = WebhookServer(dp, bot, **workflow_data)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+
+    await dp.emit_startup(bot=bot, **workflow_data)
+    try:
+        await server.start()
+        await bot.set_webhook(
+            url=WEBHOOK_BASE_URL.rstrip("/") + WEBHOOK_PATH,
+            secret_token=WEBHOOK_SECRET or None,
+            allowed_updates=allowed_updates,
+        )
+        await stop.wait()
+    finally:
+        await server.drain()
+        await dp.emit_shutdown(bot=bot, **workflow_data)
+        logger.info(f"Webhook server stopped: {server.stats()}")
@@ -0,0 +1,123 @@
+"""
+Banco de pruebas local del modo webhook.
+
+Levanta ``WebhookServer`` con un dispatcher mínimo (sin llamadas a Telegram) y
+le envía actualizaciones sintéticas por HTTP para medir la latencia de
+respuesta, la latencia hasta que el handler termina y el rendimiento total.
+
+    python scripts/webhook_bench.py --updates 5000 --clients 50 --handler-ms 5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BOT_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, os.pardir, "mybot"))
+if BOT_DIR not in sys.path:
+    sys.path.insert(0, BOT_DIR)
+
+# Token con formato válido: el banco nunca contacta con Telegram
+os.environ.setdefault("BOT_TOKEN", "123456:bench-token")
+
+from aiohttp import ClientSession
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message
+
+from utils.webhook_server import WebhookServer, SECRET_HEADER
+
+SECRET = "bench-secret"
+
+
+def synthetic_update(update_id: int) -> dict:
+    user_id = 1000 + update_id % 500
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "Bench"},
+            "text": f"mensaje {update_id}",
+        },
+    }
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def run(args) -> None:
+    sent_at: dict[int, float] = {}
+    done_at: dict[int, float] = {}
+    all_done = asyncio.Event()
+
+    router = Router()
+
+    @router.message()
+    async def handler(message: Message) -> None:
+        if args.handler_ms:
+            await asyncio.sleep(args.handler_ms / 1000)
+        done_at[message.message_id] = time.perf_counter()
+        if len(done_at) == args.updates:
+            all_done.set()
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    bot = Bot(os.environ["BOT_TOKEN"])
+    server = WebhookServer(dp, bot, path="/webhook", secret=SECRET, max_concurrent=args.max_concurrent)
+    await server.start(host="127.0.0.1", port=args.port)
+
+    url = f"http://127.0.0.1:{args.port}/webhook"
+    ack_latencies: list[float] = []
+    queue: asyncio.Queue = asyncio.Queue()
+    for update_id in range(1, args.updates + 1):
+        queue.put_nowait(update_id)
+
+    async def client(session: ClientSession) -> None:
+        while not queue.empty():
+            update_id = queue.get_nowait()
+            started = time.perf_counter()
+            sent_at[update_id] = started
+            async with session.post(url, json=synthetic_update(update_id), headers={SECRET_HEADER: SECRET}) as resp:
+                if resp.status != 200:
+                    print(f"update {update_id}: HTTP {resp.status}")
+            ack_latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    async with ClientSession() as session:
+        await asyncio.gather(*(client(session) for _ in range(args.clients)))
+    await asyncio.wait_for(all_done.wait(), timeout=60)
+    elapsed = time.perf_counter() - started
+
+    await server.drain()
+    await bot.session.close()
+
+    e2e = [done_at[i] - sent_at[i] for i in done_at]
+    print(f"updates: {args.updates}  clients: {args.clients}  max_concurrent: {args.max_concurrent}")
+    print(f"throughput: {args.updates / elapsed:.0f} updates/s ({elapsed:.2f}s)")
+    for label, values in (("ack", ack_latencies), ("end-to-end", e2e)):
+        print(
+            f"{label:>10} ms  p50={1000 * statistics.median(values):.2f}"
+            f"  p95={1000 * percentile(values, 0.95):.2f}"
+            f"  p99={1000 * percentile(values, 0.99):.2f}"
+            f"  max={1000 * max(values):.2f}"
+        )
+    print(f"server: {server.stats()}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=20, help="peticiones HTTP simultáneas")
+    parser.add_argument("--max-concurrent", type=int, default=100, help="límite de updates en proceso")
+    parser.add_argument("--handler-ms", type=float, default=0, help="trabajo simulado por update")
+    parser.add_argument("--port", type=int, default=8089)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()